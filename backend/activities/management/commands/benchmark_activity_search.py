@@ -0,0 +1,103 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from activities.models import ActivityCode
+from activities.search_index import get_search_index, search_activities
+from activities.views import ActivityCodeViewSet
+
+PAGE_SIZE = 20
+
+
+def _typed_queries(rng, rows, count):
+    """What a user types during onboarding: every keystroke of the first words of a name or of a code."""
+    queries = []
+    while len(queries) < count:
+        code, name = rng.choice(rows)
+        if rng.random() < 0.25:
+            text = code
+        else:
+            text = ' '.join(name.split()[:rng.randint(1, 3)])
+        queries.extend(text[:end] for end in range(1, len(text) + 1))
+    return queries[:count]
+
+
+def _search_filter(queries):
+    # The list endpoint: SearchFilter (icontains on code and name) + LimitOffsetPagination (count + page)
+    factory = APIRequestFactory()
+    view = ActivityCodeViewSet()
+    backend = SearchFilter()
+    latencies, found = [], 0
+    for query in queries:
+        request = Request(factory.get('/api/activities/', {'search': query}))
+        started = time.perf_counter()
+        queryset = backend.filter_queryset(request, ActivityCode.objects.all(), view)
+        found += queryset.count()
+        list(queryset[:PAGE_SIZE])
+        latencies.append(time.perf_counter() - started)
+    return latencies, found
+
+
+def _search_index(queries):
+    latencies, found = [], 0
+    for query in queries:
+        started = time.perf_counter()
+        count, _ = search_activities(query, PAGE_SIZE)
+        found += count
+        latencies.append(time.perf_counter() - started)
+    return latencies, found
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение поиска по справочнику ГКЭД: индекс в памяти процесса (префиксное дерево кодов, '
+        'инвертированный индекс по словам наименований) против SearchFilter (icontains + count) '
+        'на запросах «по мере ввода» по текущей таблице видов деятельности.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rows = list(ActivityCode.objects.values_list('code', 'name'))
+        if not rows:
+            raise CommandError(
+                'Справочник пуст: загрузите его через activities.scripts.import_activities_code'
+            )
+        queries = _typed_queries(random.Random(options['seed']), rows, options['queries'])
+
+        index = get_search_index()
+        self.stdout.write(
+            f'Справочник: {len(rows)} кодов, {len(index.vocabulary)} слов; '
+            f'построение индекса {index.build_seconds * 1000:.0f} ms; запросов {len(queries)}'
+        )
+
+        # Warm-up: the first ORM query and the first cache access
+        _search_filter(queries[:20])
+        _search_index(queries[:20])
+
+        filter_latencies, filter_found = _search_filter(queries)
+        self._report('SearchFilter', filter_latencies, filter_found)
+        index_latencies, index_found = _search_index(queries)
+        self._report('Индекс', index_latencies, index_found)
+        self.stdout.write(
+            f'Ускорение p50: x{self._pct(filter_latencies, 0.5) / self._pct(index_latencies, 0.5):.0f}, '
+            f'p99: x{self._pct(filter_latencies, 0.99) / self._pct(index_latencies, 0.99):.0f}'
+        )
+
+    @staticmethod
+    def _pct(latencies, q):
+        latencies = sorted(latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+
+    def _report(self, name, latencies, found):
+        self.stdout.write(
+            f'{name}: p50 {self._pct(latencies, 0.5):.3f} ms, p95 {self._pct(latencies, 0.95):.3f} ms, '
+            f'p99 {self._pct(latencies, 0.99):.3f} ms, max {max(latencies) * 1000:.3f} ms, '
+            f'найдено в среднем {found / len(latencies):.1f}'
+        )
@@ -1,5 +1,6 @@
 import pandas as pd
 from activities.models import ActivityCode
+from activities.search_index import invalidate_search_index
 import re
 
 def import_gked_from_excel(file_path):
@@ -42,6 +43,7 @@ def import_gked_from_excel(file_path):
             seen_codes.add(code)
 
     ActivityCode.objects.bulk_create(activities_to_create, ignore_conflicts=True) # ignore_conflicts поможет при повторных запусках
+    invalidate_search_index()  # bulk_create не вызывает сигналы — индекс поиска пересобираем явно
 
 # python manage.py shell
 # Внутри оболочки:
@@ -0,0 +1,263 @@
+"""
+In-process search index over the activity code directory (ГКЭД).
+
+The whole directory (~1,700 codes) is loaded once per process into:
+- a prefix trie over codes with the dots removed ("0111" and "01.11" both find 01.11 and its
+  children);
+- an inverted index over names: case-folded words (ё -> е) without stop words, with a light
+  suffix-stripping Russian stemmer, plus a sorted vocabulary for prefix matches of a word
+  being typed.
+
+Every query word must match a name word exactly, by stem or by prefix; matches are ranked
+by the idf of the word's stem (exact > stem > prefix), names starting with the query rank
+higher, shorter names win ties. Code prefixes filter the results; a code-only query is
+ordered by code depth.
+
+The index is rebuilt when the shared version changes: invalidate_search_index() bumps it after
+commit (see activities.signals and the import script). Across processes only with Redis (REDIS_URL).
+"""
+
+import heapq
+import math
+import re
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import ActivityCode
+
+SEARCH_INDEX_VERSION_KEY = 'activities:search_index_version'
+MAX_LIMIT = 100
+# Prefixes this short match hundreds of words: their matches are computed once at build time
+SHORT_PREFIX_LENGTH = 2
+
+EXACT_WEIGHT = 1.0
+STEM_WEIGHT = 0.9
+PREFIX_WEIGHT = 0.7
+LEADING_WORD_BONUS = 0.5
+
+WORD_RE = re.compile(r'\w+')
+CODE_RE = re.compile(r'^\d[\d.]*$')
+
+STOP_WORDS = frozenset({
+    'в', 'во', 'и', 'или', 'к', 'ко', 'на', 'не', 'о', 'об', 'от', 'по', 'при', 'с', 'со',
+    'для', 'до', 'за', 'из', 'их', 'ее', 'его', 'кроме', 'также', 'этих', 'этой', 'а', 'у',
+})
+
+# Longest endings first: "выращиванием" loses "ием", not "м"
+_ENDINGS = tuple(sorted({
+    # reflexive and verb forms
+    'ся', 'сь', 'ать', 'ять', 'ить', 'еть', 'ет', 'ит', 'ут', 'ют', 'ат', 'ят',
+    # adjectives and participles
+    'ыми', 'ими', 'ого', 'его', 'ому', 'ему', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ый', 'ий',
+    'ой', 'ую', 'юю', 'ых', 'их', 'ым', 'им',
+    # nouns
+    'иями', 'ями', 'ами', 'иях', 'ях', 'ах', 'ием', 'ией', 'иям', 'ям', 'ам', 'ов', 'ев', 'ей',
+    'ом', 'ем', 'ою', 'ею', 'ию', 'ия', 'ии', 'ью',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+}, key=len, reverse=True))
+MIN_STEM_LENGTH = 3
+
+
+def fold(text):
+    return text.casefold().replace('ё', 'е')
+
+
+def stem(word):
+    """Strip one inflectional ending, keeping at least MIN_STEM_LENGTH letters ("торговля" -> "торговл")."""
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text):
+    return [word for word in WORD_RE.findall(fold(text)) if word not in STOP_WORDS]
+
+
+def normalize_code(code):
+    return ''.join(ch for ch in fold(code) if ch.isalnum())
+
+
+@dataclass
+class SearchIndex:
+    version: object = None
+    entries: dict = field(default_factory=dict)  # id -> {id, code, section, name}
+    code_trie: dict = field(default_factory=dict)  # char -> node; node[''] = ids ordered by (depth, code)
+    words: dict = field(default_factory=dict)  # word -> ids of names containing it
+    stems: dict = field(default_factory=dict)  # stem -> ids of names containing it
+    vocabulary: list = field(default_factory=list)  # sorted words, for prefix ranges
+    leading_words: dict = field(default_factory=dict)  # id -> first name word
+    name_lengths: dict = field(default_factory=dict)  # id -> words in the name
+    code_order: dict = field(default_factory=dict)  # id -> (depth, code)
+    short_prefixes: dict = field(default_factory=dict)  # prefix -> _word_matches(prefix)
+    build_seconds: float = 0.0
+
+    @classmethod
+    def build(cls, rows, version=None):
+        """rows: iterable of (id, code, section, name)."""
+        started = time.perf_counter()
+        index = cls(version=version)
+        for pk, code, section, name in rows:
+            index.entries[pk] = {'id': pk, 'code': code, 'section': section, 'name': name}
+            index.code_order[pk] = (code.count('.'), code)
+            node = index.code_trie
+            for ch in normalize_code(code):
+                node = node.setdefault(ch, {})
+                node.setdefault('', []).append(pk)
+
+            tokens = tokenize(name)
+            index.name_lengths[pk] = len(tokens)
+            index.leading_words[pk] = tokens[0] if tokens else ''
+            for word in tokens:
+                index.words.setdefault(word, set()).add(pk)
+                index.stems.setdefault(stem(word), set()).add(pk)
+
+        index.vocabulary = sorted(index.words)
+        stack = [index.code_trie]
+        while stack:
+            node = stack.pop()
+            for ch, child in node.items():
+                if ch:
+                    child[''].sort(key=index.code_order.__getitem__)
+                    stack.append(child)
+        for prefix in {word[:length] for word in index.vocabulary for length in range(1, SHORT_PREFIX_LENGTH + 1)}:
+            index.short_prefixes[prefix] = index._word_matches(prefix)
+        index.build_seconds = time.perf_counter() - started
+        return index
+
+    def _idf(self, document_frequency):
+        return math.log(1 + len(self.entries) / document_frequency)
+
+    def _code_matches(self, prefix):
+        node = self.code_trie
+        for ch in normalize_code(prefix):
+            node = node.get(ch)
+            if node is None:
+                return []
+        return node.get('', [])
+
+    def _word_matches(self, word):
+        """{id: weight} of names containing the word exactly, by stem or by prefix (best match per name)."""
+        if word in self.short_prefixes:
+            return self.short_prefixes[word]
+        scores = {}
+        end = word[:-1] + chr(ord(word[-1]) + 1)
+        start = bisect_left(self.vocabulary, word)
+        for position in range(start, bisect_left(self.vocabulary, end, start)):
+            candidate = self.vocabulary[position]
+            # idf of the whole stem: a rare inflected form is not a rarer word
+            idf = self._idf(len(self.stems[stem(candidate)]))
+            weight = (EXACT_WEIGHT if candidate == word else PREFIX_WEIGHT) * idf
+            for pk in self.words[candidate]:
+                if weight > scores.get(pk, 0):
+                    scores[pk] = weight
+        postings = self.stems.get(stem(word))
+        if postings:
+            weight = STEM_WEIGHT * self._idf(len(postings))
+            for pk in postings:
+                if weight > scores.get(pk, 0):
+                    scores[pk] = weight
+        return scores
+
+    def search(self, query, limit=20):
+        """Return (matched count, best `limit` entries) for a search-as-you-type query."""
+        code_parts, words = [], []
+        for part in query.split():
+            if CODE_RE.match(part):
+                code_parts.append(part)
+            else:
+                words.extend(tokenize(part))
+        if not code_parts and not words:
+            return 0, []
+
+        candidates = None
+        for part in code_parts:
+            ids = self._code_matches(part)
+            candidates = set(ids) if candidates is None else candidates.intersection(ids)
+            if not candidates:
+                return 0, []
+
+        if not words:
+            # Shallow codes first: "01" lists the division before its groups and classes
+            if len(code_parts) == 1:
+                ordered = self._code_matches(code_parts[0])
+            else:
+                ordered = sorted(candidates, key=self.code_order.__getitem__)
+            return len(ordered), [self.entries[pk] for pk in ordered[:limit]]
+
+        scores = None
+        for word in words:
+            matches = self._word_matches(word)
+            if candidates is not None:
+                matches = {pk: weight for pk, weight in matches.items() if pk in candidates}
+            if scores is None:
+                scores = matches
+            else:
+                scores = {pk: score + matches[pk] for pk, score in scores.items() if pk in matches}
+            if not scores:
+                return 0, []
+
+        first = words[0]
+        leading = self.leading_words
+        lengths = self.name_lengths
+        order = self.code_order
+
+        def rank(pk):
+            score = scores[pk]
+            if leading[pk].startswith(first):
+                score += LEADING_WORD_BONUS
+            return (-score, lengths[pk], order[pk])
+
+        best = heapq.nsmallest(limit, scores, key=rank)
+        return len(scores), [self.entries[pk] for pk in best]
+
+
+_index = None
+_build_lock = threading.Lock()
+
+
+def _get_version():
+    version = cache.get(SEARCH_INDEX_VERSION_KEY)
+    if version is None:
+        # Time-based start: an evicted counter never comes back with an old value
+        cache.add(SEARCH_INDEX_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(SEARCH_INDEX_VERSION_KEY)
+    return version
+
+
+def get_search_index():
+    """The process-wide index, rebuilt from the table if the shared version has changed."""
+    global _index
+    version = _get_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _build_lock:
+        if _index is None or _index.version != version:
+            rows = ActivityCode.objects.values_list('id', 'code', 'section', 'name').iterator()
+            _index = SearchIndex.build(rows, version=version)
+        return _index
+
+
+def search_activities(query, limit=20):
+    """(matched count, [{id, code, section, name}, ...]) for the query, best matches first."""
+    return get_search_index().search(query, max(1, min(limit, MAX_LIMIT)))
+
+
+def _bump_version():
+    global _index
+    try:
+        cache.incr(SEARCH_INDEX_VERSION_KEY)
+    except ValueError:
+        cache.set(SEARCH_INDEX_VERSION_KEY, time.time_ns(), timeout=None)
+    _index = None
+
+
+def invalidate_search_index():
+    """Rebuild the index (in every process) on the next search once the current transaction commits."""
+    transaction.on_commit(_bump_version)
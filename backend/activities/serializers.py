@@ -7,4 +7,9 @@ class ActivityCodeSerializer(serializers.ModelSerializer):
     class Meta:
         model = ActivityCode
         fields = ('id', 'code', 'section', 'name')
-        read_only_fields = ('id', 'code', 'section', 'name')
\ No newline at end of file
+        read_only_fields = ('id', 'code', 'section', 'name')
+
+class ActivityCodeSearchSerializer(serializers.Serializer):
+    """Ответ поиска по справочнику: число совпадений и лучшие из них."""
+    count = serializers.IntegerField()
+    results = ActivityCodeSerializer(many=True)
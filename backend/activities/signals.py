@@ -0,0 +1,13 @@
+"""Rebuild the activity search index when the directory changes (see activities.search_index)."""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from activities.models import ActivityCode
+from activities.search_index import invalidate_search_index
+
+
+@receiver(post_save, sender=ActivityCode)
+@receiver(post_delete, sender=ActivityCode)
+def invalidate_search_index_on_activity_code_write(sender, instance, **kwargs):
+    invalidate_search_index()
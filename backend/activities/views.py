@@ -1,8 +1,12 @@
 from django.shortcuts import render
+from drf_spectacular.utils import OpenApiParameter, OpenApiTypes, extend_schema
 from rest_framework import viewsets, generics, status, filters
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from activities.models import ActivityCode
-from activities.serializers import ActivityCodeSerializer
+from activities.search_index import MAX_LIMIT, search_activities
+from activities.serializers import ActivityCodeSearchSerializer, ActivityCodeSerializer
 
 
 class ActivityCodeViewSet(viewsets.ReadOnlyModelViewSet):
@@ -14,4 +18,24 @@ class ActivityCodeViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ActivityCodeSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter]
-    search_fields = ['code', 'name']
\ No newline at end of file
+    search_fields = ['code', 'name']
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('q', OpenApiTypes.STR, description='Начало кода и/или слова наименования'),
+            OpenApiParameter('limit', OpenApiTypes.INT, description=f'По умолчанию 20, максимум {MAX_LIMIT}'),
+        ],
+        responses=ActivityCodeSearchSerializer,
+    )
+    @action(detail=False, methods=['get'], url_path='search', pagination_class=None)
+    def search(self, request):
+        """
+        Поиск по мере ввода по индексу справочника в памяти процесса, без запросов к БД.
+        Лучшие совпадения первыми: по коду (префикс) и по словам наименования (формы слова, начало слова).
+        """
+        try:
+            limit = int(request.query_params.get('limit', 20))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        count, results = search_activities(request.query_params.get('q', ''), limit)
+        return Response({'count': count, 'results': results})
@@ -0,0 +1,87 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand
+
+from core.fake_openrouter import start_fake_openrouter
+from core.llm_client import LLMClient, LLMError
+
+MESSAGES = [{"role": "user", "content": "Какие сроки сдачи отчета по единому налогу?"}]
+
+
+def _naive_call(url):
+    # The previous way: a new connection per call, one fixed timeout, no retries
+    response = requests.post(url, json={"model": "fake", "messages": MESSAGES}, timeout=60)
+    response.raise_for_status()
+    return response.json()["choices"][0]["message"]["content"]
+
+
+def _run(call, requests_count, concurrency):
+    latencies, errors = [], 0
+
+    def one(i):
+        started = time.perf_counter()
+        try:
+            call(i)
+        except (LLMError, requests.RequestException):
+            return None
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for latency in pool.map(one, range(requests_count)):
+            if latency is None:
+                errors += 1
+            else:
+                latencies.append(latency)
+    return time.perf_counter() - started, sorted(latencies), errors
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочное сравнение общего клиента LLM (пул соединений, лимиты параллелизма, повторы, '
+        'предохранитель) с прямыми вызовами requests.post на локальном фейковом OpenRouter.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=32, help='Параллельных вызывающих потоков')
+        parser.add_argument('--users', type=int, default=16, help='Разных пользователей среди вызовов')
+        parser.add_argument('--latency', type=float, default=0.05, help='Задержка фейкового сервера, с')
+        parser.add_argument('--error-rate', type=float, default=0.05, help='Доля ответов 503')
+
+    def handle(self, *args, **options):
+        server = start_fake_openrouter(
+            latency=options['latency'], error_rate=options['error_rate'], error_status=503
+        )
+        try:
+            count, concurrency = options['requests'], options['concurrency']
+
+            elapsed, latencies, errors = _run(lambda i: _naive_call(server.url), count, concurrency)
+            self._report('requests.post', elapsed, latencies, errors, server)
+
+            server.max_concurrent = 0
+            client = LLMClient(url=server.url, api_key='fake', breaker_failures=1000)
+            users = options['users']
+            elapsed, latencies, errors = _run(
+                lambda i: client.chat_completion(MESSAGES, user_id=i % users), count, concurrency
+            )
+            self._report('LLMClient', elapsed, latencies, errors, server)
+            metrics = client.get_metrics()
+            self.stdout.write(
+                f'  попыток {metrics["attempts"]}, повторов {metrics["retries"]}, '
+                f'ожидание слота p95 {metrics["queue_wait_ms"]["p95"]} ms'
+            )
+        finally:
+            server.shutdown()
+
+    def _report(self, name, elapsed, latencies, errors, server):
+        def pct(q):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000 if latencies else 0
+
+        self.stdout.write(
+            f'{name}: {len(latencies) / elapsed:.1f} req/s, ошибок {errors}, '
+            f'p50 {pct(0.5):.0f} ms, p95 {pct(0.95):.0f} ms, '
+            f'одновременно на сервере до {server.max_concurrent}'
+        )
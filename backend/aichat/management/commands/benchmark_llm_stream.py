@@ -0,0 +1,83 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from core.fake_openrouter import start_fake_openrouter
+from core.llm_client import LLMClient
+
+MESSAGES = [{"role": "user", "content": "Как рассчитать единый налог за квартал?"}]
+
+
+def _pct(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Время до первого токена (TTFT) в потоковом режиме против времени полного ответа '
+        'без потока, на локальном фейковом OpenRouter с заданной скоростью генерации.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=8, help='Одновременных запросов')
+        parser.add_argument('--latency', type=float, default=0.3, help='Задержка до первого токена, с')
+        parser.add_argument('--chunks', type=int, default=20, help='Частей в ответе')
+        parser.add_argument('--chunk-delay', type=float, default=0.05, help='Пауза между частями, с')
+
+    def handle(self, *args, **options):
+        server = start_fake_openrouter(
+            latency=options['latency'],
+            chunks=options['chunks'],
+            chunk_delay=options['chunk_delay'],
+            reply='Единый налог считается от выручки за квартал по ставке вида деятельности. ' * 4,
+        )
+        try:
+            client = LLMClient(url=server.url, api_key='fake', max_concurrency=options['concurrency'])
+            count, concurrency = options['requests'], options['concurrency']
+
+            blocking = []
+
+            def full_reply(i):
+                started = time.perf_counter()
+                client.chat_completion(MESSAGES, user_id=i)
+                blocking.append(time.perf_counter() - started)
+
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(full_reply, range(count)))
+
+            ttfts, totals = asyncio.run(self._stream(client, count, concurrency))
+        finally:
+            server.shutdown()
+
+        self.stdout.write(
+            f'Без потока: ответ целиком p50 {_pct(blocking, 0.5):.0f} ms, p95 {_pct(blocking, 0.95):.0f} ms'
+        )
+        self.stdout.write(
+            f'Поток (SSE): первый токен p50 {_pct(ttfts, 0.5):.0f} ms, p95 {_pct(ttfts, 0.95):.0f} ms; '
+            f'ответ целиком p50 {_pct(totals, 0.5):.0f} ms'
+        )
+
+    async def _stream(self, client, count, concurrency):
+        ttfts, totals = [], []
+        limit = asyncio.Semaphore(concurrency)
+
+        async def one(i):
+            async with limit:
+                started = time.perf_counter()
+                stream = await client.astream_chat_completion(MESSAGES, user_id=i)
+                first = None
+                async for _ in stream:
+                    if first is None:
+                        first = time.perf_counter() - started
+                ttfts.append(first)
+                totals.append(time.perf_counter() - started)
+
+        try:
+            await asyncio.gather(*(one(i) for i in range(count)))
+        finally:
+            await client.aclose()
+        return ttfts, totals
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.11 on 2026-10-17 19:07
+
+import math
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def _estimate_tokens(text):
+    # aichat.tokens.estimate_tokens at the time of this migration
+    return math.ceil(len(text) / 3) + 4
+
+
+def split_history(apps, schema_editor):
+    """One ChatMessage row per element of ChatSession.history, seq in list order."""
+    ChatSession = apps.get_model('aichat', 'ChatSession')
+    ChatMessage = apps.get_model('aichat', 'ChatMessage')
+    for session in ChatSession.objects.exclude(history=[]).iterator(chunk_size=100):
+        rows = [
+            ChatMessage(
+                session_id=session.pk,
+                seq=seq,
+                role=item.get('role', 'user'),
+                content=item.get('content') or '',
+                token_estimate=_estimate_tokens(item.get('content') or ''),
+            )
+            for seq, item in enumerate(
+                (item for item in session.history if isinstance(item, dict)), start=1
+            )
+        ]
+        ChatMessage.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+        ChatSession.objects.filter(pk=session.pk).update(last_seq=len(rows))
+
+
+def join_history(apps, schema_editor):
+    ChatSession = apps.get_model('aichat', 'ChatSession')
+    ChatMessage = apps.get_model('aichat', 'ChatMessage')
+    for session in ChatSession.objects.iterator(chunk_size=100):
+        history = [
+            {'role': role, 'content': content}
+            for role, content in ChatMessage.objects.filter(session_id=session.pk)
+            .order_by('seq')
+            .values_list('role', 'content')
+        ]
+        ChatSession.objects.filter(pk=session.pk).update(history=history)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aichat', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatsession',
+            name='last_seq',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='summary',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='summary_seq',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ChatMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveIntegerField()),
+                ('role', models.CharField(choices=[('user', 'Пользователь'), ('assistant', 'Ассистент')], max_length=16)),
+                ('content', models.TextField()),
+                ('token_estimate', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='aichat.chatsession')),
+            ],
+            options={
+                'verbose_name': 'Сообщение чата',
+                'verbose_name_plural': 'Сообщения чата',
+                'ordering': ['session', 'seq'],
+                'constraints': [models.UniqueConstraint(fields=('session', 'seq'), name='aichat_message_session_seq_uniq')],
+            },
+        ),
+        migrations.RunPython(split_history, join_history),
+        migrations.RemoveField(
+            model_name='chatsession',
+            name='history',
+        ),
+    ]
@@ -1,11 +1,64 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
+
+from .tokens import estimate_tokens
+
 
 class ChatSession(models.Model):
     session_id = models.CharField(max_length=255, unique=True)
-    history = models.JSONField(default=list)  # [{"role": "user", "content": "..."}, ...]
+    # Краткое содержание сообщений с seq <= summary_seq, которые уже не помещаются в контекст
+    summary = models.TextField(blank=True)
+    summary_seq = models.PositiveIntegerField(default=0)
+    last_seq = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def append_messages(self, *messages):
+        """
+        Добавляет сообщения [(role, content), ...] в конец диалога одной транзакцией:
+        вставка новых строк ChatMessage, без перезаписи предыдущих.
+        """
+        with transaction.atomic():
+            last_seq = ChatSession.objects.select_for_update().values_list("last_seq", flat=True).get(pk=self.pk)
+            ChatMessage.objects.bulk_create([
+                ChatMessage(
+                    session=self,
+                    seq=last_seq + i,
+                    role=role,
+                    content=content,
+                    token_estimate=estimate_tokens(content),
+                )
+                for i, (role, content) in enumerate(messages, start=1)
+            ])
+            self.last_seq = last_seq + len(messages)
+            self.updated_at = timezone.now()
+            ChatSession.objects.filter(pk=self.pk).update(last_seq=self.last_seq, updated_at=self.updated_at)
+
     def append_message(self, role, content):
-        self.history.append({"role": role, "content": content})
-        self.save()
+        self.append_messages((role, content))
+
+
+class ChatMessage(models.Model):
+    """Сообщение диалога с AI-бухгалтером; сообщения только добавляются и не изменяются."""
+
+    class Role(models.TextChoices):
+        USER = "user", "Пользователь"
+        ASSISTANT = "assistant", "Ассистент"
+
+    session = models.ForeignKey(ChatSession, on_delete=models.CASCADE, related_name="messages")
+    seq = models.PositiveIntegerField()
+    role = models.CharField(max_length=16, choices=Role.choices)
+    content = models.TextField()
+    token_estimate = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Сообщение чата"
+        verbose_name_plural = "Сообщения чата"
+        ordering = ["session", "seq"]
+        constraints = [
+            models.UniqueConstraint(fields=["session", "seq"], name="aichat_message_session_seq_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.session_id}#{self.seq} {self.role}"
@@ -0,0 +1,112 @@
+"""
+Bounded prompt for the AI accountant chat.
+
+The model gets the system prompt, a rolling summary of older turns and the most recent
+messages that fit into AI_CHAT_CONTEXT_TOKENS, so the prompt size no longer grows with the
+session. Messages that fall out of the window are folded into ChatSession.summary once
+(short extracts of each message, oldest lines dropped past AI_CHAT_SUMMARY_TOKENS) - no extra
+LLM call on the request path. Each turn reads at most RECENT_MESSAGES_LIMIT recent rows plus
+the messages that just left the window.
+"""
+
+from django.conf import settings
+
+from aichat.models import ChatMessage, ChatSession
+from aichat.tokens import estimate_tokens
+
+SYSTEM_PROMPT = (
+    "Ты профессиональный бухгалтер Кыргызстана с опытом более 15 лет. "
+    "Специализируешься на ИП и ОсОО. Отлично знаешь налоговое законодательство КР, "
+    "ГНС, отчетность, Единый налог, НДС, подоходный налог, соцфонд, страховые взносы, "
+    "ЭСФ, ЭТТН и электронные сервисы налоговой. "
+    "Отвечай структурировано, профессионально и строго по законам КР. "
+    "Если данных недостаточно — задай уточняющий вопрос."
+)
+SUMMARY_HEADER = "Краткое содержание предыдущей части диалога:"
+SUMMARY_ROLE_LABELS = {
+    ChatMessage.Role.USER: "Пользователь",
+    ChatMessage.Role.ASSISTANT: "Ассистент",
+}
+SUMMARY_EXTRACT_CHARS = 200
+# Upper bound of rows read per turn for the window and for folding into the summary
+RECENT_MESSAGES_LIMIT = 200
+
+
+def _extract(content):
+    text = " ".join(content.split())
+    if len(text) <= SUMMARY_EXTRACT_CHARS:
+        return text
+    return text[:SUMMARY_EXTRACT_CHARS].rstrip() + "…"
+
+
+def _fold_into_summary(summary, messages, budget):
+    """summary plus one extract line per message, oldest lines dropped to fit budget tokens."""
+    lines = summary.splitlines() if summary else []
+    for message in messages:
+        label = SUMMARY_ROLE_LABELS.get(message["role"], message["role"])
+        lines.append(f"{label}: {_extract(message['content'])}")
+    total = sum(estimate_tokens(line) for line in lines)
+    start = 0
+    while start < len(lines) and total > budget:
+        total -= estimate_tokens(lines[start])
+        start += 1
+    return "\n".join(lines[start:])
+
+
+def _recent_window(session, budget):
+    """Newest messages (oldest first) whose token estimates fit into budget."""
+    recent = (
+        ChatMessage.objects.filter(session=session)
+        .order_by("-seq")
+        .values("seq", "role", "content", "token_estimate")[:RECENT_MESSAGES_LIMIT]
+    )
+    window, used = [], 0
+    for message in recent:
+        if used + message["token_estimate"] > budget:
+            break
+        window.append(message)
+        used += message["token_estimate"]
+    window.reverse()
+    # Start the window on a user message so the model does not see a reply without its question
+    while window and window[0]["role"] != ChatMessage.Role.USER:
+        window.pop(0)
+    return window
+
+
+def _update_summary(session, first_window_seq):
+    """Fold messages between the summary and the window into the session summary."""
+    upto = first_window_seq - 1
+    if upto <= session.summary_seq:
+        return
+    # Older messages would be cut from the summary anyway: read only the newest ones
+    left_window = list(
+        ChatMessage.objects.filter(session=session, seq__gt=session.summary_seq, seq__lte=upto)
+        .order_by("-seq")
+        .values("role", "content")[:RECENT_MESSAGES_LIMIT]
+    )
+    left_window.reverse()
+    session.summary = _fold_into_summary(session.summary, left_window, settings.AI_CHAT_SUMMARY_TOKENS)
+    session.summary_seq = upto
+    ChatSession.objects.filter(pk=session.pk, summary_seq__lt=upto).update(
+        summary=session.summary,
+        summary_seq=upto,
+    )
+
+
+def build_context(session, message):
+    """
+    Messages for the model: system prompt, summary of older turns, recent turns within the
+    token budget and the new user message (not saved yet).
+    """
+    budget = settings.AI_CHAT_CONTEXT_TOKENS - estimate_tokens(SYSTEM_PROMPT) - estimate_tokens(message)
+    budget -= settings.AI_CHAT_SUMMARY_TOKENS
+    window = _recent_window(session, max(0, budget))
+
+    _update_summary(session, window[0]["seq"] if window else session.last_seq + 1)
+
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    if session.summary:
+        messages.append({"role": "system", "content": f"{SUMMARY_HEADER}\n{session.summary}"})
+    messages.extend({"role": m["role"], "content": m["content"]} for m in window)
+    messages.append({"role": "user", "content": message})
+    return messages
@@ -1,3 +1,61 @@
-from django.test import TestCase
+import asyncio
+import time
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from core.fake_openrouter import start_fake_openrouter
+from core.llm_client import CircuitBreaker, LLMClient, LLMTimeout
+
+COOLDOWN = 0.05
+
+
+class CircuitBreakerProbeTests(SimpleTestCase):
+    """A half-open probe that ends without an outcome must not keep the breaker shut."""
+
+    def setUp(self):
+        self.server = start_fake_openrouter(latency=0.5)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.client = LLMClient(
+            url=self.server.url, api_key="test", model="fake", max_concurrency=4, max_concurrency_per_user=2,
+            deadline=5, max_retries=0, breaker_failures=1, breaker_cooldown=COOLDOWN, stream_idle_timeout=5,
+        )
+        self.addCleanup(self.client.session.close)
+
+    def _half_open(self):
+        self.client.breaker.record_failure()
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.OPEN)
+        time.sleep(COOLDOWN * 2)
+
+    def _assert_probe_closes_breaker(self):
+        self.server.latency = 0
+        self.assertEqual(self.client.chat_completion([{"role": "user", "content": "ping"}]), self.server.reply)
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_deadline_exceeded_in_half_open(self):
+        self._half_open()
+        with self.assertRaises(LLMTimeout):
+            self.client._send({}, time.monotonic() - 1)
+        # The expired call never took the probe
+        self.assertTrue(self.client.breaker.allow())
+        self.client.breaker.release_probe()
+        self._assert_probe_closes_breaker()
+
+    def test_probe_cancelled_mid_request(self):
+        self._half_open()
+
+        async def cancel_probe():
+            task = asyncio.create_task(
+                self.client.astream_chat_completion([{"role": "user", "content": "ping"}])
+            )
+            # Request sent, upstream still thinking: the client disconnects
+            await asyncio.sleep(0.2)
+            self.assertEqual(self.client.breaker.state, CircuitBreaker.HALF_OPEN)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            await self.client.aclose()
+
+        asyncio.run(cancel_probe())
+        self.assertEqual(self.client.metrics.snapshot()["in_flight"], 0)
+        self._assert_probe_closes_breaker()
@@ -0,0 +1,17 @@
+"""
+Token estimate for chat messages without a model tokenizer.
+
+Tokenizers of current models give roughly 3 characters per token for Russian text (about 4
+for English), plus a few tokens of per-message overhead for the role and separators. The
+estimate is deliberately on the high side so a context built within a budget fits the model.
+"""
+
+import math
+
+CHARS_PER_TOKEN = 3
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text):
+    """Estimated tokens of one message with this content (overhead included)."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) + MESSAGE_OVERHEAD_TOKENS
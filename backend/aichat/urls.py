@@ -1,7 +1,9 @@
 # aichat/urls.py
 from django.urls import path
-from .views import OpenRouterView
+from .views import LLMMetricsView, OpenRouterStreamView, OpenRouterView
 
 urlpatterns = [
     path("consult/", OpenRouterView.as_view(), name="ai-consulting"),
+    path("consult/stream/", OpenRouterStreamView.as_view(), name="ai-consulting-stream"),
+    path("metrics/", LLMMetricsView.as_view(), name="ai-metrics"),
 ]
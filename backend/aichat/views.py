@@ -2,21 +2,55 @@ from rest_framework.generics import GenericAPIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
-import requests
-import os
+import json
+import math
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from core.llm_client import (
+    LLMBadResponse,
+    LLMError,
+    LLMTimeout,
+    LLMUnavailable,
+    get_llm_client,
+)
 from .serializers import ChatSessionSerializer
 from .models import ChatSession
-from rest_framework.permissions import IsAuthenticated
+from .services.context_builder import build_context
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.throttling import ScopedRateThrottle
 
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
-MODEL_NAME = "stepfun/step-3.5-flash:free"
+def llm_error_response(error, client):
+    """(тело, статус, заголовки) ответа на ошибку клиента LLM"""
+    if isinstance(error, LLMUnavailable):
+        return (
+            {"error": "Сервис ИИ временно недоступен, повторите позже", "details": str(error)},
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            {"Retry-After": str(max(1, math.ceil(client.breaker.retry_after())))},
+        )
+    if isinstance(error, LLMTimeout):
+        return (
+            {"error": "OpenRouter не ответил вовремя", "details": str(error)},
+            status.HTTP_504_GATEWAY_TIMEOUT,
+            {},
+        )
+    if isinstance(error, LLMBadResponse):
+        return (
+            {"error": "Некорректный ответ от OpenRouter", "details": str(error)},
+            status.HTTP_502_BAD_GATEWAY,
+            {},
+        )
+    return (
+        {"error": "Ошибка запроса к OpenRouter", "details": str(error)},
+        status.HTTP_502_BAD_GATEWAY,
+        {},
+    )
 
 
 class OpenRouterView(GenericAPIView):
     """
-    AI-Бухгалтер Кыргызстана с временной историей в RAM
+    AI-Бухгалтер Кыргызстана: история диалога в ChatMessage, в модель уходит ограниченный контекст
     """
     permission_classes = [IsAuthenticated]
     throttle_classes = [ScopedRateThrottle]
@@ -32,67 +66,18 @@ class OpenRouterView(GenericAPIView):
 
         session, _ = ChatSession.objects.get_or_create(
             session_id=session_id
-        )  
-
-        history = session.history
-
-        # Формируем сообщения для модели
-        messages = [
-            {
-                "role": "system",
-                "content": (
-                    "Ты профессиональный бухгалтер Кыргызстана с опытом более 15 лет. "
-                    "Специализируешься на ИП и ОсОО. Отлично знаешь налоговое законодательство КР, "
-                    "ГНС, отчетность, Единый налог, НДС, подоходный налог, соцфонд, страховые взносы, "
-                    "ЭСФ, ЭТТН и электронные сервисы налоговой. "
-                    "Отвечай структурировано, профессионально и строго по законам КР. "
-                    "Если данных недостаточно — задай уточняющий вопрос."
-                )
-            }
-        ]
-
-        # Добавляем историю
-        messages.extend(history)
-
-        # Добавляем текущее сообщение пользователя
-        messages.append({"role": "user", "content": message})
-
-        payload = {
-            "model": MODEL_NAME,
-            "messages": messages,
-            "temperature": 0.2
-        }
-
-        headers = {
-            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        )
 
-        try:
-            response = requests.post(
-                OPENROUTER_URL,
-                headers=headers,
-                json=payload,
-                timeout=60
-            )
-            response.raise_for_status()
-        except requests.RequestException as e:
-            return Response(
-                {"error": "Ошибка запроса к OpenRouter", "details": str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        messages = build_context(session, message)
 
+        client = get_llm_client()
         try:
-            data = response.json()
-            assistant_reply = data["choices"][0]["message"]["content"]
-        except (KeyError, IndexError, ValueError):
-            return Response(
-                {"error": "Некорректный ответ от OpenRouter", "raw": data},
-                status=status.HTTP_502_BAD_GATEWAY
-            )
+            assistant_reply = client.chat_completion(messages, user_id=request.user.pk, temperature=0.2)
+        except LLMError as e:
+            body, status_code, headers = llm_error_response(e, client)
+            return Response(body, status=status_code, headers=headers)
 
-        session.append_message("user", message)
-        session.append_message("assistant", assistant_reply)
+        session.append_messages(("user", message), ("assistant", assistant_reply))
 
         return Response(
             {
@@ -101,3 +86,107 @@ class OpenRouterView(GenericAPIView):
             },
             status=status.HTTP_200_OK
         )
+
+    @classmethod
+    def check_request(cls, django_request):
+        """
+        Аутентификация, права, троттлинг и валидация тела как у post(), без вызова модели.
+        Возвращает (user, message, session_id) или готовый ответ с ошибкой.
+        """
+        view = cls()
+        view.args, view.kwargs = (), {}
+        view.headers = view.default_response_headers
+        request = view.initialize_request(django_request)
+        view.request = request
+        try:
+            view.initial(request)
+            serializer = view.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+        except Exception as exc:
+            response = view.finalize_response(request, view.handle_exception(exc))
+            return response.render()
+        data = serializer.validated_data
+        return request.user, data["message"], data["session_id"]
+
+
+def _prepare_stream(session_id, message):
+    session, _ = ChatSession.objects.get_or_create(session_id=session_id)
+    return session, build_context(session, message)
+
+
+def _save_exchange(session, message, assistant_reply):
+    session.append_messages(("user", message), ("assistant", assistant_reply))
+
+
+def _sse(data, event=None):
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n" if event else f"data: {payload}\n\n"
+
+
+class OpenRouterStreamView(View):
+    """
+    Потоковая (SSE) версия consult/: части ответа отправляются по мере генерации.
+    Асинхронное представление - под ASGI (config.asgi) не занимает поток на время генерации.
+    Ответ ассистента сохраняется в сессию только после полного завершения потока.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Аутентификация по JWT, как у DRF-представлений: CSRF не нужен
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def post(self, request):
+        checked = await sync_to_async(OpenRouterView.check_request)(request)
+        if not isinstance(checked, tuple):
+            return checked
+        user, message, session_id = checked
+
+        session, messages = await sync_to_async(_prepare_stream)(session_id, message)
+
+        client = get_llm_client()
+        try:
+            stream = await client.astream_chat_completion(messages, user_id=user.pk, temperature=0.2)
+        except LLMError as e:
+            body, status_code, headers = llm_error_response(e, client)
+            return JsonResponse(body, status=status_code, headers=headers, json_dumps_params={"ensure_ascii": False})
+
+        response = StreamingHttpResponse(
+            self.events(client, stream, session, message, session_id),
+            content_type="text/event-stream; charset=utf-8",
+        )
+        response["Cache-Control"] = "no-cache"
+        # Отключает буферизацию ответа в nginx
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def events(self, client, stream, session, message, session_id):
+        try:
+            async for delta in stream:
+                yield _sse({"delta": delta})
+        except LLMError as e:
+            body, status_code, _ = llm_error_response(e, client)
+            yield _sse({**body, "status": status_code}, event="error")
+            return
+        finally:
+            # Клиент отключился или ошибка: закрываем поток к OpenRouter, освобождаем слот
+            await stream.aclose()
+
+        await sync_to_async(_save_exchange)(session, message, stream.text)
+        yield _sse(
+            {
+                "session_id": session_id,
+                "ttft_ms": round(stream.ttft * 1000) if stream.ttft is not None else None,
+                "duration_ms": round(stream.duration * 1000),
+            },
+            event="done",
+        )
+
+
+class LLMMetricsView(GenericAPIView):
+    """
+    Метрики клиента LLM в текущем процессе (только для администраторов)
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_llm_client().get_metrics())
@@ -30,6 +30,26 @@ OPENROUTER_API_KEY = env('OPENROUTER_API_KEY')
 ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', default=[])
 REDIS_URL = env('REDIS_URL', default='')  # Stage 4: e.g. redis://127.0.0.1:6379/1
 DASHBOARD_CACHE_TTL = 45  # Stage 4: seconds (30–60)
+FINANCE_CLOSED_PERIOD_MAX_AGE = 86400  # seconds: browser cache for analytics of periods ended before today
+AI_VALIDATION_WORKERS = 2  # threads per process running AI tax report validation jobs
+AI_VALIDATION_JOB_TIMEOUT = 300  # seconds without progress before a job counts as interrupted
+AI_VALIDATION_ALWAYS_ESCALATE = env.bool('AI_VALIDATION_ALWAYS_ESCALATE', default=False)  # LLM check even when the rule validator is conclusive
+AI_VALIDATION_VAT_WARNING_SHARE = 0.9  # year-to-date turnover share of VAT_THRESHOLD that is flagged
+TAX_REPORT_FILE_RETENTION = 3600  # seconds an outdated report CSV stays downloadable before cleanup
+OPENROUTER_URL = env('OPENROUTER_URL', default='https://openrouter.ai/api/v1/chat/completions')
+LLM_MODEL = env('LLM_MODEL', default='stepfun/step-3.5-flash:free')
+LLM_MAX_CONCURRENCY = 8  # LLM requests in flight per process (also the HTTP connection pool size)
+LLM_MAX_CONCURRENCY_PER_USER = 2
+LLM_DEADLINE = 45  # seconds per LLM call, including queueing and retries
+LLM_MAX_RETRIES = 2  # retries on 429 / 5xx / network errors
+LLM_STREAM_IDLE_TIMEOUT = 30  # seconds between chunks of a streamed reply before giving up
+LLM_BREAKER_FAILURES = 5  # consecutive upstream failures that open the circuit
+LLM_BREAKER_COOLDOWN = 30  # seconds the circuit stays open before a probe request
+AI_CHAT_CONTEXT_TOKENS = 4000  # estimated prompt tokens per chat turn: system prompt + summary + recent turns
+AI_CHAT_SUMMARY_TOKENS = 600  # part of the budget for the rolling summary of older turns
+IDEMPOTENCY_TTL = 86400  # seconds a response to a request with Idempotency-Key is replayed
+IDEMPOTENCY_LOCK_TTL = 120  # seconds a running request holds its key (longer than any request)
+IDEMPOTENCY_WAIT = 10  # seconds a concurrent duplicate waits for the first response before 409
 
 
 SECURE_BROWSER_XSS_FILTER = True
@@ -125,6 +145,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.idempotency.IdempotencyMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -24,6 +24,8 @@ from rest_framework_simplejwt.views import (
 )
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
+from core.views import IdempotencyMetricsView
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -48,6 +50,7 @@ urlpatterns = [
     path('api/', include('activities.urls')),
     path("api/aichat/", include("aichat.urls")),
     path("api/tax/", include("tax_reports.urls")),
+    path("api/idempotency/metrics/", IdempotencyMetricsView.as_view(), name="idempotency-metrics"),
 
 
 ]
@@ -0,0 +1,179 @@
+"""
+Local fake of the OpenRouter chat completions endpoint for tests and benchmarks.
+
+Answers POST requests in the OpenAI response shape (or as an SSE stream when the payload has
+"stream": true) and can inject errors and rate limiting. Timing models a generating model:
+the first token comes after `latency`, each next chunk after `chunk_delay`; a non-streamed
+answer is sent once the whole reply would have been generated.
+
+    python -m core.fake_openrouter --port 8765 --latency 0.2 --error-rate 0.1
+
+or in-process:
+
+    server = start_fake_openrouter(latency=0.05)
+    ... LLMClient(url=server.url) ...
+    server.shutdown()
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOpenRouterServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, latency=0.0, error_rate=0.0, error_status=500, rate_limit=None,
+                 reply="Тестовый ответ", chunks=8, chunk_delay=0.0):
+        super().__init__(address, FakeOpenRouterHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        # Max requests per second before answering 429 (None - unlimited)
+        self.rate_limit = rate_limit
+        self.reply = reply
+        self.chunks = chunks
+        self.chunk_delay = chunk_delay
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.concurrent = 0
+        self.max_concurrent = 0
+        self._window = []
+
+    def handle_error(self, request, client_address):
+        # Clients that gave up (deadline exceeded) close the socket mid-response
+        pass
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/v1/chat/completions"
+
+    def rate_limited(self):
+        if self.rate_limit is None:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            self._window = [t for t in self._window if now - t < 1.0]
+            if len(self._window) >= self.rate_limit:
+                return True
+            self._window.append(now)
+            return False
+
+
+class FakeOpenRouterHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, server, model):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        reply = server.reply
+        size = max(1, -(-len(reply) // server.chunks))
+        for start in range(0, len(reply), size):
+            if start and server.chunk_delay:
+                time.sleep(server.chunk_delay)
+            chunk = {
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": reply[start:start + size]}}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            payload = {}
+
+        with server.lock:
+            server.requests += 1
+            server.concurrent += 1
+            server.max_concurrent = max(server.max_concurrent, server.concurrent)
+        try:
+            if server.rate_limited():
+                self._send_json(429, {"error": {"message": "Rate limit exceeded"}}, {"Retry-After": "1"})
+                return
+            if server.latency:
+                time.sleep(server.latency)
+            if server.error_rate and random.random() < server.error_rate:
+                self._send_json(server.error_status, {"error": {"message": "Upstream error"}})
+                return
+            model = payload.get("model", "fake")
+            if payload.get("stream"):
+                self._stream(server, model)
+                return
+            if server.chunk_delay:
+                time.sleep(server.chunk_delay * (server.chunks - 1))
+            self._send_json(200, {
+                "id": f"fake-{server.requests}",
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": server.reply}}],
+            })
+        finally:
+            with server.lock:
+                server.concurrent -= 1
+
+
+def start_fake_openrouter(host="127.0.0.1", port=0, **options):
+    """Start the fake server in a daemon thread; port=0 picks a free port (see server.url)."""
+    server = FakeOpenRouterServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True, name="fake-openrouter").start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenRouter chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before the first token")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with an error")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--rate-limit", type=int, help="Requests per second before 429")
+    parser.add_argument("--chunks", type=int, default=8, help="Chunks per streamed reply")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Seconds between chunks")
+    args = parser.parse_args()
+
+    server = FakeOpenRouterServer(
+        (args.host, args.port),
+        latency=args.latency,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        rate_limit=args.rate_limit,
+        chunks=args.chunks,
+        chunk_delay=args.chunk_delay,
+    )
+    print(f"Fake OpenRouter listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,306 @@
 """
-Stage 2: idempotency support (stub).
-TODO: detect Idempotency-Key header, check store (e.g. Redis/cache), return cached
-response for duplicate POST/PATCH or allow request and cache response.
+Idempotent retries of unsafe API requests (Idempotency-Key header).
+
+A POST/PUT/PATCH/DELETE with an Idempotency-Key is scoped to (user, method, path, key) and
+fingerprinted by a hash of its body (for multipart uploads: of the form fields and the
+uploaded files' contents). The first request takes an in-flight lock in the cache
+(cache.add) and runs; its response is stored for IDEMPOTENCY_TTL seconds and replayed, marked
+with "Idempotent-Replayed: true", for later requests with the same scope and body. A duplicate
+that arrives while the first one is still running waits up to IDEMPOTENCY_WAIT seconds for the
+stored response and gets 409 if it is not ready; the same key with a different body gets 422.
+
+Responses a retry may change (5xx, 401, 403, 408, 409, 425, 429) and streaming responses are
+not stored: the lock is released and the next retry runs the view again.
+
+The user is resolved without running the view: the session user or the JWT from the
+Authorization header (signature checked, no DB query). Anonymous requests and requests without
+the header pass through untouched. The lock and the replay work across processes only with a
+shared cache (Redis in production).
 """
 
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+IDEMPOTENT_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+HEADER = "HTTP_IDEMPOTENCY_KEY"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+NOT_STORED_STATUSES = frozenset({401, 403, 408, 409, 425, 429})
+POLL_INTERVAL = 0.05
+
+CACHE_PREFIX = "idempotency:"
+METRICS_PREFIX = "idempotency:metrics:"
+METRIC_KEYS = ("requests", "executed", "stored", "replayed", "waited", "conflicts", "mismatches")
+
+_jwt_auth = JWTAuthentication()
+
+
+def _jwt_user_id(request):
+    header = _jwt_auth.get_header(request)
+    raw_token = _jwt_auth.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        token = _jwt_auth.get_validated_token(raw_token)
+    except (InvalidToken, TokenError):
+        return None
+    return token.get(jwt_settings.USER_ID_CLAIM)
+
+
+def _fingerprint(request):
+    digest = hashlib.sha256(request.META.get("QUERY_STRING", "").encode())
+    digest.update(b"\0")
+    if request.META.get("CONTENT_TYPE", "").startswith("multipart/"):
+        # Parsed by the upload handlers (large files spill to disk) and hashed chunk by chunk:
+        # request.body would load the whole upload and trip DATA_UPLOAD_MAX_MEMORY_SIZE.
+        # DRF reuses the parsed request.POST / request.FILES.
+        for name, values in sorted(request.POST.lists()):
+            digest.update(json.dumps([name, values]).encode())
+        for name, uploads in sorted(request.FILES.lists()):
+            for upload in uploads:
+                digest.update(json.dumps([name, upload.name, upload.size]).encode())
+                for chunk in upload.chunks():
+                    digest.update(chunk)
+                upload.seek(0)
+    else:
+        digest.update(request.body)
+    return digest.hexdigest()
+
+
+def _scope_key(user_id, request, key):
+    scope = json.dumps([str(user_id), request.method, request.path, key])
+    return CACHE_PREFIX + hashlib.sha256(scope.encode()).hexdigest()
+
+
+def _is_storable(response):
+    return not response.streaming and response.status_code < 500 and response.status_code not in NOT_STORED_STATUSES
+
+
+def _serialize(response, fingerprint):
+    return {
+        "fingerprint": fingerprint,
+        "status": response.status_code,
+        "headers": list(response.items()),
+        "content": response.content,
+    }
+
+
+def _replay(stored):
+    response = HttpResponse(stored["content"], status=stored["status"])
+    for name, value in stored["headers"]:
+        response[name] = value
+    response[REPLAYED_HEADER] = "true"
+    return response
+
+
+def _mismatch_response():
+    return JsonResponse(
+        {"detail": "Idempotency-Key уже использован для запроса с другими параметрами"},
+        status=422,
+        json_dumps_params={"ensure_ascii": False},
+    )
+
+
+def _conflict_response():
+    response = JsonResponse(
+        {"detail": "Запрос с этим Idempotency-Key еще выполняется, повторите позже"},
+        status=409,
+        json_dumps_params={"ensure_ascii": False},
+    )
+    response["Retry-After"] = "1"
+    return response
+
+
+def _invalid_key_response():
+    return JsonResponse(
+        {"detail": f"Idempotency-Key должен быть не длиннее {MAX_KEY_LENGTH} символов"},
+        status=400,
+        json_dumps_params={"ensure_ascii": False},
+    )
+
+
+def _incr(name):
+    key = METRICS_PREFIX + name
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add and incr
+        cache.set(key, 1, timeout=None)
+
+
+async def _aincr(name):
+    key = METRICS_PREFIX + name
+    await cache.aadd(key, 0, timeout=None)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, 1, timeout=None)
+
+
+def _release(lock_key, token):
+    lock = cache.get(lock_key)
+    # The lock may have expired and been taken by a duplicate: leave that one alone
+    if lock is not None and lock["token"] == token:
+        cache.delete(lock_key)
+
+
+async def _arelease(lock_key, token):
+    lock = await cache.aget(lock_key)
+    if lock is not None and lock["token"] == token:
+        await cache.adelete(lock_key)
+
+
+def get_idempotency_metrics():
+    """Counters since the cache was last cleared (shared by all workers)."""
+    values = cache.get_many([METRICS_PREFIX + name for name in METRIC_KEYS])
+    counters = {name: values.get(METRICS_PREFIX + name, 0) for name in METRIC_KEYS}
+    requests = counters["requests"]
+    counters["replay_share"] = round(counters["replayed"] / requests, 4) if requests else None
+    return counters
+
 
 class IdempotencyMiddleware:
     """
-    Stub middleware for idempotent requests.
-    When implemented: look for Idempotency-Key header on POST/PUT/PATCH,
-    check cache/store; if key seen, return cached response; else allow request
-    and cache response by key (with TTL).
+    Replays the stored response of an already executed request with the same Idempotency-Key.
+    Works in both sync and async request chains (the SSE chat view is async).
     """
 
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _idempotency_key(request):
+        if request.method not in IDEMPOTENT_METHODS:
+            return None
+        return request.META.get(HEADER) or None
 
     def __call__(self, request):
-        return self.get_response(request)
+        if self.is_async:
+            return self.__acall__(request)
+        key = self._idempotency_key(request)
+        if key is None:
+            return self.get_response(request)
+        user = getattr(request, "user", None)
+        user_id = user.pk if user is not None and user.is_authenticated else _jwt_user_id(request)
+        if user_id is None:
+            return self.get_response(request)
+        if len(key) > MAX_KEY_LENGTH:
+            return _invalid_key_response()
+
+        _incr("requests")
+        fingerprint = _fingerprint(request)
+        scope = _scope_key(user_id, request, key)
+        lock_key = scope + ":lock"
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+        waited = False
+        while True:
+            stored = cache.get(scope)
+            if stored is not None:
+                if stored["fingerprint"] != fingerprint:
+                    _incr("mismatches")
+                    return _mismatch_response()
+                _incr("replayed")
+                if waited:
+                    _incr("waited")
+                return _replay(stored)
+
+            token = uuid.uuid4().hex
+            if cache.add(lock_key, {"fingerprint": fingerprint, "token": token}, settings.IDEMPOTENCY_LOCK_TTL):
+                # The first request may have stored its response and released the lock
+                # between our read and add: replay it instead of running the view again
+                if cache.get(scope) is None:
+                    break
+                _release(lock_key, token)
+                continue
+            lock = cache.get(lock_key)
+            if lock is not None and lock["fingerprint"] != fingerprint:
+                _incr("mismatches")
+                return _mismatch_response()
+            if time.monotonic() >= deadline:
+                _incr("conflicts")
+                return _conflict_response()
+            # The first request is still running: wait for its stored response
+            waited = True
+            time.sleep(POLL_INTERVAL)
+
+        try:
+            _incr("executed")
+            response = self.get_response(request)
+            if _is_storable(response):
+                cache.set(scope, _serialize(response, fingerprint), settings.IDEMPOTENCY_TTL)
+                _incr("stored")
+            return response
+        finally:
+            _release(lock_key, token)
+
+    async def __acall__(self, request):
+        key = self._idempotency_key(request)
+        if key is None:
+            return await self.get_response(request)
+        user = await request.auser()
+        user_id = user.pk if user.is_authenticated else _jwt_user_id(request)
+        if user_id is None:
+            return await self.get_response(request)
+        if len(key) > MAX_KEY_LENGTH:
+            return _invalid_key_response()
+
+        await _aincr("requests")
+        fingerprint = _fingerprint(request)
+        scope = _scope_key(user_id, request, key)
+        lock_key = scope + ":lock"
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+        waited = False
+        while True:
+            stored = await cache.aget(scope)
+            if stored is not None:
+                if stored["fingerprint"] != fingerprint:
+                    await _aincr("mismatches")
+                    return _mismatch_response()
+                await _aincr("replayed")
+                if waited:
+                    await _aincr("waited")
+                return _replay(stored)
+
+            token = uuid.uuid4().hex
+            if await cache.aadd(lock_key, {"fingerprint": fingerprint, "token": token}, settings.IDEMPOTENCY_LOCK_TTL):
+                if await cache.aget(scope) is None:
+                    break
+                await _arelease(lock_key, token)
+                continue
+            lock = await cache.aget(lock_key)
+            if lock is not None and lock["fingerprint"] != fingerprint:
+                await _aincr("mismatches")
+                return _mismatch_response()
+            if time.monotonic() >= deadline:
+                await _aincr("conflicts")
+                return _conflict_response()
+            waited = True
+            await asyncio.sleep(POLL_INTERVAL)
+
+        try:
+            await _aincr("executed")
+            response = await self.get_response(request)
+            if _is_storable(response):
+                await cache.aset(scope, _serialize(response, fingerprint), settings.IDEMPOTENCY_TTL)
+                await _aincr("stored")
+            return response
+        finally:
+            await _arelease(lock_key, token)
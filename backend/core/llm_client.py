@@ -0,0 +1,613 @@
+"""
+Shared client for the OpenRouter chat completions API (used by aichat and tax_reports).
+
+- one pooled keep-alive requests.Session per process;
+- concurrency caps: a global semaphore and one per user, waited on within the call's deadline;
+- one total deadline per call that covers queueing, all attempts and backoff sleeps;
+- retries with full-jitter exponential backoff on 429 / 5xx / network errors (Retry-After honoured);
+- a circuit breaker: after LLM_BREAKER_FAILURES consecutive upstream failures calls fail fast
+  for LLM_BREAKER_COOLDOWN seconds, then a single probe decides whether to close it again;
+- in-process metrics: counters, in-flight / queued gauges, latency, time-to-first-token and
+  queue-wait percentiles.
+
+chat_completion() is blocking (requests); astream_chat_completion() streams reply tokens on the
+running event loop (aiohttp) and shares the same caps, breaker and metrics.
+
+Tests and benchmarks can point OPENROUTER_URL (or LLMClient(url=...)) at core.fake_openrouter.
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+
+import aiohttp
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+CONNECT_TIMEOUT = 5.0
+LATENCY_WINDOW = 1000
+SLOT_POLL_INTERVAL = 0.02
+STREAM_DONE = object()
+
+
+class LLMError(Exception):
+    """Base error of the LLM client."""
+
+
+class LLMUnavailable(LLMError):
+    """Call was not sent: circuit open or no free concurrency slot before the deadline."""
+
+
+class LLMTimeout(LLMError):
+    """Deadline exceeded while waiting for the upstream."""
+
+
+class LLMUpstreamError(LLMError):
+    """Upstream answered with an error status (after retries)."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LLMBadResponse(LLMError):
+    """Upstream answered 200 with an unexpected body."""
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold, cooldown):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a request may be sent now (in half-open state only one probe at a time)."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """Free the half-open probe slot of an attempt that ended without an outcome (cancelled, crashed)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def retry_after(self):
+        """Seconds until the next probe is allowed (0 if not open)."""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+
+def _percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    ordered = sorted(values)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 1)
+
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(ordered[-1] * 1000, 1)}
+
+
+class LLMMetrics:
+    """Thread-safe in-process counters and latency windows."""
+
+    COUNTERS = (
+        "calls", "succeeded", "failed", "attempts", "retries",
+        "rejected_circuit_open", "rejected_queue_timeout", "timeouts",
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.in_flight = 0
+        self.queued = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.ttfts = deque(maxlen=LATENCY_WINDOW)
+        self.queue_waits = deque(maxlen=LATENCY_WINDOW)
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def gauge(self, name, delta):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + delta)
+
+    def observe(self, latency=None, ttft=None, queue_wait=None):
+        with self._lock:
+            if latency is not None:
+                self.latencies.append(latency)
+            if ttft is not None:
+                self.ttfts.append(ttft)
+            if queue_wait is not None:
+                self.queue_waits.append(queue_wait)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                **self.counters,
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "latency_ms": _percentiles(self.latencies),
+                "ttft_ms": _percentiles(self.ttfts),
+                "queue_wait_ms": _percentiles(self.queue_waits),
+            }
+
+
+class LLMClient:
+    """Chat completions client; use get_llm_client() for the shared per-process instance."""
+
+    def __init__(
+        self,
+        url=None,
+        api_key=None,
+        model=None,
+        max_concurrency=None,
+        max_concurrency_per_user=None,
+        deadline=None,
+        max_retries=None,
+        breaker_failures=None,
+        breaker_cooldown=None,
+        stream_idle_timeout=None,
+    ):
+        self.url = url or settings.OPENROUTER_URL
+        self.api_key = api_key if api_key is not None else settings.OPENROUTER_API_KEY
+        self.model = model or settings.LLM_MODEL
+        self.max_concurrency = max_concurrency or settings.LLM_MAX_CONCURRENCY
+        self.max_concurrency_per_user = max_concurrency_per_user or settings.LLM_MAX_CONCURRENCY_PER_USER
+        self.deadline = deadline or settings.LLM_DEADLINE
+        self.max_retries = settings.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.stream_idle_timeout = stream_idle_timeout or settings.LLM_STREAM_IDLE_TIMEOUT
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        })
+
+        self._global_slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._user_slots = weakref.WeakValueDictionary()
+        self._user_slots_lock = threading.Lock()
+        self.breaker = CircuitBreaker(
+            breaker_failures or settings.LLM_BREAKER_FAILURES,
+            breaker_cooldown or settings.LLM_BREAKER_COOLDOWN,
+        )
+        self.metrics = LLMMetrics()
+        # aiohttp sessions are bound to an event loop: one pooled session per loop
+        self._stream_sessions = weakref.WeakKeyDictionary()
+
+    def get_metrics(self):
+        return {
+            **self.metrics.snapshot(),
+            "circuit_state": self.breaker.state,
+            "max_concurrency": self.max_concurrency,
+            "max_concurrency_per_user": self.max_concurrency_per_user,
+        }
+
+    def _user_semaphore(self, user_id):
+        with self._user_slots_lock:
+            semaphore = self._user_slots.get(user_id)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.max_concurrency_per_user)
+                self._user_slots[user_id] = semaphore
+            return semaphore
+
+    def _semaphores(self, user_id):
+        semaphores = [self._global_slots]
+        if user_id is not None:
+            semaphores.insert(0, self._user_semaphore(user_id))
+        return semaphores
+
+    def _release(self, acquired):
+        self.metrics.gauge("in_flight", -1)
+        for semaphore in acquired:
+            semaphore.release()
+
+    def _acquire(self, user_id, deadline_at):
+        """Take a per-user slot (if user_id) and a global slot; raise LLMUnavailable at the deadline."""
+        acquired = []
+        started = time.monotonic()
+        self.metrics.gauge("queued", 1)
+        try:
+            for semaphore in self._semaphores(user_id):
+                if not semaphore.acquire(timeout=max(0.0, deadline_at - time.monotonic())):
+                    self.metrics.incr("rejected_queue_timeout")
+                    raise LLMUnavailable("Too many concurrent AI requests, try again later")
+                acquired.append(semaphore)
+        except BaseException:
+            for semaphore in acquired:
+                semaphore.release()
+            raise
+        finally:
+            self.metrics.gauge("queued", -1)
+        self.metrics.observe(queue_wait=time.monotonic() - started)
+        self.metrics.gauge("in_flight", 1)
+        return acquired
+
+    async def _aacquire(self, user_id, deadline_at):
+        """_acquire() for the event loop: polls the same semaphores instead of blocking the loop."""
+        acquired = []
+        started = time.monotonic()
+        self.metrics.gauge("queued", 1)
+        try:
+            for semaphore in self._semaphores(user_id):
+                while not semaphore.acquire(blocking=False):
+                    if time.monotonic() >= deadline_at:
+                        self.metrics.incr("rejected_queue_timeout")
+                        raise LLMUnavailable("Too many concurrent AI requests, try again later")
+                    await asyncio.sleep(SLOT_POLL_INTERVAL)
+                acquired.append(semaphore)
+        except BaseException:
+            for semaphore in acquired:
+                semaphore.release()
+            raise
+        finally:
+            self.metrics.gauge("queued", -1)
+        self.metrics.observe(queue_wait=time.monotonic() - started)
+        self.metrics.gauge("in_flight", 1)
+        return acquired
+
+    @contextmanager
+    def _slot(self, user_id, deadline_at):
+        acquired = self._acquire(user_id, deadline_at)
+        try:
+            yield
+        finally:
+            self._release(acquired)
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+    @staticmethod
+    def _retry_after(headers):
+        try:
+            return float(headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return None
+
+    @contextmanager
+    def _attempt(self, deadline_at):
+        """
+        Deadline and breaker checks before sending; yields the remaining seconds.
+
+        The deadline is checked first, so a call out of time never takes the half-open probe.
+        Once allowed, the probe slot is freed on any exit - an attempt cancelled mid-request
+        (client disconnect) or failing unexpectedly records no outcome and would otherwise keep
+        the breaker half-open with a probe "in flight" forever.
+        """
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            self.metrics.incr("timeouts")
+            raise LLMTimeout("AI request deadline exceeded")
+        if not self.breaker.allow():
+            self.metrics.incr("rejected_circuit_open")
+            raise LLMUnavailable("AI service is temporarily unavailable, try again later")
+        self.metrics.incr("attempts")
+        try:
+            yield remaining
+        finally:
+            self.breaker.release_probe()
+
+    def _check_status(self, status_code, headers):
+        """Record the outcome in the breaker; None on success, else (error, retry_after)."""
+        if status_code < 400:
+            self.breaker.record_success()
+            return None
+        # 429 is our quota, not upstream health: retry it without tripping the breaker
+        if status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        error = LLMUpstreamError(f"AI service responded with HTTP {status_code}", status_code=status_code)
+        if status_code not in RETRY_STATUSES:
+            raise error
+        return error, self._retry_after(headers) if status_code == 429 else None
+
+    def _retry_delay(self, attempt, error, retry_after, deadline_at):
+        """Backoff before the next attempt, or raise error if out of retries or time."""
+        delay = self._backoff(attempt, retry_after)
+        if attempt >= self.max_retries or time.monotonic() + delay >= deadline_at:
+            if isinstance(error, LLMTimeout):
+                self.metrics.incr("timeouts")
+            raise error
+        self.metrics.incr("retries")
+        return delay
+
+    def _send(self, payload, deadline_at):
+        """POST with retries inside the deadline. Returns a successful requests.Response."""
+        attempt = 0
+        while True:
+            retry_after = None
+            with self._attempt(deadline_at) as remaining:
+                try:
+                    response = self.session.post(
+                        self.url,
+                        json=payload,
+                        timeout=(min(CONNECT_TIMEOUT, remaining), remaining),
+                    )
+                except requests.Timeout:
+                    self.breaker.record_failure()
+                    error = LLMTimeout("AI service did not answer in time")
+                except requests.RequestException as e:
+                    self.breaker.record_failure()
+                    error = LLMUpstreamError(f"AI service request failed: {e}")
+                else:
+                    if response.status_code >= 400:
+                        response.close()
+                    failure = self._check_status(response.status_code, response.headers)
+                    if failure is None:
+                        return response
+                    error, retry_after = failure
+
+            time.sleep(self._retry_delay(attempt, error, retry_after, deadline_at))
+            attempt += 1
+
+    def _stream_session(self):
+        loop = asyncio.get_running_loop()
+        session = self._stream_sessions.get(loop)
+        if session is None or session.closed:
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                },
+            )
+            self._stream_sessions[loop] = session
+        return session
+
+    async def aclose(self):
+        """Close the streaming session of the running event loop."""
+        session = self._stream_sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+
+    async def _asend(self, payload, deadline_at):
+        """_send() on the event loop; returns an aiohttp response whose headers have arrived."""
+        session = self._stream_session()
+        attempt = 0
+        while True:
+            retry_after = None
+            with self._attempt(deadline_at) as remaining:
+                try:
+                    response = await asyncio.wait_for(
+                        session.post(
+                            self.url,
+                            json=payload,
+                            timeout=aiohttp.ClientTimeout(
+                                sock_connect=min(CONNECT_TIMEOUT, remaining),
+                                sock_read=self.stream_idle_timeout,
+                            ),
+                        ),
+                        remaining,
+                    )
+                except asyncio.TimeoutError:
+                    self.breaker.record_failure()
+                    error = LLMTimeout("AI service did not answer in time")
+                except aiohttp.ClientError as e:
+                    self.breaker.record_failure()
+                    error = LLMUpstreamError(f"AI service request failed: {e}")
+                else:
+                    if response.status >= 400:
+                        response.release()
+                    failure = self._check_status(response.status, response.headers)
+                    if failure is None:
+                        return response
+                    error, retry_after = failure
+
+            await asyncio.sleep(self._retry_delay(attempt, error, retry_after, deadline_at))
+            attempt += 1
+
+    def _payload(self, messages, temperature, model, stream=False):
+        payload = {
+            "model": model or self.model,
+            "messages": messages,
+            "temperature": temperature,
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def chat_completion(self, messages, user_id=None, temperature=0.2, deadline=None, model=None):
+        """
+        Send messages and return the assistant's reply text.
+
+        Args:
+            messages: [{"role": ..., "content": ...}]
+            user_id: caller for the per-user concurrency cap (None - global cap only)
+            deadline: total seconds for queueing + attempts + backoff (default LLM_DEADLINE)
+
+        Raises:
+            LLMUnavailable, LLMTimeout, LLMUpstreamError, LLMBadResponse
+        """
+        started = time.monotonic()
+        deadline_at = started + (deadline or self.deadline)
+        self.metrics.incr("calls")
+        try:
+            with self._slot(user_id, deadline_at):
+                response = self._send(self._payload(messages, temperature, model), deadline_at)
+            try:
+                content = response.json()["choices"][0]["message"]["content"]
+            except (KeyError, IndexError, TypeError, ValueError):
+                raise LLMBadResponse("Unexpected AI service response")
+        except LLMError:
+            self.metrics.incr("failed")
+            raise
+        self.metrics.incr("succeeded")
+        self.metrics.observe(latency=time.monotonic() - started)
+        return content
+
+    async def astream_chat_completion(self, messages, user_id=None, temperature=0.2, deadline=None, model=None):
+        """
+        Start a streamed completion and return an LLMStream of reply text deltas.
+
+        Returns once the upstream has accepted the request (status 200), so errors up to that
+        point - including retries - are raised here with the same exceptions as chat_completion().
+        The deadline covers only that part; afterwards each read may idle up to
+        LLM_STREAM_IDLE_TIMEOUT. The concurrency slots are held until the stream is closed.
+        """
+        started = time.monotonic()
+        deadline_at = started + (deadline or self.deadline)
+        self.metrics.incr("calls")
+        try:
+            acquired = await self._aacquire(user_id, deadline_at)
+        except LLMError:
+            self.metrics.incr("failed")
+            raise
+        try:
+            response = await self._asend(self._payload(messages, temperature, model, stream=True), deadline_at)
+        except BaseException as e:
+            self._release(acquired)
+            if isinstance(e, LLMError):
+                self.metrics.incr("failed")
+            raise
+        return LLMStream(self, response, acquired, started)
+
+
+class LLMStream:
+    """
+    Async iterator over the text deltas of a streamed completion (OpenAI SSE format).
+
+    Iterating to the end records the call as succeeded; errors while reading raise
+    LLMTimeout / LLMUpstreamError / LLMBadResponse. Always aclose() a stream that may be
+    abandoned early - it releases the connection and the concurrency slots.
+    """
+
+    def __init__(self, client, response, acquired, started):
+        self.client = client
+        self.response = response
+        self.started = started
+        self.ttft = None
+        self.duration = None
+        self._acquired = acquired
+        self._parts = []
+        self._closed = False
+
+    @property
+    def text(self):
+        return "".join(self._parts)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    def _parse(self, line):
+        """Delta text of one SSE line; None for comments, keep-alives and empty deltas, STREAM_DONE at the end."""
+        line = line.decode("utf-8").strip()
+        if not line.startswith("data:"):
+            return None
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return STREAM_DONE
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            raise LLMBadResponse("Unexpected AI service stream chunk")
+        if "error" in chunk:
+            raise LLMUpstreamError(f"AI service stream error: {chunk['error']}")
+        try:
+            return chunk["choices"][0]["delta"].get("content") or None
+        except (KeyError, IndexError, TypeError, AttributeError):
+            raise LLMBadResponse("Unexpected AI service stream chunk")
+
+    async def _iterate(self):
+        metrics = self.client.metrics
+        try:
+            async for line in self.response.content:
+                delta = self._parse(line)
+                if delta is STREAM_DONE:
+                    break
+                if delta is None:
+                    continue
+                if self.ttft is None:
+                    self.ttft = time.monotonic() - self.started
+                    metrics.observe(ttft=self.ttft)
+                self._parts.append(delta)
+                yield delta
+        except asyncio.TimeoutError:
+            metrics.incr("timeouts")
+            metrics.incr("failed")
+            await self.aclose()
+            raise LLMTimeout("AI service stream stalled")
+        except aiohttp.ClientError as e:
+            metrics.incr("failed")
+            await self.aclose()
+            raise LLMUpstreamError(f"AI service stream failed: {e}")
+        except LLMError:
+            metrics.incr("failed")
+            await self.aclose()
+            raise
+        self.duration = time.monotonic() - self.started
+        metrics.incr("succeeded")
+        metrics.observe(latency=self.duration)
+        await self.aclose()
+
+    async def aclose(self):
+        if self._closed:
+            return
+        self._closed = True
+        self.response.release()
+        self.client._release(self._acquired)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """Shared per-process LLMClient configured from settings."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient()
+    return _client
+
+
+def chat_completion(messages, **kwargs):
+    """Shortcut for get_llm_client().chat_completion(...)."""
+    return get_llm_client().chat_completion(messages, **kwargs)
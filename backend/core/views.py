@@ -0,0 +1,15 @@
+from rest_framework.generics import GenericAPIView
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from .idempotency import get_idempotency_metrics
+
+
+class IdempotencyMetricsView(GenericAPIView):
+    """
+    Счетчики запросов с Idempotency-Key: выполнено, повторено из кэша, конфликты (только для администраторов)
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_idempotency_metrics())
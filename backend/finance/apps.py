@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class FinanceConfig(AppConfig):
     name = 'finance'
+
+    def ready(self):
+        from finance import signals  # noqa: F401
@@ -13,6 +13,12 @@ ZERO = Decimal("0")
 DEFAULT_RECENT_TRANSACTIONS_LIMIT = 10
 DEFAULT_CATEGORY_BREAKDOWN_LIMIT = 10
 DEFAULT_ANALYTICS_DAYS = 365
+MAX_TIME_SERIES_POINTS = 3700  # ~10 years of daily points
+MAX_COMPARISON_PERIODS = 24
+
+# Bulk import
+BULK_MAX_ROWS = 5000
+BULK_CREATE_BATCH_SIZE = 500
 
 # Preset periods (days)
 PRESET_WEEK_DAYS = 7
@@ -22,4 +28,6 @@ PRESET_YEAR_DAYS = 365
 # Date formats
 DATE_FORMAT = '%Y-%m-%d'
 MONTH_FORMAT = '%Y-%m'
+WEEK_FORMAT = '%G-W%V'  # ISO week, e.g. 2025-W07
+QUARTER_FORMAT = '{year}-Q{quarter}'
 YEAR_FORMAT = '%Y'
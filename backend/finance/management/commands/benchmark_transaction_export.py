@@ -0,0 +1,82 @@
+import resource
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from finance.models import Transaction
+from finance.services.export_service import iter_transactions_csv, write_transactions_xlsx
+
+GENERATE_BATCH_SIZE = 5000
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер памяти и времени экспорта транзакций: создает N синтетических транзакций '
+        'во временной транзакции БД (откатывается), экспортирует их и печатает пиковый RSS. '
+        'Запускать отдельным процессом для каждого N (например, 10000 и 1000000).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--file-format', choices=['csv', 'xlsx'], default='csv')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options['rows'], options['file_format'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, rows, file_format):
+        user = get_user_model().objects.create_user(email='export-benchmark@example.invalid')
+        start_day = date(2020, 1, 1)
+        for offset in range(0, rows, GENERATE_BATCH_SIZE):
+            Transaction.objects.bulk_create([
+                Transaction(
+                    user=user,
+                    amount=Decimal(i % 100000 + 1) / 100,
+                    transaction_type='income' if i % 3 else 'expense',
+                    payment_method='cash' if i % 2 else 'non_cash',
+                    transaction_date=start_day + timedelta(days=i % 2000),
+                    is_business=False,
+                    description=f'benchmark {i}',
+                )
+                for i in range(offset, min(offset + GENERATE_BATCH_SIZE, rows))
+            ])
+        queryset = Transaction.objects.filter(user=user).order_by('-transaction_date', '-created_at', '-id')
+
+        rss_before = _peak_rss_mb()
+        tracemalloc.start()
+        started = time.perf_counter()
+        size = 0
+        if file_format == 'csv':
+            for chunk in iter_transactions_csv(queryset):
+                size += len(chunk.encode())
+        else:
+            with write_transactions_xlsx(queryset) as output:
+                output.seek(0, 2)
+                size = output.tell()
+        elapsed = time.perf_counter() - started
+        _, heap_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.stdout.write(
+            f'rows={rows} format={file_format} time={elapsed:.2f}s size={size / 1024 / 1024:.1f}MB '
+            f'peak_rss_before={rss_before:.1f}MB peak_rss_after={_peak_rss_mb():.1f}MB '
+            f'python_heap_peak={heap_peak / 1024 / 1024:.1f}MB'
+        )
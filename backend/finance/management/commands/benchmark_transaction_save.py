@@ -0,0 +1,88 @@
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, models, transaction
+
+from activities.models import ActivityCode
+from finance.models import Transaction
+from organization.models import OrganizationActivity, OrganizationProfile
+
+
+class _Rollback(Exception):
+    pass
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _legacy_save(txn):
+    """Transaction.save() as it was before the rate cache: two queries per save."""
+    if txn.is_business and txn.activity_code:
+        try:
+            org_activity = OrganizationActivity.objects.get(
+                profile=txn.user.organization,
+                activity=txn.activity_code
+            )
+            txn.cash_tax_rate = org_activity.cash_tax_rate
+            txn.non_cash_tax_rate = org_activity.non_cash_tax_rate
+        except OrganizationActivity.DoesNotExist:
+            pass
+    models.Model.save(txn)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер скорости Transaction.save(): прежний поиск ставок в БД против кэша ставок '
+        'организации. Данные создаются во временной транзакции БД и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options['rows'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, rows):
+        user = get_user_model().objects.create_user(email='save-benchmark@example.invalid')
+        profile = OrganizationProfile.objects.create(user=user)
+        activity = ActivityCode.objects.order_by('id').first() or ActivityCode.objects.create(
+            code='00.00.0', section='A', name='benchmark'
+        )
+        OrganizationActivity.objects.create(
+            profile=profile, activity=activity, cash_tax_rate=Decimal('4.00'), non_cash_tax_rate=Decimal('2.00')
+        )
+
+        for label, save in (('before (db lookup)', _legacy_save), ('after (rate cache)', Transaction.save)):
+            # Fresh user instance: the legacy path pays for user.organization too
+            owner = get_user_model().objects.get(pk=user.pk)
+            queries = _QueryCounter()
+            with connection.execute_wrapper(queries):
+                started = time.perf_counter()
+                for i in range(rows):
+                    save(Transaction(
+                        user=owner,
+                        amount=Decimal(i % 1000 + 1),
+                        transaction_type='income',
+                        transaction_date=date(2024, 1, 1),
+                        is_business=True,
+                        activity_code=activity,
+                    ))
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{label}: rows={rows} time={elapsed:.2f}s saves/s={rows / elapsed:.0f} '
+                f'queries/save={queries.count / rows:.2f}'
+            )
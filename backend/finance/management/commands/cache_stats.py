@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from finance.services.cache_service import get_cache_stats
+from finance.services.dashboard_service import DASHBOARD_CACHE_NAME
+
+
+class Command(BaseCommand):
+    help = 'Показывает счетчики попаданий/промахов кэша дашборда'
+
+    def handle(self, *args, **options):
+        stats = get_cache_stats(DASHBOARD_CACHE_NAME)
+        self.stdout.write(
+            f"{DASHBOARD_CACHE_NAME}: hits={stats['hits']} misses={stats['misses']} hit_ratio={stats['hit_ratio']}"
+        )
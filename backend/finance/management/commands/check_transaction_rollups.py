@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from finance.services.rollup_service import find_rollup_mismatches, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Сверяет дневные агрегаты транзакций с суммами по исходным транзакциям'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='ID пользователя (по умолчанию — все пользователи)')
+        parser.add_argument('--fix', action='store_true', help='Пересчитать агрегаты пользователей с расхождениями')
+
+    def handle(self, *args, **options):
+        mismatches = find_rollup_mismatches(user_id=options.get('user'))
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('Расхождений не найдено.'))
+            return
+
+        for m in mismatches:
+            self.stdout.write(f"{m['key']}: ожидалось {m['expected']}, в агрегате {m['actual']}")
+
+        user_ids = sorted({m['key']['user_id'] for m in mismatches})
+        if options['fix']:
+            for user_id in user_ids:
+                rebuild_rollups(user_id=user_id)
+            self.stdout.write(self.style.SUCCESS(
+                f'Найдено расхождений: {len(mismatches)}. Пересчитано пользователей: {len(user_ids)}.'
+            ))
+            return
+
+        raise CommandError(
+            f'Найдено расхождений: {len(mismatches)} у пользователей {user_ids}. '
+            'Запустите с --fix или rebuild_transaction_rollups.'
+        )
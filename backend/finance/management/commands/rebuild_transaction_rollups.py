@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from finance.services.rollup_service import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает дневные агрегаты транзакций (TransactionDailyRollup) из исходных транзакций'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='ID пользователя (по умолчанию — все пользователи)')
+
+    def handle(self, *args, **options):
+        result = rebuild_rollups(user_id=options.get('user'))
+        rows = sum(result.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано пользователей: {len(result)}, строк агрегата: {rows}.'
+        ))
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.11 on 2026-10-17 18:40
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rollups(apps, schema_editor):
+    Transaction = apps.get_model('finance', 'Transaction')
+    TransactionDailyRollup = apps.get_model('finance', 'TransactionDailyRollup')
+    dimensions = ('transaction_type', 'payment_method', 'category_id', 'activity_code_id', 'is_taxable', 'is_business')
+    rows = (
+        Transaction.objects.values('user_id', 'transaction_date', *dimensions)
+        .annotate(sum_total=Sum('amount'), sum_count=Count('id'))
+        .order_by()
+    )
+    TransactionDailyRollup.objects.bulk_create(
+        (
+            TransactionDailyRollup(
+                user_id=r['user_id'],
+                day=r['transaction_date'],
+                total=r['sum_total'],
+                count=r['sum_count'],
+                **{field: r[field] for field in dimensions},
+            )
+            for r in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0001_initial'),
+        ('finance', '0005_remove_transaction_amount_positive_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('transaction_type', models.CharField(choices=[('income', 'Доход'), ('expense', 'Расход')], max_length=10, verbose_name='Тип операции')),
+                ('payment_method', models.CharField(choices=[('cash', 'Наличный расчет'), ('non_cash', 'Безналичный расчет')], max_length=10, verbose_name='Метод оплаты')),
+                ('is_taxable', models.BooleanField(verbose_name='Учитывается в налоговой базе?')),
+                ('is_business', models.BooleanField(verbose_name='Относится к бизнесу?')),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=18, verbose_name='Сумма')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество транзакций')),
+                ('activity_code', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='activities.activitycode', verbose_name='Вид деятельности')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='finance.category', verbose_name='Категория')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaction_rollups', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Дневной агрегат транзакций',
+                'verbose_name_plural': 'Дневные агрегаты транзакций',
+                'constraints': [models.UniqueConstraint(fields=('user', 'day', 'transaction_type', 'payment_method', 'category', 'activity_code', 'is_taxable', 'is_business'), name='unique_transaction_rollup_key', nulls_distinct=False)],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
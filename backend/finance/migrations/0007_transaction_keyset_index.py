@@ -0,0 +1,24 @@
+# Generated by Django 5.2.11 on 2026-10-17 18:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0001_initial'),
+        ('finance', '0006_transactiondailyrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'transaction_date', 'created_at', 'id'], name='finance_tra_user_id_ecbdd0_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='finance_tra_user_id_bed389_idx',
+        ),
+    ]
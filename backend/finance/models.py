@@ -6,7 +6,7 @@ from django.db import models
 from django.db.models import Q
 
 from activities.models import ActivityCode
-from organization.models import OrganizationActivity
+from organization.activity_rates import get_activity_rate
 
 from .constants import MAX_TRANSACTION_AMOUNT, MIN_TRANSACTION_AMOUNT
 
@@ -105,16 +105,11 @@ class Transaction(models.Model):
     non_cash_tax_rate = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
 
     def save(self, *args, **kwargs):
-        if self.is_business and self.activity_code:
-            try:
-                org_activity = OrganizationActivity.objects.get(
-                    profile=self.user.organization,
-                    activity=self.activity_code
-                )
-                self.cash_tax_rate = org_activity.cash_tax_rate
-                self.non_cash_tax_rate = org_activity.non_cash_tax_rate
-            except OrganizationActivity.DoesNotExist:
-                pass
+        if self.is_business and self.activity_code_id:
+            # Rate map is cached per organization (organization.activity_rates)
+            rates = get_activity_rate(self.user_id, self.activity_code_id)
+            if rates is not None:
+                self.cash_tax_rate, self.non_cash_tax_rate = rates
         super().save(*args, **kwargs)
 
     def __str__(self) -> str:
@@ -128,7 +123,8 @@ class Transaction(models.Model):
             models.Index(fields=["user"]),
             models.Index(fields=["transaction_date"]),
             models.Index(fields=["created_at"]),
-            models.Index(fields=["user", "transaction_date"]),
+            # Keyset pagination of the transactions list (user, -transaction_date, -created_at, -id)
+            models.Index(fields=["user", "transaction_date", "created_at", "id"]),
         ]
         constraints = [
             models.CheckConstraint(
@@ -140,3 +136,66 @@ class Transaction(models.Model):
                 name="amount_reasonable_limit"
             ),
         ]
+
+
+class TransactionDailyRollup(models.Model):
+    """
+    Дневной агрегат транзакций пользователя для аналитики.
+    Одна строка на (user, day, transaction_type, payment_method, category, activity_code, is_taxable, is_business).
+    Поддерживается инкрементально в finance.services.rollup_service.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='transaction_rollups',
+        verbose_name='Пользователь'
+    )
+    day = models.DateField(verbose_name='День')
+    transaction_type = models.CharField(
+        max_length=10,
+        choices=Transaction.TransactionType.choices,
+        verbose_name='Тип операции'
+    )
+    payment_method = models.CharField(
+        max_length=10,
+        choices=Transaction.PaymentMethod.choices,
+        verbose_name='Метод оплаты'
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name='Категория'
+    )
+    activity_code = models.ForeignKey(
+        ActivityCode,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name='Вид деятельности'
+    )
+    is_taxable = models.BooleanField(verbose_name='Учитывается в налоговой базе?')
+    is_business = models.BooleanField(verbose_name='Относится к бизнесу?')
+
+    total = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0'), verbose_name='Сумма')
+    count = models.IntegerField(default=0, verbose_name='Количество транзакций')
+
+    def __str__(self) -> str:
+        return f"{self.day} {self.transaction_type} {self.total} ({self.count})"
+
+    class Meta:
+        verbose_name = 'Дневной агрегат транзакций'
+        verbose_name_plural = 'Дневные агрегаты транзакций'
+        # Уникальный ключ начинается с (user, day) и служит индексом для выборок по периоду
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    'user', 'day', 'transaction_type', 'payment_method',
+                    'category', 'activity_code', 'is_taxable', 'is_business',
+                ],
+                name='unique_transaction_rollup_key',
+                nulls_distinct=False,
+            ),
+        ]
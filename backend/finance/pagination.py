@@ -0,0 +1,220 @@
+"""
+Pagination for the transactions list.
+
+Default is LimitOffsetPagination (backward compatible). With ?pagination=cursor or ?cursor=...
+a keyset (cursor) mode is used: pages start right after the last row of the previous page on the
+(user, transaction_date, created_at, id) index, without OFFSET and without COUNT(*).
+"""
+
+import base64
+import json
+from urllib import parse
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination, LimitOffsetPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination over an ordering that ends with a unique tie-breaker (id).
+
+    Cursor = base64(JSON) with the ordering columns of the boundary row, the ordering itself
+    and the direction. Ordering comes from OrderingFilter (?ordering=...) or default_ordering.
+    """
+
+    default_ordering = ('-transaction_date', '-created_at', '-id')
+    tiebreaker = 'id'
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.model = queryset.model
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['reverse'])
+        ordering = [self._flip(f) for f in self.ordering] if reverse else list(self.ordering)
+
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(self._after(ordering, cursor['values']))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = cursor is not None, has_more
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        for backend in getattr(view, 'filter_backends', None) or []:
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        ordering = list(ordering or self.default_ordering)
+        fields = [f.lstrip('-') for f in ordering]
+        if self.tiebreaker not in fields:
+            desc = ordering[-1].startswith('-')
+            ordering.append(f"-{self.tiebreaker}" if desc else self.tiebreaker)
+        return ordering
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, row, reverse):
+        values = [self._field(f).value_to_string(row) for f in self.ordering]
+        payload = json.dumps({'v': values, 'o': self.ordering, 'r': reverse}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode()).decode()
+        url = remove_query_param(self.base_url, 'offset')
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(parse.unquote(encoded).encode()).decode())
+            if payload['o'] != self.ordering or len(payload['v']) != len(self.ordering):
+                raise ValueError
+            values = [self._field(f).to_python(v) for f, v in zip(self.ordering, payload['v'])]
+            return {'values': values, 'reverse': bool(payload['r'])}
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Cursor value from next/previous links.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+    def _field(self, ordering_field):
+        return self.model._meta.get_field(ordering_field.lstrip('-'))
+
+    @staticmethod
+    def _flip(ordering_field):
+        return ordering_field[1:] if ordering_field.startswith('-') else f"-{ordering_field}"
+
+    @staticmethod
+    def _after(ordering, values):
+        """
+        Rows strictly after the boundary row in the given ordering.
+
+        The expansion (a < x) OR (a = x AND b < y) OR ... works for mixed directions, but it is
+        not a range condition an index can seek on, so the bound on the leading column
+        (a <= x) is ANDed to it: the scan starts at the boundary row instead of filtering the
+        index from the top. Ordering columns are NOT NULL.
+        """
+        condition = Q()
+        equal = {}
+        for ordering_field, value in zip(ordering, values):
+            name = ordering_field.lstrip('-')
+            lookup = 'lt' if ordering_field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        leading = ordering[0]
+        bound = 'lte' if leading.startswith('-') else 'gte'
+        return Q(**{f"{leading.lstrip('-')}__{bound}": values[0]}) & condition
+
+
+class TransactionPagination(BasePagination):
+    """
+    Offset pagination by default; keyset pagination with ?pagination=cursor or ?cursor=...
+    """
+
+    mode_query_param = 'pagination'
+
+    def __init__(self):
+        self.offset_paginator = LimitOffsetPagination()
+        self.cursor_paginator = KeysetPagination()
+        self.active = self.offset_paginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        use_cursor = (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.cursor_paginator.cursor_query_param in request.query_params
+        )
+        self.active = self.cursor_paginator if use_cursor else self.offset_paginator
+        return self.active.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.active.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.offset_paginator.get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': '"cursor" for keyset pagination (no count, stable deep pages).',
+                'schema': {'type': 'string', 'enum': ['offset', 'cursor']},
+            },
+            *self.offset_paginator.get_schema_operation_parameters(view),
+            *self.cursor_paginator.get_schema_operation_parameters(view)[:1],
+        ]
@@ -3,8 +3,10 @@
 from .analytics import (
     CategoryBreakdownItemSerializer,
     CategoryBreakdownResponseSerializer,
+    MultiPeriodComparisonResponseSerializer,
     PeriodChangeSerializer,
     PeriodComparisonResponseSerializer,
+    PeriodPairChangeSerializer,
     PeriodStatsSerializer,
     TimeSeriesDataSerializer,
     TimeSeriesResponseSerializer,
@@ -17,11 +19,19 @@ from .dashboard import (
     DashboardTotalsSerializer,
 )
 from .tax_report import TaxReportResponseSerializer
-from .transaction import TransactionSerializer
+from .transaction import (
+    TransactionBulkCreateSerializer,
+    TransactionBulkItemSerializer,
+    TransactionBulkResponseSerializer,
+    TransactionSerializer,
+)
 
 __all__ = [
     'CategorySerializer',
     'TransactionSerializer',
+    'TransactionBulkItemSerializer',
+    'TransactionBulkCreateSerializer',
+    'TransactionBulkResponseSerializer',
     'DashboardResponseSerializer',
     'DashboardTotalsSerializer',
     'DashboardCategorySerializer',
@@ -33,5 +43,7 @@ __all__ = [
     'PeriodComparisonResponseSerializer',
     'PeriodStatsSerializer',
     'PeriodChangeSerializer',
+    'MultiPeriodComparisonResponseSerializer',
+    'PeriodPairChangeSerializer',
     'TaxReportResponseSerializer',
 ]
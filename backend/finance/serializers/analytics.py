@@ -7,6 +7,8 @@ class TimeSeriesDataSerializer(serializers.Serializer):
     """Time series data point."""
 
     period = serializers.CharField()
+    date_from = serializers.CharField()
+    date_to = serializers.CharField()
     income = serializers.CharField()
     expense = serializers.CharField()
     net = serializers.CharField()
@@ -69,3 +71,18 @@ class PeriodComparisonResponseSerializer(serializers.Serializer):
     period1 = PeriodStatsSerializer()
     period2 = PeriodStatsSerializer()
     change = PeriodChangeSerializer()
+
+
+class PeriodPairChangeSerializer(PeriodChangeSerializer):
+    """Change between two periods of a multi-period comparison (indexes into periods)."""
+
+    from_index = serializers.IntegerField()
+    to_index = serializers.IntegerField()
+
+
+class MultiPeriodComparisonResponseSerializer(serializers.Serializer):
+    """Multi-period comparison analytics response."""
+
+    baseline = serializers.ChoiceField(choices=['previous', 'first'])
+    periods = PeriodStatsSerializer(many=True)
+    changes = PeriodPairChangeSerializer(many=True)
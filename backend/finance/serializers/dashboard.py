@@ -16,6 +16,7 @@ class DashboardCategorySerializer(serializers.Serializer):
     category_name = serializers.CharField()
     category_type = serializers.CharField()
     total = serializers.CharField()
+    is_other = serializers.BooleanField(help_text='Сумма остальных категорий и транзакций без категории')
 
 
 class DashboardRecentTransactionSerializer(serializers.Serializer):
@@ -51,3 +51,73 @@ class TransactionSerializer(serializers.ModelSerializer):
             if value > MAX_TRANSACTION_AMOUNT:
                 raise serializers.ValidationError("Сумма превышает допустимый предел.")
         return value
+
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """PK field resolved from a {pk: obj} dict in serializer context instead of a query per row."""
+
+    def __init__(self, context_key, **kwargs):
+        self.context_key = context_key
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        obj = self.context[self.context_key].get(pk)
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
+
+
+class TransactionBulkItemSerializer(serializers.ModelSerializer):
+    """
+    One row of a bulk import. Same fields and validation as TransactionSerializer,
+    but category/activity_code are looked up in dicts preloaded once per request
+    (context: 'categories', 'activity_codes').
+    """
+
+    category = PreloadedPrimaryKeyRelatedField(
+        'categories', queryset=Category.objects.none(), required=False, allow_null=True
+    )
+    activity_code = PreloadedPrimaryKeyRelatedField(
+        'activity_codes', queryset=ActivityCode.objects.none(), required=False, allow_null=True
+    )
+
+    class Meta:
+        model = Transaction
+        fields = (
+            'amount', 'transaction_type', 'category', 'description', 'transaction_date',
+            'payment_method', 'is_business', 'is_taxable', 'activity_code',
+        )
+
+    validate_amount = TransactionSerializer.validate_amount
+
+    @staticmethod
+    def preload_context(user):
+        """Context with the user's categories and organization activity codes, two queries per request."""
+        return {
+            'categories': {c.id: c for c in Category.objects.filter(Q(user=user) | Q(is_system=True))},
+            'activity_codes': {
+                a.id: a for a in ActivityCode.objects.filter(organizationactivity__profile__user=user).distinct()
+            },
+        }
+
+
+class TransactionBulkCreateSerializer(serializers.Serializer):
+    """Bulk import request: JSON array of transactions or CSV file (multipart field 'file')."""
+
+    file = serializers.FileField(required=False, help_text='CSV с заголовком: amount, transaction_type, ...')
+    transactions = TransactionBulkItemSerializer(many=True, required=False)
+
+
+class TransactionBulkErrorSerializer(serializers.Serializer):
+    row = serializers.IntegerField()
+    errors = serializers.DictField()
+
+
+class TransactionBulkResponseSerializer(serializers.Serializer):
+    created = serializers.IntegerField()
+    ids = serializers.ListField(child=serializers.IntegerField(allow_null=True))
+    errors = TransactionBulkErrorSerializer(many=True)
@@ -1,108 +1,157 @@
-"""Analytics service for graphs: time series, category breakdown, period comparisons."""
+"""
+Analytics service for graphs: time series, category breakdown, period comparisons.
+Reads from TransactionDailyRollup (see rollup_service) instead of raw transactions.
+"""
 
-from datetime import timedelta
+from datetime import date, timedelta
 from decimal import Decimal
+from itertools import islice
 
-from django.db.models import Count, Q, Sum
-from django.db.models.functions import TruncMonth, TruncYear
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Q, Sum
 from django.utils import timezone
 
 from finance.constants import (
     DATE_FORMAT,
     DEFAULT_ANALYTICS_DAYS,
     DEFAULT_CATEGORY_BREAKDOWN_LIMIT,
+    MAX_TIME_SERIES_POINTS,
     MONTH_FORMAT,
+    QUARTER_FORMAT,
+    WEEK_FORMAT,
     YEAR_FORMAT,
     ZERO,
 )
-from finance.models import Transaction
+from finance.models import Transaction, TransactionDailyRollup
+from organization.tax_period_utils import iter_tax_periods
+
+
+INCOME_FILTER = Q(transaction_type=Transaction.TransactionType.INCOME)
+EXPENSE_FILTER = Q(transaction_type=Transaction.TransactionType.EXPENSE)
+
+TIME_SERIES_PERIODS = ('daily', 'weekly', 'monthly', 'quarterly', 'yearly', 'tax_period')
+
+
+def _rollup_qs(user, date_from=None, date_to=None, transaction_type=None):
+    qs = TransactionDailyRollup.objects.filter(user=user)
+    if date_from:
+        qs = qs.filter(day__gte=date_from)
+    if date_to:
+        qs = qs.filter(day__lte=date_to)
+    if transaction_type:
+        qs = qs.filter(transaction_type=transaction_type)
+    return qs
+
+
+def _add_months(day, months):
+    """First day of the month `months` after day's month."""
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _calendar_bucket(period, day):
+    """Return (start, end, label) of the calendar bucket containing day."""
+    if period == 'daily':
+        return day, day, day.strftime(DATE_FORMAT)
+    if period == 'weekly':
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6), start.strftime(WEEK_FORMAT)
+    if period == 'quarterly':
+        quarter = (day.month - 1) // 3
+        start = date(day.year, quarter * 3 + 1, 1)
+        label = QUARTER_FORMAT.format(year=day.year, quarter=quarter + 1)
+        return start, _add_months(start, 3) - timedelta(days=1), label
+    if period == 'yearly':
+        return date(day.year, 1, 1), date(day.year, 12, 31), day.strftime(YEAR_FORMAT)
+    start = day.replace(day=1)
+    return start, _add_months(start, 1) - timedelta(days=1), day.strftime(MONTH_FORMAT)
+
+
+def _iter_buckets(user, period, date_from, date_to):
+    """Yield consecutive (start, end, label) buckets covering date_from..date_to."""
+    if period == 'tax_period':
+        try:
+            profile = user.organization
+        except ObjectDoesNotExist:
+            raise ValueError('Organization profile is not set up.')
+        for start, end in iter_tax_periods(profile, date_from, date_to):
+            yield start, end, start.strftime(DATE_FORMAT)
+        return
+    day = date_from
+    while day <= date_to:
+        start, end, label = _calendar_bucket(period, day)
+        yield start, end, label
+        day = end + timedelta(days=1)
 
 
 def get_time_series_data(user, period='monthly', date_from=None, date_to=None, transaction_type=None):
     """
-    Time series data for charts (income/expense over time).
-    
+    Time series data for charts (income/expense over time), zero-filled.
+
+    One grouped query (per day, from the rollup) is merged linearly into consecutive buckets,
+    so periods without transactions are returned with zeros.
+
     Args:
         user: User instance
-        period: 'daily', 'monthly', 'yearly'
-        date_from: start date (default: 1 year ago)
+        period: 'daily', 'weekly', 'monthly', 'quarterly', 'yearly' or 'tax_period'
+            (organization's tax periods, see organization.tax_period_utils)
+        date_from: start date (default: 1 year ago; first transaction if only date_to is given)
         date_to: end date (default: today)
         transaction_type: 'income', 'expense', or None (both)
-    
+
     Returns:
-        List of {period: str, income: Decimal, expense: Decimal, net: Decimal}
+        List of {period: str, date_from: str, date_to: str, income: str, expense: str, net: str};
+        date_from/date_to are the bucket bounds clipped to the requested range.
+
+    Raises:
+        ValueError: tax_period without configured tax period, or more than
+            MAX_TIME_SERIES_POINTS buckets
     """
-    base_qs = Transaction.objects.filter(user=user)
-    
-    if date_from:
-        base_qs = base_qs.filter(transaction_date__gte=date_from)
-    if date_to:
-        base_qs = base_qs.filter(transaction_date__lte=date_to)
-    if transaction_type:
-        base_qs = base_qs.filter(transaction_type=transaction_type)
-    
     # Default: last N days if no dates provided
     if not date_from and not date_to:
         date_to = timezone.now().date()
         date_from = date_to - timedelta(days=DEFAULT_ANALYTICS_DAYS)
-        base_qs = base_qs.filter(transaction_date__gte=date_from, transaction_date__lte=date_to)
-    
-    # Group by period
-    period_configs = {
-        'daily': ('transaction_date', DATE_FORMAT),
-        'monthly': ('month', MONTH_FORMAT),
-        'yearly': ('year', YEAR_FORMAT),
-    }
-    date_trunc, date_format = period_configs.get(period, ('month', MONTH_FORMAT))
-    
-    # Aggregate by period
-    if date_trunc == 'transaction_date':
-        # Daily: group by exact date
-        qs = base_qs.values('transaction_date').annotate(
-            income=Sum('amount', filter=Q(transaction_type=Transaction.TransactionType.INCOME), default=0),
-            expense=Sum('amount', filter=Q(transaction_type=Transaction.TransactionType.EXPENSE), default=0),
-        ).order_by('transaction_date')
-        
-        result = []
-        for row in qs:
-            income = row['income'] or ZERO
-            expense = row['expense'] or ZERO
-            result.append({
-                'period': row['transaction_date'].strftime(date_format),
-                'income': str(income),
-                'expense': str(expense),
-                'net': str(income - expense),
-            })
-        return result
-    else:
-        # Monthly/Yearly: use Django's TruncMonth/TruncYear
-        if date_trunc == 'month':
-            qs = base_qs.annotate(
-                period=TruncMonth('transaction_date')
-            ).values('period').annotate(
-                income=Sum('amount', filter=Q(transaction_type=Transaction.TransactionType.INCOME), default=0),
-                expense=Sum('amount', filter=Q(transaction_type=Transaction.TransactionType.EXPENSE), default=0),
-            ).order_by('period')
-        else:  # yearly
-            qs = base_qs.annotate(
-                period=TruncYear('transaction_date')
-            ).values('period').annotate(
-                income=Sum('amount', filter=Q(transaction_type=Transaction.TransactionType.INCOME), default=0),
-                expense=Sum('amount', filter=Q(transaction_type=Transaction.TransactionType.EXPENSE), default=0),
-            ).order_by('period')
-        
-        result = []
-        for row in qs:
-            period_str = row['period'].strftime(date_format) if row['period'] else ''
-            income = row['income'] or ZERO
-            expense = row['expense'] or ZERO
-            result.append({
-                'period': period_str,
-                'income': str(income),
-                'expense': str(expense),
-                'net': str(income - expense),
-            })
-    
+    if period not in TIME_SERIES_PERIODS:
+        period = 'monthly'
+
+    rows = list(
+        _rollup_qs(user, date_from, date_to, transaction_type)
+        .values('day')
+        .annotate(
+            income=Sum('total', filter=INCOME_FILTER, default=0),
+            expense=Sum('total', filter=EXPENSE_FILTER, default=0),
+        )
+        .order_by('day')
+    )
+    if not date_from:
+        if not rows:
+            return []
+        date_from = rows[0]['day']
+    if not date_to:
+        date_to = max(timezone.now().date(), rows[-1]['day']) if rows else timezone.now().date()
+
+    buckets = list(islice(_iter_buckets(user, period, date_from, date_to), MAX_TIME_SERIES_POINTS + 1))
+    if len(buckets) > MAX_TIME_SERIES_POINTS:
+        raise ValueError(
+            f'Too many points for period={period}: max {MAX_TIME_SERIES_POINTS}. Narrow the date range.'
+        )
+
+    result = []
+    index = 0
+    for start, end, label in buckets:
+        income = expense = ZERO
+        while index < len(rows) and rows[index]['day'] <= end:
+            income += rows[index]['income'] or ZERO
+            expense += rows[index]['expense'] or ZERO
+            index += 1
+        result.append({
+            'period': label,
+            'date_from': max(start, date_from).isoformat(),
+            'date_to': min(end, date_to).isoformat(),
+            'income': str(income),
+            'expense': str(expense),
+            'net': str(income - expense),
+        })
     return result
 
 
@@ -120,23 +169,16 @@ def get_category_breakdown(user, date_from=None, date_to=None, transaction_type=
     Returns:
         List of {category_name: str, category_type: str, total: Decimal, count: int}
     """
-    base_qs = Transaction.objects.filter(user=user)
-    
-    if date_from:
-        base_qs = base_qs.filter(transaction_date__gte=date_from)
-    if date_to:
-        base_qs = base_qs.filter(transaction_date__lte=date_to)
-    if transaction_type:
-        base_qs = base_qs.filter(transaction_type=transaction_type)
+    base_qs = _rollup_qs(user, date_from, date_to, transaction_type)
     
     qs = (
         base_qs.values('category__name', 'category__category_type')
         .annotate(
-            total=Sum('amount'),
-            count=Count('id')
+            sum_total=Sum('total'),
+            sum_count=Sum('count')
         )
         .filter(category__name__isnull=False)
-        .order_by('-total')[:limit]
+        .order_by('-sum_total')[:limit]
     )
     
     result = []
@@ -144,13 +186,73 @@ def get_category_breakdown(user, date_from=None, date_to=None, transaction_type=
         result.append({
             'category_name': row['category__name'],
             'category_type': row['category__category_type'],
-            'total': str(row['total'] or ZERO),
-            'count': row['count'],
+            'total': str(row['sum_total'] or ZERO),
+            'count': row['sum_count'],
         })
     
     return result
 
 
+def get_periods_stats(user, periods):
+    """
+    Income/expense/net/count for several (possibly overlapping) periods in one scan.
+
+    One aggregate over day in min(date_from)..max(date_to) with a conditional Sum per period.
+
+    Args:
+        user: User instance
+        periods: list of (date_from, date_to)
+
+    Returns:
+        List of {income, expense, net, transaction_count, date_from, date_to}, in input order
+    """
+    if not periods:
+        return []
+    aggregates = {}
+    for i, (date_from, date_to) in enumerate(periods):
+        in_period = Q(day__gte=date_from, day__lte=date_to)
+        aggregates[f'income_{i}'] = Sum('total', filter=in_period & INCOME_FILTER, default=0)
+        aggregates[f'expense_{i}'] = Sum('total', filter=in_period & EXPENSE_FILTER, default=0)
+        aggregates[f'count_{i}'] = Sum('count', filter=in_period, default=0)
+    stats = _rollup_qs(
+        user,
+        min(date_from for date_from, _ in periods),
+        max(date_to for _, date_to in periods),
+    ).aggregate(**aggregates)
+
+    result = []
+    for i, (date_from, date_to) in enumerate(periods):
+        income = stats[f'income_{i}'] or ZERO
+        expense = stats[f'expense_{i}'] or ZERO
+        result.append({
+            'income': str(income),
+            'expense': str(expense),
+            'net': str(income - expense),
+            'transaction_count': stats[f'count_{i}'],
+            'date_from': date_from.isoformat(),
+            'date_to': date_to.isoformat(),
+        })
+    return result
+
+
+def _pct_change(old, new):
+    return ((new - old) / old * 100) if old != 0 else (100 if new > 0 else 0)
+
+
+def get_period_change(p1, p2):
+    """Change from period stats p1 to p2 (see get_periods_stats): absolute and percent."""
+    p1_income, p1_expense, p1_net = Decimal(p1['income']), Decimal(p1['expense']), Decimal(p1['net'])
+    p2_income, p2_expense, p2_net = Decimal(p2['income']), Decimal(p2['expense']), Decimal(p2['net'])
+    return {
+        'income_change': str(p2_income - p1_income),
+        'expense_change': str(p2_expense - p1_expense),
+        'net_change': str(p2_net - p1_net),
+        'income_change_pct': str(_pct_change(p1_income, p2_income)),
+        'expense_change_pct': str(_pct_change(p1_expense, p2_expense)),
+        'net_change_pct': str(_pct_change(p1_net, p2_net)),
+    }
+
+
 def get_period_comparison(user, period1_from, period1_to, period2_from, period2_to):
     """
     Compare two periods (e.g., this month vs last month).
@@ -162,67 +264,39 @@ def get_period_comparison(user, period1_from, period1_to, period2_from, period2_
             change: {income_change, expense_change, net_change, income_pct, expense_pct, net_pct}
         }
     """
-    def get_period_stats(date_from, date_to):
-        qs = Transaction.objects.filter(
-            user=user,
-            transaction_date__gte=date_from,
-            transaction_date__lte=date_to
-        )
-        
-        stats = qs.aggregate(
-            income=Sum('amount', filter=Q(transaction_type=Transaction.TransactionType.INCOME), default=0),
-            expense=Sum('amount', filter=Q(transaction_type=Transaction.TransactionType.EXPENSE), default=0),
-            count=Count('id'),
-        )
-        
-        income = stats['income'] or ZERO
-        expense = stats['expense'] or ZERO
-        net = income - expense
-        
-        return {
-            'income': str(income),
-            'expense': str(expense),
-            'net': str(net),
-            'transaction_count': stats['count'],
+    p1, p2 = get_periods_stats(user, [(period1_from, period1_to), (period2_from, period2_to)])
+    return {
+        'period1': p1,
+        'period2': p2,
+        'change': get_period_change(p1, p2),
+    }
+
+
+def get_multi_period_comparison(user, periods, baseline='previous'):
+    """
+    Compare N periods (e.g. 12 months side by side) in one scan.
+
+    Args:
+        user: User instance
+        periods: list of (date_from, date_to), any order, may overlap
+        baseline: 'previous' - each period vs the one before it; 'first' - each period vs the first
+
+    Returns:
+        {
+            periods: [{income, expense, net, transaction_count, date_from, date_to}],
+            changes: [{from_index, to_index, income_change, ..., net_change_pct}]  (N-1 items)
         }
-    
-    p1 = get_period_stats(period1_from, period1_to)
-    p2 = get_period_stats(period2_from, period2_to)
-    
-    p1_income = Decimal(p1['income'])
-    p1_expense = Decimal(p1['expense'])
-    p1_net = Decimal(p1['net'])
-    
-    p2_income = Decimal(p2['income'])
-    p2_expense = Decimal(p2['expense'])
-    p2_net = Decimal(p2['net'])
-    
-    # Calculate changes
-    income_change = p2_income - p1_income
-    expense_change = p2_expense - p1_expense
-    net_change = p2_net - p1_net
-    
-    income_pct = ((p2_income - p1_income) / p1_income * 100) if p1_income != 0 else (100 if p2_income > 0 else 0)
-    expense_pct = ((p2_expense - p1_expense) / p1_expense * 100) if p1_expense != 0 else (100 if p2_expense > 0 else 0)
-    net_pct = ((p2_net - p1_net) / p1_net * 100) if p1_net != 0 else (100 if p2_net > 0 else 0)
-    
+    """
+    stats = get_periods_stats(user, periods)
+    changes = []
+    for i in range(1, len(stats)):
+        base_index = 0 if baseline == 'first' else i - 1
+        changes.append({
+            'from_index': base_index,
+            'to_index': i,
+            **get_period_change(stats[base_index], stats[i]),
+        })
     return {
-        'period1': {
-            **p1,
-            'date_from': period1_from.isoformat(),
-            'date_to': period1_to.isoformat(),
-        },
-        'period2': {
-            **p2,
-            'date_from': period2_from.isoformat(),
-            'date_to': period2_to.isoformat(),
-        },
-        'change': {
-            'income_change': str(income_change),
-            'expense_change': str(expense_change),
-            'net_change': str(net_change),
-            'income_change_pct': str(income_pct),
-            'expense_change_pct': str(expense_pct),
-            'net_change_pct': str(net_pct),
-        },
+        'periods': stats,
+        'changes': changes,
     }
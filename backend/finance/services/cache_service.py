@@ -0,0 +1,89 @@
+"""
+Per-user data version for caching derived finance payloads.
+
+Every write to a user's ledger (transactions, categories, organization activities)
+bumps the user's version after commit, so cache keys built from it change instantly
+instead of waiting for the TTL. System categories bump a global version shared by all users.
+The time of the last bump is kept next to each version for Last-Modified headers.
+Versions live in the default cache, so invalidation is cross-process only with Redis (REDIS_URL);
+with LocMemCache each worker keeps its own versions and cache entries.
+"""
+
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.db import transaction
+
+DATA_VERSION_KEY = 'finance:data_version:{user_id}'
+GLOBAL_DATA_VERSION_KEY = 'finance:data_version:global'
+MODIFIED_SUFFIX = ':modified'
+CACHE_STATS_KEY = 'finance:cache_stats:{name}:{event}'
+
+
+def _initial_version():
+    # Time-based start: if the counter is evicted, the new value never repeats an old one
+    return time.time_ns()
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Writes before the counter existed are unknown: "now" is a safe upper bound
+        cache.add(key + MODIFIED_SUFFIX, time.time(), timeout=None)
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    cache.set(key + MODIFIED_SUFFIX, time.time(), timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), timeout=None)
+
+
+def get_data_version(user_id):
+    """Current data version of a user, e.g. '1739781234000000000.1739781299000000003'."""
+    return f"{_get_version(GLOBAL_DATA_VERSION_KEY)}.{_get_version(DATA_VERSION_KEY.format(user_id=user_id))}"
+
+
+def get_data_modified(user_id):
+    """Time of the last write to a user's data (or the shared data), as an aware datetime; None if unknown."""
+    stamps = [
+        cache.get(key + MODIFIED_SUFFIX)
+        for key in (GLOBAL_DATA_VERSION_KEY, DATA_VERSION_KEY.format(user_id=user_id))
+    ]
+    stamps = [stamp for stamp in stamps if stamp is not None]
+    if not stamps:
+        return None
+    return datetime.fromtimestamp(max(stamps), tz=timezone.utc)
+
+
+def bump_data_version(user_id=None):
+    """Invalidate cached payloads of one user (or of everyone if user_id is None) once the transaction commits."""
+    key = DATA_VERSION_KEY.format(user_id=user_id) if user_id is not None else GLOBAL_DATA_VERSION_KEY
+    transaction.on_commit(lambda: _bump_version(key))
+
+
+def record_cache_event(name, event):
+    """Count a cache 'hit' or 'miss' for the named cache."""
+    key = CACHE_STATS_KEY.format(name=name, event=event)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_cache_stats(name):
+    """Return {hits, misses, hit_ratio} for the named cache."""
+    hits = cache.get(CACHE_STATS_KEY.format(name=name, event='hit')) or 0
+    misses = cache.get(CACHE_STATS_KEY.format(name=name, event='miss')) or 0
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
@@ -1,44 +1,70 @@
-"""Dashboard service: aggregates via annotate."""
+"""Dashboard service: aggregates via annotate, cached per user data version."""
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db.models import Q, Sum
 
-from finance.constants import DEFAULT_RECENT_TRANSACTIONS_LIMIT, ZERO
-from finance.models import Transaction
+from finance.constants import DEFAULT_CATEGORY_BREAKDOWN_LIMIT, DEFAULT_RECENT_TRANSACTIONS_LIMIT, ZERO
+from finance.models import Transaction, TransactionDailyRollup
+from finance.services.cache_service import get_data_version, record_cache_event
 
+DASHBOARD_CACHE_NAME = 'dashboard'
+DASHBOARD_CACHE_KEY = 'finance:dashboard:{user_id}:{version}:{recent_limit}'
+OTHER_CATEGORY_NAME = 'Прочее'
 
-def get_dashboard_data(user, recent_limit=DEFAULT_RECENT_TRANSACTIONS_LIMIT):
+
+def get_dashboard_data(
+    user, recent_limit=DEFAULT_RECENT_TRANSACTIONS_LIMIT, category_limit=DEFAULT_CATEGORY_BREAKDOWN_LIMIT,
+):
     """
     Build dashboard payload: totals (annotate), by_category (annotate), recent_transactions.
-    Uses annotate/aggregate only; no N+1.
+    Totals and by_category come from TransactionDailyRollup; uses annotate/aggregate only, no N+1.
+    by_category holds at most category_limit categories per transaction type plus an "other" row.
     """
-    base_qs = Transaction.objects.filter(user=user)
+    rollup_qs = TransactionDailyRollup.objects.filter(user=user)
 
     # Totals via aggregate with conditional Sum
-    totals = base_qs.aggregate(
-        total_income=Sum('amount', filter=Q(transaction_type=Transaction.TransactionType.INCOME), default=0),
-        total_expense=Sum('amount', filter=Q(transaction_type=Transaction.TransactionType.EXPENSE), default=0),
+    totals = rollup_qs.aggregate(
+        total_income=Sum('total', filter=Q(transaction_type=Transaction.TransactionType.INCOME), default=0),
+        total_expense=Sum('total', filter=Q(transaction_type=Transaction.TransactionType.EXPENSE), default=0),
     )
     total_income = totals['total_income'] or ZERO
     total_expense = totals['total_expense'] or ZERO
 
-    # By category via values + annotate
-    by_category = (
-        base_qs.values('category__name', 'category__category_type')
-        .annotate(total=Sum('amount'))
-        .order_by('-total')
-    )
-    by_category_list = [
-        {
-            'category_name': row['category__name'],
-            'category_type': row['category__category_type'],
-            'total': str(row['total']),
-        }
-        for row in by_category
-    ]
+    # By category: top N per type via values + annotate, the rest (and uncategorized) folded
+    # into one "other" row per type, derived from the totals above
+    by_category_list = []
+    for transaction_type, type_total in (
+        (Transaction.TransactionType.INCOME, total_income),
+        (Transaction.TransactionType.EXPENSE, total_expense),
+    ):
+        top = (
+            rollup_qs.filter(transaction_type=transaction_type, category__isnull=False)
+            .values('category__name', 'category__category_type')
+            .annotate(sum_total=Sum('total'))
+            .order_by('-sum_total')[:category_limit]
+        )
+        rest = type_total
+        for row in top:
+            rest -= row['sum_total']
+            by_category_list.append({
+                'category_name': row['category__name'],
+                'category_type': row['category__category_type'],
+                'total': str(row['sum_total']),
+                'is_other': False,
+            })
+        if rest:
+            by_category_list.append({
+                'category_name': OTHER_CATEGORY_NAME,
+                'category_type': transaction_type,
+                'total': str(rest),
+                'is_other': True,
+            })
 
     # Recent transactions (last N)
     recent = (
-        base_qs.select_related('category', 'activity_code')
+        Transaction.objects.filter(user=user)
+        .select_related('category', 'activity_code')
         .order_by('-transaction_date', '-created_at')[:recent_limit]
     )
     recent_list = [
@@ -64,3 +90,22 @@ def get_dashboard_data(user, recent_limit=DEFAULT_RECENT_TRANSACTIONS_LIMIT):
         'recent_transactions': recent_list,
     }
 
+
+def get_cached_dashboard_data(user, recent_limit=DEFAULT_RECENT_TRANSACTIONS_LIMIT, use_cache=True):
+    """
+    Dashboard payload cached under the user's data version (see cache_service).
+
+    Returns:
+        tuple: (data, cache_hit). With use_cache=False the cache is not read,
+        but the fresh payload is still stored.
+    """
+    key = DASHBOARD_CACHE_KEY.format(user_id=user.pk, version=get_data_version(user.pk), recent_limit=recent_limit)
+    if use_cache:
+        data = cache.get(key)
+        if data is not None:
+            record_cache_event(DASHBOARD_CACHE_NAME, 'hit')
+            return data, True
+    record_cache_event(DASHBOARD_CACHE_NAME, 'miss')
+    data = get_dashboard_data(user, recent_limit=recent_limit)
+    cache.set(key, data, settings.DASHBOARD_CACHE_TTL)
+    return data, False
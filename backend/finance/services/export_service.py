@@ -0,0 +1,88 @@
+"""
+Transaction ledger export (CSV / XLSX) with flat memory use.
+
+Rows are read with QuerySet.iterator() (server-side cursor on PostgreSQL) as plain tuples.
+CSV is produced lazily for StreamingHttpResponse; XLSX is written by openpyxl in write-only
+mode into a temporary file that is then streamed back.
+"""
+
+import csv
+import tempfile
+from datetime import datetime
+
+from django.utils import timezone
+from openpyxl import Workbook
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Column header -> queryset values_list() path; headers match the bulk import fields
+EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('transaction_date', 'transaction_date'),
+    ('transaction_type', 'transaction_type'),
+    ('amount', 'amount'),
+    ('payment_method', 'payment_method'),
+    ('category', 'category_id'),
+    ('category_name', 'category__name'),
+    ('activity_code', 'activity_code_id'),
+    ('activity_code_name', 'activity_code__name'),
+    ('is_business', 'is_business'),
+    ('is_taxable', 'is_taxable'),
+    ('cash_tax_rate', 'cash_tax_rate'),
+    ('non_cash_tax_rate', 'non_cash_tax_rate'),
+    ('description', 'description'),
+    ('created_at', 'created_at'),
+)
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer in a generator."""
+
+    def write(self, value):
+        return value
+
+
+def _export_rows(queryset):
+    return queryset.values_list(*(path for _, path in EXPORT_COLUMNS)).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def _xlsx_value(value):
+    # Excel has no time zones: write local time
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        return timezone.localtime(value).replace(tzinfo=None)
+    return value
+
+
+def iter_transactions_csv(queryset):
+    """Yield CSV lines (UTF-8 BOM first, so Excel detects the encoding)."""
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow([header for header, _ in EXPORT_COLUMNS])
+    for row in _export_rows(queryset):
+        yield writer.writerow([_csv_value(value) for value in row])
+
+
+def write_transactions_xlsx(queryset):
+    """
+    Write the ledger into a temporary .xlsx file and return it, positioned at the start.
+    The caller is responsible for closing it (FileResponse does).
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Транзакции')
+    sheet.append([header for header, _ in EXPORT_COLUMNS])
+    for row in _export_rows(queryset):
+        sheet.append([_xlsx_value(value) for value in row])
+
+    output = tempfile.TemporaryFile(suffix='.xlsx')
+    workbook.save(output)
+    output.seek(0)
+    return output
@@ -0,0 +1,208 @@
+"""
+Daily rollup of transactions for analytics.
+
+TransactionDailyRollup keeps sum/count per (user, day, transaction_type, payment_method,
+category, activity_code, is_taxable, is_business). TransactionService applies deltas
+inside its atomic blocks, so the rollup commits or rolls back together with the ledger.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from finance.models import Transaction, TransactionDailyRollup
+
+ROLLUP_DIMENSIONS = (
+    'transaction_type',
+    'payment_method',
+    'category_id',
+    'activity_code_id',
+    'is_taxable',
+    'is_business',
+)
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def snapshot_transaction(txn):
+    """Return (rollup_key, amount) for a transaction as it currently is."""
+    key = {'user_id': txn.user_id, 'day': txn.transaction_date}
+    for field in ROLLUP_DIMENSIONS:
+        key[field] = getattr(txn, field)
+    return key, txn.amount
+
+
+def snapshot_transaction_row(row):
+    """Return (rollup_key, total) for an existing rollup row."""
+    key = {'user_id': row.user_id, 'day': row.day}
+    for field in ROLLUP_DIMENSIONS:
+        key[field] = getattr(row, field)
+    return key, row.total
+
+
+def _apply_delta(key, amount, count):
+    """Add amount/count to the rollup row for key, creating or deleting it as needed."""
+    rows = TransactionDailyRollup.objects.filter(**key)
+    updated = rows.update(total=F('total') + amount, count=F('count') + count)
+    if not updated:
+        try:
+            with transaction.atomic():
+                TransactionDailyRollup.objects.create(**key, total=amount, count=count)
+        except IntegrityError:
+            # Concurrent writer created the row first
+            rows.update(total=F('total') + amount, count=F('count') + count)
+    if count < 0:
+        rows.filter(count__lte=0).delete()
+
+
+def record_transaction_created(txn):
+    key, amount = snapshot_transaction(txn)
+    _apply_delta(key, amount, 1)
+
+
+def record_transactions_created(txns):
+    """
+    Batch variant of record_transaction_created for bulk inserts.
+    Locks the affected rollup rows, updates them with bulk_update and inserts missing keys
+    with bulk_create, so the number of queries does not depend on the number of keys.
+    """
+    deltas = {}
+    for txn in txns:
+        key, amount = snapshot_transaction(txn)
+        frozen = tuple(key.items())
+        total, count = deltas.get(frozen, (0, 0))
+        deltas[frozen] = (total + amount, count + 1)
+    if not deltas:
+        return
+
+    user_ids = {dict(frozen)['user_id'] for frozen in deltas}
+    days = {dict(frozen)['day'] for frozen in deltas}
+    existing = TransactionDailyRollup.objects.select_for_update().filter(user_id__in=user_ids, day__in=days)
+    to_update = []
+    for row in existing:
+        frozen = tuple(snapshot_transaction_row(row)[0].items())
+        if frozen in deltas:
+            total, count = deltas.pop(frozen)
+            row.total += total
+            row.count += count
+            to_update.append(row)
+    TransactionDailyRollup.objects.bulk_update(to_update, ['total', 'count'], batch_size=REBUILD_BATCH_SIZE)
+
+    missing = [
+        TransactionDailyRollup(**dict(frozen), total=total, count=count)
+        for frozen, (total, count) in deltas.items()
+    ]
+    try:
+        with transaction.atomic():
+            TransactionDailyRollup.objects.bulk_create(missing, batch_size=REBUILD_BATCH_SIZE)
+    except IntegrityError:
+        # Concurrent writer created some of the rows first
+        for frozen, (total, count) in deltas.items():
+            _apply_delta(dict(frozen), total, count)
+
+
+def record_transaction_deleted(txn):
+    key, amount = snapshot_transaction(txn)
+    _apply_delta(key, -amount, -1)
+
+
+def record_transaction_updated(old_snapshot, txn):
+    """Move a transaction from its previous rollup key/amount (see snapshot_transaction) to the current one."""
+    old_key, old_amount = old_snapshot
+    new_key, new_amount = snapshot_transaction(txn)
+    if old_key == new_key:
+        if old_amount != new_amount:
+            _apply_delta(new_key, new_amount - old_amount, 0)
+        return
+    _apply_delta(old_key, -old_amount, -1)
+    _apply_delta(new_key, new_amount, 1)
+
+
+def reassign_rollup_dimension(field, value):
+    """
+    Fold rollup rows with field=value into field=NULL.
+    Mirrors on_delete=SET_NULL of Transaction.category / Transaction.activity_code.
+    """
+    rows = list(TransactionDailyRollup.objects.filter(**{field: value}))
+    for row in rows:
+        key, _ = snapshot_transaction_row(row)
+        row.delete()
+        key[field] = None
+        _apply_delta(key, row.total, row.count)
+
+
+def _raw_aggregates(user_id=None):
+    qs = Transaction.objects.all()
+    if user_id is not None:
+        qs = qs.filter(user_id=user_id)
+    return (
+        qs.values('user_id', 'transaction_date', *ROLLUP_DIMENSIONS)
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+
+
+def _rollup_user_ids():
+    user_ids = set(Transaction.objects.values_list('user_id', flat=True).distinct())
+    user_ids.update(TransactionDailyRollup.objects.values_list('user_id', flat=True).distinct())
+    return sorted(user_ids)
+
+
+@transaction.atomic
+def rebuild_user_rollup(user_id):
+    """Recompute all rollup rows of one user from raw transactions. Returns number of rows written."""
+    # Lock the user's ledger rows so updates/deletes wait for the rebuild
+    list(Transaction.objects.select_for_update().filter(user_id=user_id).values_list('id', flat=True))
+    TransactionDailyRollup.objects.filter(user_id=user_id).delete()
+    rows = [
+        TransactionDailyRollup(
+            user_id=r['user_id'],
+            day=r['transaction_date'],
+            total=r['total'],
+            count=r['count'],
+            **{field: r[field] for field in ROLLUP_DIMENSIONS},
+        )
+        for r in _raw_aggregates(user_id).iterator()
+    ]
+    TransactionDailyRollup.objects.bulk_create(rows, batch_size=REBUILD_BATCH_SIZE)
+    return len(rows)
+
+
+def rebuild_rollups(user_id=None):
+    """Rebuild rollups for one user or for everyone. Returns {user_id: rows_written}."""
+    user_ids = [user_id] if user_id is not None else _rollup_user_ids()
+    return {uid: rebuild_user_rollup(uid) for uid in user_ids}
+
+
+def find_rollup_mismatches(user_id=None):
+    """
+    Compare the rollup with raw transaction sums.
+
+    Returns:
+        List of {key: dict, expected: (total, count), actual: (total, count)};
+        missing side is None.
+    """
+    def _key(row, day_field):
+        return (row['user_id'], row[day_field]) + tuple(row[field] for field in ROLLUP_DIMENSIONS)
+
+    expected = {
+        _key(r, 'transaction_date'): (r['total'], r['count'])
+        for r in _raw_aggregates(user_id).iterator()
+    }
+
+    rollup_qs = TransactionDailyRollup.objects.all()
+    if user_id is not None:
+        rollup_qs = rollup_qs.filter(user_id=user_id)
+    actual = {
+        _key(r, 'day'): (r['total'], r['count'])
+        for r in rollup_qs.values('user_id', 'day', 'total', 'count', *ROLLUP_DIMENSIONS).iterator()
+    }
+
+    mismatches = []
+    for key in sorted(expected.keys() | actual.keys(), key=str):
+        if expected.get(key) != actual.get(key):
+            mismatches.append({
+                'key': dict(zip(('user_id', 'day') + ROLLUP_DIMENSIONS, key)),
+                'expected': expected.get(key),
+                'actual': actual.get(key),
+            })
+    return mismatches
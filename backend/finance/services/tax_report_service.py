@@ -3,12 +3,24 @@ Tax report for a chosen period. Uses transactions + org tax settings.
 No separate app: tax period settings live in organization, report data in finance.
 """
 
-from decimal import Decimal
-
 from django.db.models import Q, Sum
 
 from finance.constants import ZERO
-from finance.models import Transaction
+from finance.models import Transaction, TransactionDailyRollup
+
+
+class _Slice:
+    """Running income/expense sums for one report slice."""
+
+    __slots__ = ('income', 'expense')
+
+    def __init__(self):
+        self.income = ZERO
+        self.expense = ZERO
+
+    def add(self, row):
+        self.income += row['income'] or ZERO
+        self.expense += row['expense'] or ZERO
 
 
 def build_tax_report(user, date_from, date_to):
@@ -17,68 +29,55 @@ def build_tax_report(user, date_from, date_to):
     
     Returns aggregates: totals by type, by payment method (with tax amounts),
     taxable vs non-taxable, and by activity code for business transactions.
+    All slices are folded from one grouped scan of TransactionDailyRollup.
     """
-    qs = Transaction.objects.filter(
-        user=user,
-        transaction_date__gte=date_from,
-        transaction_date__lte=date_to
+    rows = (
+        TransactionDailyRollup.objects.filter(user=user, day__gte=date_from, day__lte=date_to)
+        .values('payment_method', 'is_taxable', 'is_business', 'activity_code', 'activity_code__name')
+        .annotate(
+            income=Sum('total', filter=Q(transaction_type=Transaction.TransactionType.INCOME), default=0),
+            expense=Sum('total', filter=Q(transaction_type=Transaction.TransactionType.EXPENSE), default=0),
+        )
+        .order_by('activity_code')
     )
 
-    # Overall totals
-    totals = qs.aggregate(
-        total_income=Sum('amount', filter=Q(transaction_type=Transaction.TransactionType.INCOME), default=0),
-        total_expense=Sum('amount', filter=Q(transaction_type=Transaction.TransactionType.EXPENSE), default=0),
-    )
-    total_income = totals['total_income'] or ZERO
-    total_expense = totals['total_expense'] or ZERO
+    totals = _Slice()
+    taxable = _Slice()
+    non_taxable = _Slice()
+    by_method = {method: _Slice() for method in Transaction.PaymentMethod.values}
+    by_activity = {}
 
-    # Taxable vs non-taxable
-    taxable = qs.filter(is_taxable=True).aggregate(
-        income=Sum('amount', filter=Q(transaction_type=Transaction.TransactionType.INCOME), default=0),
-        expense=Sum('amount', filter=Q(transaction_type=Transaction.TransactionType.EXPENSE), default=0),
-    )
-    non_taxable = qs.filter(is_taxable=False).aggregate(
-        income=Sum('amount', filter=Q(transaction_type=Transaction.TransactionType.INCOME), default=0),
-        expense=Sum('amount', filter=Q(transaction_type=Transaction.TransactionType.EXPENSE), default=0),
-    )
+    for r in rows:
+        totals.add(r)
+        (taxable if r['is_taxable'] else non_taxable).add(r)
+        by_method[r['payment_method']].add(r)
+        if r['is_business'] and r['activity_code'] is not None:
+            if r['activity_code'] not in by_activity:
+                by_activity[r['activity_code']] = (r['activity_code__name'], _Slice())
+            by_activity[r['activity_code']][1].add(r)
 
     # By payment method (cash / non_cash)
-    by_payment = []
-    for method, label in Transaction.PaymentMethod.choices:
-        method_qs = qs.filter(payment_method=method)
-        agg = method_qs.aggregate(
-            income=Sum('amount', filter=Q(transaction_type=Transaction.TransactionType.INCOME), default=0),
-            expense=Sum('amount', filter=Q(transaction_type=Transaction.TransactionType.EXPENSE), default=0),
-        )
-        income = agg['income'] or ZERO
-        expense = agg['expense'] or ZERO
-        by_payment.append({
+    by_payment = [
+        {
             'payment_method': method,
             'payment_method_display': label,
-            'income': str(income),
-            'expense': str(expense),
-            'net': str(income - expense),
-        })
+            'income': str(by_method[method].income),
+            'expense': str(by_method[method].expense),
+            'net': str(by_method[method].income - by_method[method].expense),
+        }
+        for method, label in Transaction.PaymentMethod.choices
+    ]
 
     # By activity code (business transactions)
-    by_activity = list(
-        qs.filter(is_business=True, activity_code__isnull=False)
-        .values('activity_code', 'activity_code__name')
-        .annotate(
-            income=Sum('amount', filter=Q(transaction_type=Transaction.TransactionType.INCOME), default=0),
-            expense=Sum('amount', filter=Q(transaction_type=Transaction.TransactionType.EXPENSE), default=0),
-        )
-        .order_by('-income')
-    )
     by_activity_list = [
         {
-            'activity_code_id': r['activity_code'],
-            'activity_name': r['activity_code__name'],
-            'income': str(r['income'] or ZERO),
-            'expense': str(r['expense'] or ZERO),
-            'net': str((r['income'] or ZERO) - (r['expense'] or ZERO)),
+            'activity_code_id': activity_id,
+            'activity_name': name,
+            'income': str(agg.income),
+            'expense': str(agg.expense),
+            'net': str(agg.income - agg.expense),
         }
-        for r in by_activity
+        for activity_id, (name, agg) in sorted(by_activity.items(), key=lambda item: -item[1][1].income)
     ]
 
     return {
@@ -87,17 +86,17 @@ def build_tax_report(user, date_from, date_to):
             'date_to': date_to.isoformat(),
         },
         'totals': {
-            'total_income': str(total_income),
-            'total_expense': str(total_expense),
-            'net': str(total_income - total_expense),
+            'total_income': str(totals.income),
+            'total_expense': str(totals.expense),
+            'net': str(totals.income - totals.expense),
         },
         'taxable': {
-            'income': str(taxable['income'] or ZERO),
-            'expense': str(taxable['expense'] or ZERO),
+            'income': str(taxable.income),
+            'expense': str(taxable.expense),
         },
         'non_taxable': {
-            'income': str(non_taxable['income'] or ZERO),
-            'expense': str(non_taxable['expense'] or ZERO),
+            'income': str(non_taxable.income),
+            'expense': str(non_taxable.expense),
         },
         'by_payment_method': by_payment,
         'by_activity': by_activity_list,
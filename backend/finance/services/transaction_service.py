@@ -1,8 +1,19 @@
 from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 
+from finance.constants import BULK_CREATE_BATCH_SIZE
 from finance.models import Transaction
+from finance.services.cache_service import bump_data_version
+from finance.services.rollup_service import (
+    record_transaction_created,
+    record_transaction_deleted,
+    record_transaction_updated,
+    record_transactions_created,
+    snapshot_transaction,
+)
 from finance.utils import update_instance_from_dict
+from organization.models import OrganizationActivity
 
 
 def _validate_transaction_business_rules(validated_data, instance=None):
@@ -38,12 +49,87 @@ class TransactionService:
     def create_transaction(user, validated_data):
         """Create a new transaction."""
         _validate_transaction_business_rules(validated_data, instance=None)
-        return Transaction.objects.create(user=user, **validated_data)
+        instance = Transaction.objects.create(user=user, **validated_data)
+        record_transaction_created(instance)
+        return instance
 
     @staticmethod
     @transaction.atomic
     def update_transaction(instance, validated_data):
         """Update an existing transaction."""
         _validate_transaction_business_rules(validated_data, instance=instance)
+        # Lock the row and take the rollup key from the stored version
+        stored = Transaction.objects.select_for_update().get(pk=instance.pk)
+        old_snapshot = snapshot_transaction(stored)
         update_instance_from_dict(instance, validated_data)
+        record_transaction_updated(old_snapshot, instance)
         return instance
+
+    @staticmethod
+    @transaction.atomic
+    def delete_transaction(instance):
+        """Delete a transaction."""
+        stored = Transaction.objects.select_for_update().get(pk=instance.pk)
+        record_transaction_deleted(stored)
+        stored.delete()
+
+    @staticmethod
+    def apply_activity_rates(user_id, activity_id, cash_tax_rate, non_cash_tax_rate):
+        """
+        Copy an organization activity's rates to the user's business transactions with that activity.
+        One set-based UPDATE (no per-row save); rows that already have these rates are skipped.
+
+        Returns:
+            int: number of updated transactions
+        """
+        return (
+            Transaction.objects.filter(user_id=user_id, is_business=True, activity_code_id=activity_id)
+            .exclude(cash_tax_rate=cash_tax_rate, non_cash_tax_rate=non_cash_tax_rate)
+            .update(
+                cash_tax_rate=cash_tax_rate,
+                non_cash_tax_rate=non_cash_tax_rate,
+                updated_at=timezone.now(),
+            )
+        )
+
+    @staticmethod
+    def bulk_create_transactions(user, rows):
+        """
+        Insert many transactions at once.
+
+        Rows come already cleaned by TransactionBulkItemSerializer; the service checks the
+        business rules, copies the activity tax rates (loaded once per call) and inserts the
+        valid rows with bulk_create. Rows that break a business rule are reported and skipped.
+
+        Args:
+            rows: [(row_number, validated_data)]
+
+        Returns:
+            tuple: (created_transactions, errors) where errors is [{row: int, errors: dict}]
+        """
+        activity_rates = OrganizationActivity.objects.filter(profile__user=user).values_list(
+            'activity_id', 'cash_tax_rate', 'non_cash_tax_rate'
+        )
+        rates = {activity_id: (cash, non_cash) for activity_id, cash, non_cash in activity_rates}
+
+        to_create = []
+        errors = []
+        for number, validated_data in rows:
+            try:
+                _validate_transaction_business_rules(validated_data, instance=None)
+            except serializers.ValidationError as e:
+                errors.append({'row': number, 'errors': e.detail})
+                continue
+            txn = Transaction(user=user, **validated_data)
+            # Same rate copy as Transaction.save(), from the preloaded map
+            if txn.is_business and txn.activity_code_id in rates:
+                txn.cash_tax_rate, txn.non_cash_tax_rate = rates[txn.activity_code_id]
+            to_create.append(txn)
+
+        with transaction.atomic():
+            created = Transaction.objects.bulk_create(to_create, batch_size=BULK_CREATE_BATCH_SIZE)
+            record_transactions_created(created)
+            if created:
+                # bulk_create sends no post_save signals
+                bump_data_version(user.pk)
+        return created, errors
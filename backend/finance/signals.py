@@ -0,0 +1,77 @@
+"""
+Finance signal handlers:
+- keep TransactionDailyRollup in line with SET_NULL on Transaction.category / activity_code;
+- copy changed OrganizationActivity rates to transactions and drop the cached rate map;
+- bump the per-user data version on ledger and organization settings writes (see services/cache_service).
+"""
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from activities.models import ActivityCode
+from finance.models import Category, Transaction
+from finance.services.cache_service import bump_data_version
+from finance.services.rollup_service import reassign_rollup_dimension
+from finance.services.transaction_service import TransactionService
+from organization.activity_rates import invalidate_activity_rates
+from organization.models import OrganizationActivity, OrganizationProfile
+
+
+@receiver(pre_delete, sender=Category)
+def fold_category_rollups(sender, instance, **kwargs):
+    reassign_rollup_dimension('category_id', instance.pk)
+
+
+@receiver(pre_delete, sender=ActivityCode)
+def fold_activity_code_rollups(sender, instance, **kwargs):
+    reassign_rollup_dimension('activity_code_id', instance.pk)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def bump_version_on_transaction_write(sender, instance, **kwargs):
+    bump_data_version(instance.user_id)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_version_on_category_write(sender, instance, **kwargs):
+    # System categories (user=None) are shared by everyone
+    bump_data_version(instance.user_id)
+
+
+@receiver(post_save, sender=OrganizationActivity)
+@receiver(post_delete, sender=OrganizationActivity)
+def bump_version_on_organization_activity_write(sender, instance, **kwargs):
+    try:
+        user_id = instance.profile.user_id
+    except ObjectDoesNotExist:
+        return
+    invalidate_activity_rates(user_id)
+    bump_data_version(user_id)
+
+
+@receiver(post_save, sender=OrganizationActivity)
+def apply_organization_activity_rates(sender, instance, **kwargs):
+    # Deleting an activity keeps the rates already copied to transactions
+    try:
+        user_id = instance.profile.user_id
+    except ObjectDoesNotExist:
+        return
+    TransactionService.apply_activity_rates(
+        user_id, instance.activity_id, instance.cash_tax_rate, instance.non_cash_tax_rate
+    )
+
+
+@receiver(post_save, sender=ActivityCode)
+@receiver(post_delete, sender=ActivityCode)
+def bump_version_on_activity_code_write(sender, instance, **kwargs):
+    # Activity code names are part of the tax report of every user
+    bump_data_version()
+
+
+@receiver(post_save, sender=OrganizationProfile)
+def bump_version_on_organization_profile_write(sender, instance, **kwargs):
+    # Tax period settings define tax_period buckets of the time series
+    bump_data_version(instance.user_id)
@@ -0,0 +1,566 @@
+import asyncio
+import json
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Q, Sum
+from django.http import JsonResponse
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from activities.models import ActivityCode
+from core.idempotency import REPLAYED_HEADER, IdempotencyMiddleware, _fingerprint, _scope_key
+from finance.constants import DEFAULT_CATEGORY_BREAKDOWN_LIMIT, ZERO
+from finance.models import Category, Transaction, TransactionDailyRollup
+from finance.services.dashboard_service import OTHER_CATEGORY_NAME, get_dashboard_data
+from finance.services.rollup_service import find_rollup_mismatches
+from finance.services.tax_report_service import build_tax_report
+from finance.services.transaction_service import TransactionService
+from organization.models import OrganizationActivity, OrganizationProfile
+from users.models import CustomUser
+
+
+def make_user(email):
+    user = CustomUser.objects.create_user(email=email, password="p")
+    OrganizationProfile.objects.create(
+        user=user,
+        org_type=OrganizationProfile.OrgType.IE,
+        tax_regime=OrganizationProfile.TaxRegime.SINGLE,
+        onboarding_status=OrganizationProfile.OnboardingStatus.COMPLETED,
+    )
+    return user
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user("keyset@example.com")
+        rng = random.Random(4)
+        # Few dates and amounts: many ties, so every ordering column and the id tie-breaker matter
+        for _ in range(57):
+            Transaction.objects.create(
+                user=cls.user,
+                transaction_type=rng.choice(Transaction.TransactionType.values),
+                payment_method=rng.choice(Transaction.PaymentMethod.values),
+                is_business=False,
+                is_taxable=False,
+                amount=Decimal(rng.choice(["10.00", "25.50", "99.99"])),
+                transaction_date=date(2025, 1, 1) + timedelta(days=rng.randint(0, 4)),
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _walk(self, url, link):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row["id"] for row in response.json()["results"])
+            url = response.json()[link]
+        return ids
+
+    def test_pages_follow_ordering(self):
+        orderings = {
+            None: ("-transaction_date", "-created_at", "-id"),
+            "amount": ("amount", "id"),
+            "-amount,transaction_date": ("-amount", "transaction_date", "id"),
+        }
+        for ordering, order_by in orderings.items():
+            with self.subTest(ordering=ordering):
+                url = "/api/finance/transactions/?pagination=cursor&limit=10"
+                if ordering:
+                    url += f"&ordering={ordering}"
+                expected = list(Transaction.objects.order_by(*order_by).values_list("id", flat=True))
+                self.assertEqual(self._walk(url, "next"), expected)
+
+    def test_previous_links_walk_back(self):
+        url = "/api/finance/transactions/?pagination=cursor&limit=10"
+        last = None
+        while url:
+            last = self.client.get(url).json()
+            url = last["next"]
+        backward = []
+        url = last["previous"]
+        while url:
+            page = self.client.get(url).json()
+            # Each page keeps the forward order; pages arrive last to first
+            backward = [row["id"] for row in page["results"]] + backward
+            url = page["previous"]
+        expected = list(
+            Transaction.objects.order_by("-transaction_date", "-created_at", "-id").values_list("id", flat=True)
+        )
+        self.assertEqual(backward, expected[:len(backward)])
+        self.assertEqual(len(expected) - len(backward), len(last["results"]))
+
+    def test_cursor_bounds_leading_column(self):
+        first = self.client.get("/api/finance/transactions/?pagination=cursor&limit=10").json()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first["next"])
+        sql = next(
+            q["sql"] for q in queries.captured_queries if "finance_transaction" in q["sql"] and "LIMIT" in q["sql"]
+        )
+        # Range on transaction_date ANDed onto the OR expansion: the index seek starts at the cursor
+        self.assertRegex(sql, r'"transaction_date" <= \S+ AND \(')
+
+
+def _reference_tax_report(user, date_from, date_to):
+    """build_tax_report before the grouped scan: separate aggregates over Transaction."""
+    qs = Transaction.objects.filter(user=user, transaction_date__gte=date_from, transaction_date__lte=date_to)
+    income = Q(transaction_type=Transaction.TransactionType.INCOME)
+    expense = Q(transaction_type=Transaction.TransactionType.EXPENSE)
+
+    def sums(queryset):
+        agg = queryset.aggregate(
+            income=Sum('amount', filter=income, default=0), expense=Sum('amount', filter=expense, default=0)
+        )
+        return agg['income'] or ZERO, agg['expense'] or ZERO
+
+    total_income, total_expense = sums(qs)
+    taxable = sums(qs.filter(is_taxable=True))
+    non_taxable = sums(qs.filter(is_taxable=False))
+    by_payment = []
+    for method, label in Transaction.PaymentMethod.choices:
+        method_income, method_expense = sums(qs.filter(payment_method=method))
+        by_payment.append({
+            'payment_method': method,
+            'payment_method_display': label,
+            'income': str(method_income),
+            'expense': str(method_expense),
+            'net': str(method_income - method_expense),
+        })
+    by_activity = (
+        qs.filter(is_business=True, activity_code__isnull=False)
+        .values('activity_code', 'activity_code__name')
+        .annotate(income=Sum('amount', filter=income, default=0), expense=Sum('amount', filter=expense, default=0))
+        # The old query ordered by -income only; ties are pinned to the id order the new code keeps
+        .order_by('-income', 'activity_code')
+    )
+    return {
+        'period': {'date_from': date_from.isoformat(), 'date_to': date_to.isoformat()},
+        'totals': {
+            'total_income': str(total_income),
+            'total_expense': str(total_expense),
+            'net': str(total_income - total_expense),
+        },
+        'taxable': {'income': str(taxable[0]), 'expense': str(taxable[1])},
+        'non_taxable': {'income': str(non_taxable[0]), 'expense': str(non_taxable[1])},
+        'by_payment_method': by_payment,
+        'by_activity': [
+            {
+                'activity_code_id': r['activity_code'],
+                'activity_name': r['activity_code__name'],
+                'income': str(r['income'] or ZERO),
+                'expense': str(r['expense'] or ZERO),
+                'net': str((r['income'] or ZERO) - (r['expense'] or ZERO)),
+            }
+            for r in by_activity
+        ],
+    }
+
+
+AMOUNT_KEYS = {'total_income', 'total_expense', 'net', 'income', 'expense'}
+
+
+def _report_bytes(report):
+    """
+    JSON of the report as the API returns it. PostgreSQL sums numeric(12, 2) exactly, so the
+    bytes are compared as they are; SQLite sums DECIMAL as floats and prints 15 significant
+    digits, so there the amounts are compared to the cent.
+    """
+    if connection.vendor != 'postgresql':
+        def canonical(value):
+            if isinstance(value, dict):
+                return {
+                    key: str(Decimal(item).quantize(Decimal('0.01'))) if key in AMOUNT_KEYS else canonical(item)
+                    for key, item in value.items()
+                }
+            if isinstance(value, list):
+                return [canonical(item) for item in value]
+            return value
+        report = canonical(report)
+    return json.dumps(report, ensure_ascii=False)
+
+
+class TaxReportEquivalenceTests(TestCase):
+    """build_tax_report (one grouped scan of the daily rollup) returns what the old aggregates returned."""
+
+    START = date(2025, 1, 1)
+    DAYS = 120
+
+    def _random_fields(self, rng, activities, categories):
+        transaction_type = rng.choice(Transaction.TransactionType.values)
+        is_business = rng.random() < 0.7
+        return {
+            'transaction_type': transaction_type,
+            'category': rng.choice([None] + [c for c in categories if c.category_type == transaction_type]),
+            'payment_method': rng.choice(Transaction.PaymentMethod.values),
+            'is_business': is_business,
+            'is_taxable': rng.random() < 0.8,
+            'activity_code': rng.choice(activities) if is_business else rng.choice([None, activities[0]]),
+            # Equal amounts now and then, so activities tie on income
+            'amount': rng.choice([Decimal("100.00"), Decimal(rng.randint(1, 10 ** 9)) / 100]),
+            'transaction_date': self.START + timedelta(days=rng.randint(0, self.DAYS)),
+        }
+
+    def _random_ledger(self, rng, user, activities, categories):
+        # Through TransactionService, as the API writes: it maintains the daily rollup
+        rows = [
+            TransactionService.create_transaction(user, self._random_fields(rng, activities, categories))
+            for _ in range(rng.randint(0, 150))
+        ]
+        for row in rng.sample(rows, len(rows) // 5):
+            if rng.random() < 0.5:
+                TransactionService.delete_transaction(row)
+            else:
+                TransactionService.update_transaction(row, self._random_fields(rng, activities, categories))
+
+    def test_random_ledgers(self):
+        rng = random.Random(2)
+        activities = [
+            ActivityCode.objects.create(code=f"90.{i}", section="R", name=f"Деятельность {i}") for i in range(5)
+        ]
+        for ledger in range(8):
+            user = make_user(f"ledger{ledger}@example.com")
+            categories = [
+                Category.objects.create(user=user, name=f"{kind}{i}", category_type=kind)
+                for kind in Category.CategoryType.values for i in range(2)
+            ]
+            self._random_ledger(rng, user, activities, categories)
+            for _ in range(6):
+                date_from = self.START + timedelta(days=rng.randint(-10, self.DAYS))
+                date_to = date_from + timedelta(days=rng.randint(0, self.DAYS))
+                with self.subTest(ledger=ledger, date_from=date_from, date_to=date_to):
+                    self.assertEqual(
+                        _report_bytes(build_tax_report(user, date_from, date_to)),
+                        _report_bytes(_reference_tax_report(user, date_from, date_to)),
+                    )
+
+
+class IdempotencyTests(TestCase):
+    URL = "/api/finance/transactions/"
+    BULK_URL = "/api/finance/transactions/bulk/"
+    BODY = {
+        "transaction_type": "expense", "amount": "10.00", "payment_method": "cash",
+        "is_business": False, "transaction_date": "2025-01-10",
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user("idempotency@example.com")
+        self.client = APIClient()
+        # The middleware runs before DRF: it sees the user through the JWT, as in production
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+
+    def _post(self, key, body=None):
+        return self.client.post(self.URL, body or self.BODY, format="json", HTTP_IDEMPOTENCY_KEY=key)
+
+    def _upload(self, key, content):
+        upload = SimpleUploadedFile("rows.csv", content.encode(), content_type="text/csv")
+        return self.client.post(self.BULK_URL, {"file": upload}, format="multipart", HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_stored_response(self):
+        first = self._post("k1")
+        second = self._post("k1")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second[REPLAYED_HEADER], "true")
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 1)
+
+    def test_same_key_with_other_body_is_rejected(self):
+        self._post("k1")
+        response = self._post("k1", {**self.BODY, "amount": "11.00"})
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 1)
+
+    @override_settings(IDEMPOTENCY_WAIT=0)
+    def test_duplicate_of_running_request_gets_409(self):
+        request = APIRequestFactory().post(self.URL, self.BODY, format="json")
+        lock_key = _scope_key(self.user.pk, SimpleNamespace(method="POST", path=self.URL), "k1") + ":lock"
+        # The first request holds the lock and has not stored its response yet
+        cache.add(lock_key, {"fingerprint": _fingerprint(request), "token": "first"}, 60)
+
+        response = self._post("k1")
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertFalse(Transaction.objects.filter(user=self.user).exists())
+
+    def test_upload_fingerprint_covers_file_contents(self):
+        header = "amount,transaction_type,payment_method,is_business,transaction_date\n"
+        first = self._upload("csv", header + "10.00,expense,cash,false,2025-01-10\n")
+        replayed = self._upload("csv", header + "10.00,expense,cash,false,2025-01-10\n")
+        # Same size, different contents
+        other = self._upload("csv", header + "20.00,expense,cash,false,2025-01-10\n")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(replayed[REPLAYED_HEADER], "true")
+        self.assertEqual(other.status_code, 422)
+        amounts = Transaction.objects.filter(user=self.user).values_list("amount", flat=True)
+        self.assertEqual(list(amounts), [Decimal("10.00")])
+
+    def test_async_chain(self):
+        calls = []
+
+        async def view(request):
+            calls.append(request.body)
+            return JsonResponse({"call": len(calls)}, status=201)
+
+        middleware = IdempotencyMiddleware(view)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+
+        async def send(body):
+            request = AsyncRequestFactory().post(
+                self.URL, body, content_type="application/json", headers={"Idempotency-Key": "a1"},
+            )
+
+            async def auser():
+                return self.user
+            request.auser = auser
+            return await middleware(request)
+
+        async def scenario():
+            return [await send('{"a": 1}'), await send('{"a": 1}'), await send('{"a": 2}')]
+
+        first, replayed, other = asyncio.run(scenario())
+
+        self.assertEqual(json.loads(first.content), {"call": 1})
+        self.assertEqual(json.loads(replayed.content), {"call": 1})
+        self.assertEqual(replayed[REPLAYED_HEADER], "true")
+        self.assertEqual(other.status_code, 422)
+        self.assertEqual(len(calls), 1)
+
+
+class DashboardCategoryTests(TestCase):
+
+    def _create(self, user, amount, category=None, transaction_type=Transaction.TransactionType.EXPENSE):
+        TransactionService.create_transaction(user, {
+            'transaction_type': transaction_type,
+            'category': category,
+            'payment_method': Transaction.PaymentMethod.CASH,
+            'is_business': False,
+            'is_taxable': False,
+            'amount': Decimal(amount),
+            'transaction_date': date(2025, 1, 10),
+        })
+
+    def test_by_category_keeps_top_categories_and_folds_the_rest(self):
+        user = make_user("dashboard@example.com")
+        for i in range(1, DEFAULT_CATEGORY_BREAKDOWN_LIMIT + 3):
+            category = Category.objects.create(user=user, name=f"expense{i}", category_type="expense")
+            self._create(user, f"{i * 10}.00", category)
+        self._create(user, "5.00")
+        salary = Category.objects.create(user=user, name="salary", category_type="income")
+        self._create(user, "1000.00", salary, Transaction.TransactionType.INCOME)
+
+        rows = get_dashboard_data(user)["by_category"]
+
+        self.assertEqual(
+            [(row["category_name"], row["is_other"]) for row in rows],
+            [("salary", False)]
+            + [(f"expense{i}", False) for i in range(DEFAULT_CATEGORY_BREAKDOWN_LIMIT + 2, 2, -1)]
+            + [(OTHER_CATEGORY_NAME, True)],
+        )
+        # expense1 + expense2 + uncategorized
+        self.assertEqual(Decimal(rows[-1]["total"]), Decimal("35.00"))
+        self.assertEqual(rows[-1]["category_type"], "expense")
+        self.assertEqual(
+            sum(Decimal(row["total"]) for row in rows if row["category_type"] == "expense"),
+            Decimal(get_dashboard_data(user)["totals"]["total_expense"]),
+        )
+
+
+class RollupMaintenanceTests(TestCase):
+    """TransactionService writes and category/activity deletes keep TransactionDailyRollup exact."""
+
+    DAY = date(2025, 3, 1)
+
+    def setUp(self):
+        self.user = make_user("rollup@example.com")
+        self.food = Category.objects.create(user=self.user, name="food", category_type="expense")
+        self.rent = Category.objects.create(user=self.user, name="rent", category_type="expense")
+
+    def _fields(self, **overrides):
+        return {
+            'transaction_type': Transaction.TransactionType.EXPENSE,
+            'category': self.food,
+            'payment_method': Transaction.PaymentMethod.CASH,
+            'is_business': False,
+            'is_taxable': False,
+            'amount': Decimal("10.00"),
+            'transaction_date': self.DAY,
+            **overrides,
+        }
+
+    def _rollup(self):
+        return {
+            (row.day, row.category_id): (row.total, row.count)
+            for row in TransactionDailyRollup.objects.filter(user=self.user)
+        }
+
+    def test_create_update_delete_deltas(self):
+        first = TransactionService.create_transaction(self.user, self._fields())
+        second = TransactionService.create_transaction(self.user, self._fields(amount=Decimal("5.50")))
+        self.assertEqual(self._rollup(), {(self.DAY, self.food.pk): (Decimal("15.50"), 2)})
+
+        TransactionService.update_transaction(first, {'amount': Decimal("12.00")})
+        self.assertEqual(self._rollup(), {(self.DAY, self.food.pk): (Decimal("17.50"), 2)})
+
+        next_day = self.DAY + timedelta(days=1)
+        TransactionService.update_transaction(first, {'transaction_date': next_day})
+        self.assertEqual(self._rollup(), {
+            (self.DAY, self.food.pk): (Decimal("5.50"), 1),
+            (next_day, self.food.pk): (Decimal("12.00"), 1),
+        })
+
+        TransactionService.update_transaction(second, {'category': self.rent, 'amount': Decimal("7.00")})
+        self.assertEqual(self._rollup(), {
+            (self.DAY, self.rent.pk): (Decimal("7.00"), 1),
+            (next_day, self.food.pk): (Decimal("12.00"), 1),
+        })
+
+        TransactionService.delete_transaction(second)
+        TransactionService.delete_transaction(first)
+        self.assertEqual(self._rollup(), {})
+        self.assertEqual(find_rollup_mismatches(self.user.pk), [])
+
+    def test_category_delete_folds_into_null_key(self):
+        TransactionService.create_transaction(self.user, self._fields())
+        TransactionService.create_transaction(self.user, self._fields(category=self.rent, amount=Decimal("3.00")))
+        TransactionService.create_transaction(self.user, self._fields(category=None, amount=Decimal("1.00")))
+
+        self.food.delete()
+        self.rent.delete()
+
+        # Both categories merge with the existing uncategorized row, as SET_NULL does to the ledger
+        self.assertEqual(self._rollup(), {(self.DAY, None): (Decimal("14.00"), 3)})
+        self.assertEqual(find_rollup_mismatches(self.user.pk), [])
+
+    def test_activity_code_delete_folds_into_null_key(self):
+        activity = ActivityCode.objects.create(code="90.0", section="R", name="Деятельность")
+        TransactionService.create_transaction(self.user, self._fields(is_business=True, activity_code=activity))
+
+        activity.delete()
+
+        self.assertEqual(
+            list(TransactionDailyRollup.objects.filter(user=self.user).values_list("activity_code_id", "count")),
+            [(None, 1)],
+        )
+        self.assertEqual(find_rollup_mismatches(self.user.pk), [])
+
+    def test_check_and_rebuild_commands(self):
+        TransactionService.create_transaction(self.user, self._fields())
+        # Written past the service: the rollup misses it
+        Transaction.objects.create(user=self.user, **self._fields(amount=Decimal("2.00")))
+        out = StringIO()
+
+        with self.assertRaisesMessage(CommandError, "Найдено расхождений: 1"):
+            call_command("check_transaction_rollups", user=self.user.pk, stdout=out)
+
+        call_command("rebuild_transaction_rollups", user=self.user.pk, stdout=out)
+        self.assertEqual(self._rollup(), {(self.DAY, self.food.pk): (Decimal("12.00"), 2)})
+        call_command("check_transaction_rollups", stdout=out)
+        self.assertIn("Расхождений не найдено.", out.getvalue())
+
+    def test_check_command_fix(self):
+        TransactionService.create_transaction(self.user, self._fields())
+        TransactionDailyRollup.objects.filter(user=self.user).update(total=Decimal("99.00"))
+        out = StringIO()
+
+        call_command("check_transaction_rollups", fix=True, stdout=out)
+
+        self.assertIn("Пересчитано пользователей: 1", out.getvalue())
+        self.assertEqual(find_rollup_mismatches(), [])
+
+
+class BulkImportTests(TestCase):
+    URL = "/api/finance/transactions/bulk/"
+
+    def setUp(self):
+        self.user = make_user("bulk@example.com")
+        self.food = Category.objects.create(user=self.user, name="food", category_type="expense")
+        self.activity = ActivityCode.objects.create(code="90.0", section="R", name="Деятельность")
+        OrganizationActivity.objects.create(
+            profile=self.user.organization, activity=self.activity,
+            cash_tax_rate=Decimal("4.00"), non_cash_tax_rate=Decimal("2.00"),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _rows(self):
+        return [
+            {"amount": "10.00", "transaction_type": "expense", "category": self.food.pk, "payment_method": "cash",
+             "is_business": False, "transaction_date": "2025-02-01"},
+            # Field error: caught by the serializer
+            {"amount": "-1", "transaction_type": "expense", "payment_method": "cash", "is_business": False,
+             "transaction_date": "2025-02-01"},
+            # Business rule: category type must match
+            {"amount": "5.00", "transaction_type": "income", "category": self.food.pk, "payment_method": "cash",
+             "is_business": False, "transaction_date": "2025-02-01"},
+            {"amount": "100.00", "transaction_type": "income", "payment_method": "cash",
+             "activity_code": self.activity.pk, "transaction_date": "2025-02-02"},
+        ]
+
+    def _assert_imported(self, response):
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual(body["created"], 2)
+        self.assertEqual([(error["row"], list(error["errors"])) for error in body["errors"]],
+                         [(2, ["amount"]), (3, ["category"])])
+        business = Transaction.objects.get(pk=body["ids"][1])
+        self.assertEqual((business.cash_tax_rate, business.non_cash_tax_rate), (Decimal("4.00"), Decimal("2.00")))
+        # bulk_create bypasses save(): the rollup gets the rows through the batch delta
+        self.assertEqual(TransactionDailyRollup.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(find_rollup_mismatches(self.user.pk), [])
+
+    def test_json_rows(self):
+        self._assert_imported(self.client.post(self.URL, self._rows(), format="json"))
+
+    def test_json_object_with_transactions(self):
+        self._assert_imported(self.client.post(self.URL, {"transactions": self._rows()}, format="json"))
+
+    def test_csv_upload(self):
+        columns = [
+            "amount", "transaction_type", "category", "payment_method",
+            "is_business", "activity_code", "transaction_date",
+        ]
+        # CSV booleans are "true"/"false"
+        lines = [",".join(columns)] + [
+            ",".join(str(row.get(column, "")).replace("False", "false") for column in columns)
+            for row in self._rows()
+        ]
+        upload = SimpleUploadedFile("rows.csv", "\n".join(lines).encode(), content_type="text/csv")
+        self._assert_imported(self.client.post(self.URL, {"file": upload}, format="multipart"))
+
+    def test_only_invalid_rows(self):
+        response = self.client.post(self.URL, self._rows()[1:3], format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error["row"] for error in response.json()["errors"]], [1, 2])
+        self.assertFalse(TransactionDailyRollup.objects.filter(user=self.user).exists())
+
+    def test_adds_to_existing_rollup_rows(self):
+        TransactionService.create_transaction(self.user, {
+            'transaction_type': Transaction.TransactionType.EXPENSE, 'category': self.food,
+            'payment_method': Transaction.PaymentMethod.CASH, 'is_business': False, 'is_taxable': True,
+            'amount': Decimal("1.00"), 'transaction_date': date(2025, 2, 1),
+        })
+
+        self.client.post(self.URL, self._rows()[:1], format="json")
+
+        row = TransactionDailyRollup.objects.get(user=self.user, category=self.food)
+        self.assertEqual((row.total, row.count), (Decimal("11.00"), 2))
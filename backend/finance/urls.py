@@ -8,6 +8,7 @@ from .views import (
     TimeSeriesAnalyticsView,
     CategoryBreakdownAnalyticsView,
     PeriodComparisonAnalyticsView,
+    MultiPeriodComparisonAnalyticsView,
     TaxReportView,
 )
 
@@ -21,4 +22,5 @@ urlpatterns = [
     path('analytics/time-series/', TimeSeriesAnalyticsView.as_view(), name='analytics-time-series'),
     path('analytics/category-breakdown/', CategoryBreakdownAnalyticsView.as_view(), name='analytics-category-breakdown'),
     path('analytics/period-comparison/', PeriodComparisonAnalyticsView.as_view(), name='analytics-period-comparison'),
+    path('analytics/period-comparison/multi/', MultiPeriodComparisonAnalyticsView.as_view(), name='analytics-period-comparison-multi'),
 ] + router.urls
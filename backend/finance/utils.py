@@ -1,5 +1,7 @@
 """Utility functions for finance app."""
 
+import csv
+import io
 from datetime import timedelta
 
 from django.utils import timezone
@@ -65,3 +67,26 @@ def update_instance_from_dict(instance, data):
         setattr(instance, attr, value)
     instance.save()
     return instance
+
+
+def parse_transactions_csv(uploaded_file):
+    """
+    Parse CSV upload into a list of row dicts for bulk import.
+
+    First line is a header with serializer field names (amount, transaction_type, ...).
+    Empty cells are dropped so field defaults apply.
+
+    Raises:
+        ValueError: if the file is not UTF-8 or has no header
+    """
+    try:
+        text = uploaded_file.read().decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise ValueError('CSV file must be UTF-8 encoded')
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames:
+        raise ValueError('CSV file must start with a header row')
+    return [
+        {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+        for row in reader
+    ]
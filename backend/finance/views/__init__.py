@@ -2,6 +2,7 @@
 
 from .analytics import (
     CategoryBreakdownAnalyticsView,
+    MultiPeriodComparisonAnalyticsView,
     PeriodComparisonAnalyticsView,
     TimeSeriesAnalyticsView,
 )
@@ -17,5 +18,6 @@ __all__ = [
     'TimeSeriesAnalyticsView',
     'CategoryBreakdownAnalyticsView',
     'PeriodComparisonAnalyticsView',
+    'MultiPeriodComparisonAnalyticsView',
     'TaxReportView',
 ]
@@ -4,23 +4,31 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from finance.constants import DEFAULT_CATEGORY_BREAKDOWN_LIMIT
+from finance.constants import DEFAULT_CATEGORY_BREAKDOWN_LIMIT, MAX_COMPARISON_PERIODS
 from finance.permissions import IsOnboardingCompleted
 from finance.serializers import (
     CategoryBreakdownResponseSerializer,
+    MultiPeriodComparisonResponseSerializer,
     PeriodComparisonResponseSerializer,
     TimeSeriesResponseSerializer,
 )
 from finance.services.analytics_service import (
     get_category_breakdown,
+    get_multi_period_comparison,
     get_period_comparison,
     get_time_series_data,
 )
 from finance.utils import get_preset_dates, parse_date_param
+from finance.views.mixins import ConditionalGetMixin
 
 
-class TimeSeriesAnalyticsView(APIView):
-    """Time series data for line/area charts. Supports preset: week, month, year, all_time."""
+class TimeSeriesAnalyticsView(ConditionalGetMixin, APIView):
+    """
+    Time series data for line/area charts. Supports preset: week, month, year, all_time.
+    period: daily, weekly, monthly, quarterly, yearly, tax_period (organization's tax periods).
+    Periods without transactions are returned with zeros.
+    Conditional GET: ETag / Last-Modified (see ConditionalGetMixin).
+    """
 
     permission_classes = [IsAuthenticated, IsOnboardingCompleted]
     serializer_class = TimeSeriesResponseSerializer
@@ -47,25 +55,33 @@ class TimeSeriesAnalyticsView(APIView):
             if not date_from and not date_to:
                 date_from, date_to = get_preset_dates('month')
 
-        data = get_time_series_data(
-            user=request.user,
-            period=period,
-            date_from=date_from,
-            date_to=date_to,
-            transaction_type=transaction_type
-        )
+        def build():
+            data = get_time_series_data(
+                user=request.user,
+                period=period,
+                date_from=date_from,
+                date_to=date_to,
+                transaction_type=transaction_type
+            )
+            return {
+                'period': period,
+                'preset': preset,
+                'date_from': request.query_params.get('date_from') or (date_from.isoformat() if date_from else None),
+                'date_to': request.query_params.get('date_to') or (date_to.isoformat() if date_to else None),
+                'data': data,
+            }
 
-        return Response({
-            'period': period,
-            'preset': preset,
-            'date_from': request.query_params.get('date_from') or (date_from.isoformat() if date_from else None),
-            'date_to': request.query_params.get('date_to') or (date_to.isoformat() if date_to else None),
-            'data': data,
-        })
+        try:
+            return self.conditional_response(request, build, date_to=date_to, date_from=date_from)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
 
 
-class CategoryBreakdownAnalyticsView(APIView):
-    """Category breakdown for pie/bar charts. Supports preset: week, month, year, all_time."""
+class CategoryBreakdownAnalyticsView(ConditionalGetMixin, APIView):
+    """
+    Category breakdown for pie/bar charts. Supports preset: week, month, year, all_time.
+    Conditional GET: ETag / Last-Modified (see ConditionalGetMixin).
+    """
 
     permission_classes = [IsAuthenticated, IsOnboardingCompleted]
     serializer_class = CategoryBreakdownResponseSerializer
@@ -96,25 +112,27 @@ class CategoryBreakdownAnalyticsView(APIView):
         except ValueError:
             return Response({'error': 'Invalid limit format. Must be an integer.'}, status=400)
 
-        data = get_category_breakdown(
-            user=request.user,
-            date_from=date_from,
-            date_to=date_to,
-            transaction_type=transaction_type,
-            limit=limit
-        )
-
-        return Response({
-            'preset': preset,
-            'date_from': request.query_params.get('date_from') or (date_from.isoformat() if date_from else None),
-            'date_to': request.query_params.get('date_to') or (date_to.isoformat() if date_to else None),
-            'transaction_type': transaction_type,
-            'data': data,
-        })
+        def build():
+            data = get_category_breakdown(
+                user=request.user,
+                date_from=date_from,
+                date_to=date_to,
+                transaction_type=transaction_type,
+                limit=limit
+            )
+            return {
+                'preset': preset,
+                'date_from': request.query_params.get('date_from') or (date_from.isoformat() if date_from else None),
+                'date_to': request.query_params.get('date_to') or (date_to.isoformat() if date_to else None),
+                'transaction_type': transaction_type,
+                'data': data,
+            }
+
+        return self.conditional_response(request, build, date_to=date_to, date_from=date_from)
 
 
 class PeriodComparisonAnalyticsView(APIView):
-    """Compare two periods (e.g., this month vs last month)."""
+    """Compare two periods (e.g., this month vs last month). For N periods see MultiPeriodComparisonAnalyticsView."""
 
     permission_classes = [IsAuthenticated, IsOnboardingCompleted]
     serializer_class = PeriodComparisonResponseSerializer
@@ -147,3 +165,49 @@ class PeriodComparisonAnalyticsView(APIView):
         )
 
         return Response(data)
+
+
+class MultiPeriodComparisonAnalyticsView(ConditionalGetMixin, APIView):
+    """
+    Compare N periods side by side (e.g. 12 months or 8 quarters) in one query.
+
+    Query params:
+    - periods: comma-separated YYYY-MM-DD:YYYY-MM-DD ranges (2..MAX_COMPARISON_PERIODS, may overlap)
+    - baseline: previous (default) - each period vs the one before; first - each period vs the first
+    """
+
+    permission_classes = [IsAuthenticated, IsOnboardingCompleted]
+    serializer_class = MultiPeriodComparisonResponseSerializer
+
+    def get(self, request):
+        raw_periods = [p for p in request.query_params.get('periods', '').split(',') if p]
+        if not 2 <= len(raw_periods) <= MAX_COMPARISON_PERIODS:
+            return Response({
+                'error': f'periods must contain 2 to {MAX_COMPARISON_PERIODS} ranges: '
+                         'YYYY-MM-DD:YYYY-MM-DD,YYYY-MM-DD:YYYY-MM-DD,...'
+            }, status=400)
+
+        periods = []
+        for i, raw in enumerate(raw_periods, start=1):
+            date_from_str, _, date_to_str = raw.partition(':')
+            date_from, error = parse_date_param(date_from_str, f'periods[{i}] start')
+            if error:
+                return Response(error, status=400)
+            date_to, error = parse_date_param(date_to_str, f'periods[{i}] end')
+            if error:
+                return Response(error, status=400)
+            if not date_from or not date_to or date_from > date_to:
+                return Response({'error': f'Invalid periods[{i}]: expected start:end with start <= end'}, status=400)
+            periods.append((date_from, date_to))
+
+        baseline = request.query_params.get('baseline', 'previous')
+        if baseline not in ('previous', 'first'):
+            return Response({'error': 'Invalid baseline. Use: previous, first'}, status=400)
+
+        def build():
+            return {
+                'baseline': baseline,
+                **get_multi_period_comparison(request.user, periods, baseline=baseline),
+            }
+
+        return self.conditional_response(request, build, date_to=max(date_to for _, date_to in periods))
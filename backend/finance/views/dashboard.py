@@ -1,20 +1,36 @@
 """Dashboard views."""
 
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from finance.permissions import IsOnboardingCompleted
 from finance.serializers import DashboardResponseSerializer
-from finance.services.dashboard_service import get_dashboard_data
+from finance.services.dashboard_service import get_cached_dashboard_data
+from finance.views.mixins import ConditionalGetMixin
 
 
-class DashboardView(APIView):
-    """Single endpoint for dashboard data."""
+class DashboardView(ConditionalGetMixin, APIView):
+    """
+    Single endpoint for dashboard data.
+
+    Cached per user data version; ?nocache=true skips the cache read and the conditional
+    check (for debugging). Response header X-Cache: HIT | MISS (absent on 304).
+    Conditional GET: ETag / Last-Modified (see ConditionalGetMixin).
+    """
 
     permission_classes = [IsAuthenticated, IsOnboardingCompleted]
     serializer_class = DashboardResponseSerializer
 
     def get(self, request):
-        data = get_dashboard_data(request.user)
-        return Response(data)
+        use_cache = request.query_params.get('nocache', '').lower() not in ('true', '1', 'yes')
+        cache_hit = None
+
+        def build():
+            nonlocal cache_hit
+            data, cache_hit = get_cached_dashboard_data(request.user, use_cache=use_cache)
+            return data
+
+        response = self.conditional_response(request, build, check=use_cache)
+        if cache_hit is not None:
+            response['X-Cache'] = 'HIT' if cache_hit else 'MISS'
+        return response
@@ -0,0 +1,74 @@
+"""Shared view helpers."""
+
+import hashlib
+import math
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from finance.services.cache_service import get_data_modified, get_data_version
+
+# Query params that do not change the payload
+CONDITIONAL_IGNORED_PARAMS = ('nocache',)
+
+
+class ConditionalGetMixin:
+    """
+    Conditional GET for read-only payloads derived from the user's ledger.
+
+    ETag = hash of (view, user, data version, normalized query params, resolved dates), so
+    If-None-Match is answered with 304 before the aggregate queries run. Last-Modified is
+    the time of the user's last write. Periods that ended before today get
+    Cache-Control: private, max-age=FINANCE_CLOSED_PERIOD_MAX_AGE; everything else must be
+    revalidated (private, no-cache).
+    """
+
+    def get_etag(self, request, **resolved):
+        params = sorted(
+            (key, ','.join(sorted(request.query_params.getlist(key))))
+            for key in request.query_params
+            if key not in CONDITIONAL_IGNORED_PARAMS and request.query_params.get(key) != ''
+        )
+        resolved = sorted((key, str(value)) for key, value in resolved.items())
+        raw = '|'.join([
+            type(self).__name__,
+            str(request.user.pk),
+            get_data_version(request.user.pk),
+            repr(params),
+            repr(resolved),
+        ])
+        return quote_etag(hashlib.sha256(raw.encode()).hexdigest()[:32])
+
+    def conditional_response(self, request, build, date_to=None, check=True, **resolved):
+        """
+        Return 304 if the client's copy is current, else Response(build()) with validators.
+
+        Args:
+            build: callable producing the payload (only called on a miss)
+            date_to: end of the requested period; a past date marks the period as closed
+            check: False to skip If-None-Match / If-Modified-Since (always build)
+            **resolved: effective parameters not visible in the query string (e.g. preset dates)
+        """
+        etag = self.get_etag(request, date_to=date_to, **resolved)
+        modified = get_data_modified(request.user.pk)
+        # HTTP dates have one-second precision: round up so a later write is never hidden
+        last_modified = math.ceil(modified.timestamp()) if modified else None
+
+        response = None
+        if check:
+            response = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = Response(build())
+
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        if date_to is not None and date_to < timezone.now().date():
+            patch_cache_control(response, private=True, max_age=settings.FINANCE_CLOSED_PERIOD_MAX_AGE)
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization'])
+        return response
@@ -9,9 +9,10 @@ from finance.permissions import IsOnboardingCompleted
 from finance.serializers import TaxReportResponseSerializer
 from finance.services.tax_report_service import build_tax_report
 from finance.utils import get_preset_dates, parse_date_param
+from finance.views.mixins import ConditionalGetMixin
 
 
-class TaxReportView(APIView):
+class TaxReportView(ConditionalGetMixin, APIView):
     """
     Tax report for a chosen period.
     
@@ -19,6 +20,8 @@ class TaxReportView(APIView):
     - date_from, date_to: explicit period (YYYY-MM-DD)
     - preset: week, month, year, all_time (same as analytics)
     - use_org_tax_period: if true, use organization's current tax period (ignores dates/preset)
+
+    Conditional GET: ETag / Last-Modified (see ConditionalGetMixin).
     """
 
     permission_classes = [IsAuthenticated, IsOnboardingCompleted]
@@ -66,5 +69,9 @@ class TaxReportView(APIView):
                 if not date_from and not date_to:
                     date_from, date_to = get_preset_dates('month')
 
-        data = build_tax_report(request.user, date_from, date_to)
-        return Response(data)
+        return self.conditional_response(
+            request,
+            lambda: build_tax_report(request.user, date_from, date_to),
+            date_to=date_to,
+            date_from=date_from,
+        )
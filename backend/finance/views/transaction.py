@@ -1,13 +1,28 @@
 """Transaction views."""
 
-from rest_framework import viewsets
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from drf_spectacular.utils import OpenApiParameter, OpenApiTypes, extend_schema
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
+from finance.constants import BULK_MAX_ROWS
 from finance.filters import TransactionFilter
 from finance.models import Transaction
+from finance.pagination import TransactionPagination
 from finance.permissions import IsOnboardingCompleted
-from finance.serializers import TransactionSerializer
+from finance.serializers import (
+    TransactionBulkCreateSerializer,
+    TransactionBulkItemSerializer,
+    TransactionBulkResponseSerializer,
+    TransactionSerializer,
+)
+from finance.services.export_service import iter_transactions_csv, write_transactions_xlsx
 from finance.services.transaction_service import TransactionService
+from finance.utils import parse_transactions_csv
 
 
 class TransactionViewSet(viewsets.ModelViewSet):
@@ -16,6 +31,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated, IsOnboardingCompleted]
     filterset_class = TransactionFilter
+    pagination_class = TransactionPagination
     ordering_fields = ['transaction_date', 'amount', 'created_at']
 
     def get_queryset(self):
@@ -25,7 +41,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
             Transaction.objects
             .filter(user=self.request.user)
             .select_related('category', 'activity_code', 'user')
-            .order_by('-transaction_date', '-created_at')
+            .order_by('-transaction_date', '-created_at', '-id')
         )
 
     def perform_create(self, serializer):
@@ -41,3 +57,93 @@ class TransactionViewSet(viewsets.ModelViewSet):
             validated_data=serializer.validated_data
         )
         serializer.instance = instance
+
+    def perform_destroy(self, instance):
+        TransactionService.delete_transaction(instance)
+
+    @extend_schema(
+        request=TransactionBulkCreateSerializer,
+        responses={201: TransactionBulkResponseSerializer, 400: TransactionBulkResponseSerializer},
+    )
+    @action(detail=False, methods=['post'], url_path='bulk', parser_classes=[JSONParser, MultiPartParser])
+    def bulk(self, request):
+        """
+        Bulk import: JSON array (or {"transactions": [...]}) or CSV upload in multipart field "file".
+        Invalid rows are reported in "errors" and skipped; valid rows are created.
+        """
+        upload = request.FILES.get('file')
+        if upload is not None:
+            try:
+                rows = parse_transactions_csv(upload)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        elif isinstance(request.data, list):
+            rows = request.data
+        else:
+            rows = request.data.get('transactions')
+
+        if not isinstance(rows, list) or not rows:
+            return Response(
+                {'error': 'Provide a non-empty JSON array of transactions or a CSV file.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(rows) > BULK_MAX_ROWS:
+            return Response(
+                {'error': f'Too many rows: {len(rows)}. Maximum is {BULK_MAX_ROWS} per request.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        context = TransactionBulkItemSerializer.preload_context(request.user)
+        cleaned = []
+        errors = []
+        for number, row in enumerate(rows, start=1):
+            item = TransactionBulkItemSerializer(data=row, context=context)
+            if item.is_valid():
+                cleaned.append((number, item.validated_data))
+            else:
+                errors.append({'row': number, 'errors': item.errors})
+
+        created, rule_errors = TransactionService.bulk_create_transactions(request.user, cleaned)
+        errors = sorted(errors + rule_errors, key=lambda error: error['row'])
+        return Response(
+            {
+                'created': len(created),
+                'ids': [t.pk for t in created],
+                'errors': errors,
+            },
+            status=status.HTTP_201_CREATED if created or not errors else status.HTTP_400_BAD_REQUEST
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('file_format', OpenApiTypes.STR, enum=['csv', 'xlsx'], description='Default: csv'),
+        ],
+        responses={(200, 'text/csv'): OpenApiTypes.BINARY},
+    )
+    @action(detail=False, methods=['get'], url_path='export', pagination_class=None)
+    def export(self, request):
+        """
+        Export the whole (filtered, ordered) ledger without pagination.
+        Same filters and ordering as the list; file_format=csv (streamed) or xlsx.
+        """
+        file_format = request.query_params.get('file_format', 'csv').lower()
+        if file_format not in ('csv', 'xlsx'):
+            return Response(
+                {'error': f'Invalid file_format: {file_format}. Use: csv, xlsx'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = self.filter_queryset(self.get_queryset())
+        file_name = f"transactions_{timezone.localdate().isoformat()}.{file_format}"
+
+        if file_format == 'xlsx':
+            return FileResponse(
+                write_transactions_xlsx(queryset),
+                as_attachment=True,
+                filename=file_name,
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            )
+
+        response = StreamingHttpResponse(iter_transactions_csv(queryset), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{file_name}"'
+        return response
@@ -0,0 +1,88 @@
+"""
+Cached map of a user's organization activities to their tax rates.
+
+{activity_id: (cash_tax_rate, non_cash_tax_rate)} is kept in two layers:
+- the default cache (shared between workers with Redis), keyed by a per-user version;
+- a small in-process LRU that is reused while the shared version is unchanged.
+Transaction.save() reads it instead of querying OrganizationProfile + OrganizationActivity.
+invalidate_activity_rates() bumps the version after commit (see finance.signals).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import OrganizationActivity
+
+RATES_VERSION_KEY = 'organization:activity_rates_version:{user_id}'
+RATES_KEY = 'organization:activity_rates:{user_id}:{version}'
+RATES_CACHE_TTL = 60 * 60 * 24
+LOCAL_CACHE_SIZE = 1024
+
+_local_rates = OrderedDict()  # user_id -> (version, rates)
+_local_lock = threading.Lock()
+
+
+def _get_version(user_id):
+    key = RATES_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        # Time-based start: an evicted counter never comes back with an old value
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _load_rates(user_id):
+    return {
+        activity_id: (cash, non_cash)
+        for activity_id, cash, non_cash in OrganizationActivity.objects.filter(
+            profile__user_id=user_id
+        ).values_list('activity_id', 'cash_tax_rate', 'non_cash_tax_rate')
+    }
+
+
+def get_activity_rates(user_id):
+    """Return {activity_id: (cash_tax_rate, non_cash_tax_rate)} for the user's organization."""
+    version = _get_version(user_id)
+    with _local_lock:
+        entry = _local_rates.get(user_id)
+        if entry is not None and entry[0] == version:
+            _local_rates.move_to_end(user_id)
+            return entry[1]
+
+    key = RATES_KEY.format(user_id=user_id, version=version)
+    rates = cache.get(key)
+    if rates is None:
+        rates = _load_rates(user_id)
+        cache.set(key, rates, timeout=RATES_CACHE_TTL)
+
+    with _local_lock:
+        _local_rates[user_id] = (version, rates)
+        _local_rates.move_to_end(user_id)
+        while len(_local_rates) > LOCAL_CACHE_SIZE:
+            _local_rates.popitem(last=False)
+    return rates
+
+
+def get_activity_rate(user_id, activity_id):
+    """(cash_tax_rate, non_cash_tax_rate) of one activity, or None if the organization does not have it."""
+    return get_activity_rates(user_id).get(activity_id)
+
+
+def _bump_version(user_id):
+    key = RATES_VERSION_KEY.format(user_id=user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+    with _local_lock:
+        _local_rates.pop(user_id, None)
+
+
+def invalidate_activity_rates(user_id):
+    """Drop the cached rate map of a user once the current transaction commits."""
+    transaction.on_commit(lambda: _bump_version(user_id))
@@ -1,7 +1,7 @@
 """Utilities for calculating tax periods based on organization settings."""
 
 from datetime import date, timedelta
-from typing import Optional, Tuple
+from typing import Iterator, Optional, Tuple
 
 from .models import OrganizationProfile
 
@@ -88,8 +88,9 @@ def _get_custom_period_dates(custom_day: int, reference_date: date) -> Tuple[dat
         actual_day = min(day, max_day)
         return date(year, month, actual_day)
     
-    # Determine which period we're in based on custom_day
-    if reference_date.day < custom_day:
+    # Determine which period we're in based on custom_day (clamped to this month's length,
+    # so e.g. Feb 28 starts the period for custom_day=31)
+    if reference_date < _safe_date(reference_date.year, reference_date.month, custom_day):
         # Current period started last month on custom_day
         if reference_date.month == 1:
             # Last month was December of previous year
@@ -115,3 +116,18 @@ def get_next_tax_period_start(profile: OrganizationProfile, reference_date: Opti
     """Get the start date of the next tax period."""
     _, current_end = get_current_tax_period_start_end(profile, reference_date)
     return current_end + timedelta(days=1)
+
+
+def iter_tax_periods(profile: OrganizationProfile, date_from: date, date_to: date) -> Iterator[Tuple[date, date]]:
+    """
+    Yield consecutive (period_start, period_end) tax periods covering date_from..date_to.
+
+    The first period contains date_from, the last one contains date_to; periods are not clipped.
+
+    Raises:
+        ValueError: If tax period settings are not set or invalid
+    """
+    period_start, period_end = get_current_tax_period_start_end(profile, date_from)
+    while period_start <= date_to:
+        yield period_start, period_end
+        period_start, period_end = get_current_tax_period_start_end(profile, period_end + timedelta(days=1))
@@ -0,0 +1,59 @@
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from tax_reports.services.batch_tax_engine import REGIMES, calculate_unified_tax_batch, from_tiyin
+from tax_reports.services.tax_calculator import UnifiedTaxCalculator
+
+REGION_SAMPLES = np.array(["bishkek", "Chui", "osh", "naryn", "BISHKEK"])
+
+
+def _random_inputs(rng, count):
+    """Monthly turnover in tiyin: mostly near the social fund threshold, with .50 and big values."""
+    monthly = rng.integers(0, 6_000_000, size=(count, 3))
+    monthly[::7] = rng.integers(0, 10 ** 10, size=monthly[::7].shape)
+    monthly[::5] = monthly[::5] // 100 * 100 + 50
+    regimes = np.array(REGIMES)[rng.integers(0, len(REGIMES), size=count)]
+    regions = REGION_SAMPLES[rng.integers(0, len(REGION_SAMPLES), size=count)]
+    return monthly, regimes, regions
+
+
+def _scalar(monthly, regimes, regions):
+    results = []
+    for row, regime, region in zip(monthly.tolist(), regimes.tolist(), regions.tolist()):
+        organization = SimpleNamespace(name="", inn="", tax_regime=regime, region=region)
+        transactions = [SimpleNamespace(amount=from_tiyin(value), type="income") for value in row]
+        results.append(UnifiedTaxCalculator(organization, transactions, 2025, 1).build())
+    return results
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение пакетного расчета единого налога и соцфонда (NumPy, тыйыны) с UnifiedTaxCalculator: '
+        'время на N организаций. Совпадение результатов до тыйына проверяют тесты tax_reports '
+        '(BatchTaxEngineTests).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orgs', type=int, nargs='+', default=[10_000, 100_000])
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        for count in options['orgs']:
+            monthly, regimes, regions = _random_inputs(rng, count)
+
+            started = time.perf_counter()
+            calculate_unified_tax_batch(monthly, regimes, regions)
+            batch_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            _scalar(monthly, regimes, regions)
+            scalar_seconds = time.perf_counter() - started
+
+            self.stdout.write(
+                f'orgs={count}: batch {batch_seconds * 1000:.1f} ms, scalar {scalar_seconds * 1000:.0f} ms, '
+                f'x{scalar_seconds / batch_seconds:.0f}'
+            )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tax_reports.services.report_files import gc_report_files
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет устаревшие версии CSV-отчетов по единому налогу: для каждой организации и '
+        'квартала остается последний использованный файл, остальные версии и брошенные '
+        'временные файлы удаляются, если старше срока хранения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention', type=int,
+                            help='Срок хранения устаревших файлов, с (по умолчанию TAX_REPORT_FILE_RETENTION)')
+        parser.add_argument('--output-dir', help='Каталог отчетов (по умолчанию MEDIA_ROOT)')
+        parser.add_argument('--dry-run', action='store_true', help='Только показать, что будет удалено')
+
+    def handle(self, *args, **options):
+        if options['retention'] is not None and options['retention'] < 0:
+            raise CommandError('--retention не может быть отрицательным')
+
+        removed = gc_report_files(options['output_dir'], options['retention'], options['dry_run'])
+        if options['verbosity'] >= 2:
+            for path in removed:
+                self.stdout.write(str(path))
+        action = 'К удалению' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(f'{action} файлов: {len(removed)}'))
@@ -0,0 +1,90 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from organization.models import OrganizationProfile
+from tax_reports.services.batch_generator import generate_report_files
+
+
+def _init_worker():
+    # With the "spawn" start method the worker starts without Django configured
+    if not apps.ready:
+        django.setup()
+    # Connections inherited from the parent on "fork" must not be shared
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Формирует отчеты по единому налогу (CSV) за квартал для всех организаций. '
+        'Организации делятся на пачки и обрабатываются пулом процессов; '
+        'каждый процесс держит не больше одного соединения с БД.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, required=True)
+        parser.add_argument('--quarter', type=int, choices=[1, 2, 3, 4], required=True)
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Число процессов = максимум соединений с БД (1 — без пула)')
+        parser.add_argument('--chunk-size', type=int, default=50, help='Организаций в одной пачке')
+        parser.add_argument('--output-dir', help='Каталог для CSV (по умолчанию MEDIA_ROOT)')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        year, quarter = options['year'], options['quarter']
+        workers, chunk_size = options['workers'], options['chunk_size']
+        if workers < 1 or chunk_size < 1:
+            raise CommandError('--workers и --chunk-size должны быть больше 0')
+
+        organization_ids = list(OrganizationProfile.objects.order_by('id').values_list('id', flat=True))
+        chunks = [organization_ids[i:i + chunk_size] for i in range(0, len(organization_ids), chunk_size)]
+        self.stdout.write(
+            f'Организаций: {len(organization_ids)}, пачек: {len(chunks)}, процессов: {workers}'
+        )
+
+        started = time.perf_counter()
+        self.done = 0
+        self.total = len(organization_ids)
+        results = []
+        if workers == 1:
+            for chunk in chunks:
+                results.extend(self._report(generate_report_files(chunk, year, quarter, options['output_dir'])))
+        else:
+            # Workers open their own connections; do not hand ours to forked children
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                futures = [
+                    pool.submit(generate_report_files, chunk, year, quarter, options['output_dir'])
+                    for chunk in chunks
+                ]
+                for future in as_completed(futures):
+                    results.extend(self._report(future.result()))
+        elapsed = time.perf_counter() - started
+
+        failed = [r for r in results if r['error']]
+        timings = sorted(r['seconds'] for r in results)
+        if timings:
+            self.stdout.write(
+                f'Время на организацию: среднее {sum(timings) / len(timings):.3f}s, '
+                f'p95 {timings[min(len(timings) - 1, int(len(timings) * 0.95))]:.3f}s, '
+                f'макс {timings[-1]:.3f}s'
+            )
+        message = f'Готово за {elapsed:.1f}s: отчетов {len(results) - len(failed)}, ошибок {len(failed)}.'
+        self.stdout.write(self.style.ERROR(message) if failed else self.style.SUCCESS(message))
+
+    def _report(self, chunk_results):
+        for result in chunk_results:
+            self.done += 1
+            line = (
+                f'[{self.done}/{self.total}] org {result["organization_id"]}: '
+                f'{result["seconds"]:.3f}s {result["file"] or ""}'
+            )
+            if result['error']:
+                self.stderr.write(f'{line} ОШИБКА: {result["error"]}')
+            elif self.verbosity >= 1:
+                self.stdout.write(line)
+        return chunk_results
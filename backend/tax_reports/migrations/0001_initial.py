@@ -0,0 +1,38 @@
+# Generated by Django 5.2.11 on 2026-10-17 18:57
+
+import django.core.serializers.json
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIValidationJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('report_hash', models.CharField(max_length=64)),
+                ('report_data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=16)),
+                ('result', models.TextField(blank=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ai_validation_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'AI-проверка отчета',
+                'verbose_name_plural': 'AI-проверки отчетов',
+                'indexes': [models.Index(fields=['user', 'report_hash'], name='tax_reports_user_id_9eca35_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,39 @@
+import uuid
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
-# Create your models here.
+
+class AIValidationJob(models.Model):
+    """Фоновая AI-проверка отчета по единому налогу; результат переиспользуется по хэшу report_data."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "В очереди"
+        RUNNING = "running", "Выполняется"
+        DONE = "done", "Готово"
+        FAILED = "failed", "Ошибка"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="ai_validation_jobs",
+    )
+    report_hash = models.CharField(max_length=64)
+    report_data = models.JSONField(encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    result = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "AI-проверка отчета"
+        verbose_name_plural = "AI-проверки отчетов"
+        indexes = [
+            models.Index(fields=["user", "report_hash"]),
+        ]
+
+    def __str__(self):
+        return f"{self.id} ({self.status})"
@@ -1,11 +1,37 @@
 from rest_framework import serializers
 
+from .models import AIValidationJob
+
 class UnifiedTaxRequestSerializer(serializers.Serializer):
     year = serializers.IntegerField(required=True, min_value=2000, max_value=2100)
     quarter = serializers.ChoiceField(choices=[1,2,3,4], required=True)
 
 
+class AIValidationJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AIValidationJob
+        fields = ["id", "status", "result", "error", "created_at", "updated_at"]
+        read_only_fields = fields
+
+
+class RuleCheckSerializer(serializers.Serializer):
+    code = serializers.CharField()
+    severity = serializers.ChoiceField(choices=["error", "warning", "info"])
+    message = serializers.CharField()
+    expected = serializers.JSONField(allow_null=True)
+    actual = serializers.JSONField(allow_null=True)
+
+
+class RuleValidationSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=["ok", "errors", "needs_review"])
+    escalate = serializers.BooleanField()
+    checks = RuleCheckSerializer(many=True)
+    expected = serializers.DictField(child=serializers.CharField())
+
+
 class UnifiedTaxReportResponseSerializer(serializers.Serializer):
     report_data = serializers.DictField()
     csv_file = serializers.URLField()
-    ai_validation = serializers.CharField()
+    rule_validation = RuleValidationSerializer()
+    ai_validation = serializers.CharField(allow_null=True)
+    ai_validation_job = AIValidationJobSerializer(allow_null=True)
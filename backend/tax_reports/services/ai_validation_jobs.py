@@ -0,0 +1,124 @@
+"""
+Background AI validation of unified tax reports.
+
+submit_validation() returns an AIValidationJob right away; the LLM call runs in a small
+in-process thread pool after the request's transaction commits. Jobs live in the database,
+so any worker can answer status polls. A finished job is reused for the same user and the
+same normalized report_data (sha256), so regenerating an unchanged report never calls the
+LLM again; an in-flight job for the same data is shared instead of starting a second one.
+"""
+
+import hashlib
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from tax_reports.models import AIValidationJob
+
+from .ai_validator import AITaxValidator
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.AI_VALIDATION_WORKERS,
+            thread_name_prefix="ai-validation",
+        )
+    return _executor
+
+
+def _normalize(value):
+    if isinstance(value, Decimal):
+        # 1234.5, 1234.50 and 1234.5000 are the same report
+        return format(value.normalize(), "f")
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def report_data_hash(report_data):
+    """sha256 of report_data with sorted keys and normalized decimals."""
+    payload = json.dumps(_normalize(report_data), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _expire_if_stale(job):
+    """Mark a pending/running job failed if its worker died (no progress for AI_VALIDATION_JOB_TIMEOUT)."""
+    if job.status not in (AIValidationJob.Status.PENDING, AIValidationJob.Status.RUNNING):
+        return job
+    deadline = timezone.now() - timedelta(seconds=settings.AI_VALIDATION_JOB_TIMEOUT)
+    if job.updated_at < deadline:
+        updated = AIValidationJob.objects.filter(pk=job.pk, status=job.status, updated_at=job.updated_at).update(
+            status=AIValidationJob.Status.FAILED,
+            error="Validation was interrupted, please retry",
+            updated_at=timezone.now(),
+        )
+        if updated:
+            job.refresh_from_db()
+    return job
+
+
+def submit_validation(user, report_data):
+    """
+    Return the validation job for report_data: a finished or in-flight one with the same hash,
+    or a new job queued to run after commit.
+    """
+    report_hash = report_data_hash(report_data)
+    existing = (
+        AIValidationJob.objects.filter(user=user, report_hash=report_hash)
+        .exclude(status=AIValidationJob.Status.FAILED)
+        .order_by("-created_at")
+        .first()
+    )
+    if existing is not None:
+        existing = _expire_if_stale(existing)
+        if existing.status != AIValidationJob.Status.FAILED:
+            return existing
+
+    job = AIValidationJob.objects.create(user=user, report_hash=report_hash, report_data=report_data)
+    transaction.on_commit(lambda: _get_executor().submit(run_validation_job, job.pk))
+    return job
+
+
+def get_validation_job(user, job_id):
+    """User's job by id (stale jobs are marked failed), or None."""
+    job = AIValidationJob.objects.filter(user=user, pk=job_id).first()
+    return _expire_if_stale(job) if job is not None else None
+
+
+def run_validation_job(job_id):
+    """Run one job (called in a pool thread). Only the caller that moves it out of pending runs it."""
+    close_old_connections()
+    try:
+        claimed = AIValidationJob.objects.filter(pk=job_id, status=AIValidationJob.Status.PENDING).update(
+            status=AIValidationJob.Status.RUNNING,
+            updated_at=timezone.now(),
+        )
+        if not claimed:
+            return
+        job = AIValidationJob.objects.get(pk=job_id)
+        try:
+            result = AITaxValidator().validate(job.report_data, user_id=job.user_id)
+        except Exception as e:
+            logger.warning("AI validation job %s failed: %s", job_id, e)
+            job.status = AIValidationJob.Status.FAILED
+            job.error = str(e) or e.__class__.__name__
+        else:
+            job.status = AIValidationJob.Status.DONE
+            job.result = result
+        job.save(update_fields=["status", "result", "error", "updated_at"])
+    finally:
+        close_old_connections()
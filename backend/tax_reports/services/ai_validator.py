@@ -1,14 +1,11 @@
-import requests
-import os
+from core.llm_client import get_llm_client
 
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-URL = "https://openrouter.ai/api/v1/chat/completions"
-MODEL = "stepfun/step-3.5-flash:free"
+TIMEOUT = 60
 
 
 class AITaxValidator:
 
-    def validate(self, report_data):
+    def validate(self, report_data, user_id=None):
 
         prompt = f"""
         Проверь корректность расчета единого налога КР.
@@ -22,19 +19,9 @@ class AITaxValidator:
         3. Краткое пояснение.
         """
 
-        payload = {
-            "model": MODEL,
-            "messages": [
-                {"role": "system", "content": "Ты налоговый аудитор КР."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.2
-        }
-
-        headers = {
-            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-            "Content-Type": "application/json"
-        }
-
-        response = requests.post(URL, headers=headers, json=payload)
-        return response.json()["choices"][0]["message"]["content"]
+        messages = [
+            {"role": "system", "content": "Ты налоговый аудитор КР."},
+            {"role": "user", "content": prompt}
+        ]
+
+        return get_llm_client().chat_completion(messages, user_id=user_id, temperature=0.2, deadline=TIMEOUT)
@@ -0,0 +1,47 @@
+import os
+import time
+
+from django.conf import settings
+
+from organization.models import OrganizationProfile
+
+from .report_data_builder import ReportDataBuilder
+from .report_files import store_report_csv
+
+
+def generate_report_file(organization, year, quarter, output_dir=None):
+    """
+    Build report data for one organization and store its CSV (an unchanged report reuses
+    the stored file). Returns the file path.
+    """
+    report_data = ReportDataBuilder(organization, year, quarter).build_report_data()
+    base_dir = output_dir or settings.MEDIA_ROOT
+    relative_path, _ = store_report_csv(report_data, organization.id, year, quarter, base_dir)
+    return os.path.join(base_dir, relative_path)
+
+
+def generate_report_files(organization_ids, year, quarter, output_dir=None):
+    """
+    Generate reports for a chunk of organizations (runs inside a worker process).
+
+    One failing organization does not stop the chunk.
+
+    Returns:
+        List of {organization_id, seconds, file, error} in input order
+    """
+    organizations = OrganizationProfile.objects.select_related("user").in_bulk(organization_ids)
+    results = []
+    for organization_id in organization_ids:
+        started = time.perf_counter()
+        result = {"organization_id": organization_id, "file": None, "error": None}
+        organization = organizations.get(organization_id)
+        if organization is None:
+            result["error"] = "Organization profile not found"
+        else:
+            try:
+                result["file"] = generate_report_file(organization, year, quarter, output_dir)
+            except Exception as e:
+                result["error"] = str(e)
+        result["seconds"] = time.perf_counter() - started
+        results.append(result)
+    return results
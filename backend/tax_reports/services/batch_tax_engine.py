@@ -0,0 +1,131 @@
+"""
+Vectorized unified tax + social fund for many organizations at once.
+
+Same rules as UnifiedTaxCalculator (rates from UNIFIED_TAX_RATES, SOCIAL_FUND with the monthly
+threshold applied to the average monthly income of the period), computed with NumPy over
+columnar inputs in exact integer tiyin (1 som = 100 tiyin). Rates and percents from tax_config
+are turned into integer fractions, so no floating point is involved; each output is the exact
+value rounded half up to the tiyin, i.e. the scalar calculator's Decimal result quantized to 0.01.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+from math import lcm
+
+import numpy as np
+
+from .tax_config import SOCIAL_FUND, UNIFIED_TAX_RATES
+
+TIYIN_PER_SOM = 100
+REGIONS = ("bishkek", "chui", "other")
+REGIMES = tuple(UNIFIED_TAX_RATES)
+
+
+def _scale(values):
+    """Smallest power of ten that turns all Decimal values into integers."""
+    places = max(max(0, -value.normalize().as_tuple().exponent) for value in values)
+    return 10 ** places
+
+
+RATE_SCALE = _scale([rate for rates in UNIFIED_TAX_RATES.values() for rate in rates.values()])
+RATE_TABLE = np.array(
+    [[int(UNIFIED_TAX_RATES[regime][region] * RATE_SCALE) for region in REGIONS] for regime in REGIMES],
+    dtype=np.int64,
+)
+EXTRA_SCALE = _scale([SOCIAL_FUND["extra_percent"]])
+EXTRA_PERCENT = int(SOCIAL_FUND["extra_percent"] * EXTRA_SCALE)
+THRESHOLD_TIYIN = int(SOCIAL_FUND["threshold"] * TIYIN_PER_SOM)
+FIXED_MONTHLY_TIYIN = int(SOCIAL_FUND["fixed_monthly"] * TIYIN_PER_SOM)
+TOTAL_SCALE = lcm(RATE_SCALE, EXTRA_SCALE)
+
+# Largest turnover whose intermediate products still fit into int64 (with room for rounding)
+MAX_TURNOVER_TIYIN = (2 ** 62) // (
+    int(RATE_TABLE.max()) * (TOTAL_SCALE // RATE_SCALE) + EXTRA_PERCENT * (TOTAL_SCALE // EXTRA_SCALE)
+) // 4
+
+
+def to_tiyin(amount):
+    """Decimal/str som amount -> int tiyin (rounded half up)."""
+    return int((Decimal(str(amount)) * TIYIN_PER_SOM).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+def from_tiyin(value):
+    """int tiyin -> Decimal som with two decimal places."""
+    return Decimal(int(value)).scaleb(-2)
+
+
+def _round_half_up(numerator, denominator):
+    # numerator >= 0
+    return (2 * numerator + denominator) // (2 * denominator)
+
+
+def _codes(values, known, normalize=None):
+    """Map an array of labels to indexes into known (one Python lookup per distinct label)."""
+    uniques, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    lookup = []
+    for label in uniques:
+        key = normalize(label) if normalize else label
+        if key not in known:
+            raise ValueError(f"Unknown value: {str(label)!r}. Expected one of {known}")
+        lookup.append(known.index(key))
+    return np.asarray(lookup, dtype=np.intp)[inverse.reshape(-1)]
+
+
+def _region_key(region):
+    # Same mapping as UnifiedTaxCalculator.get_region_key
+    region = region.lower()
+    return region if region in ("bishkek", "chui") else "other"
+
+
+def calculate_unified_tax_batch(turnover, regimes, regions):
+    """
+    Unified tax and social fund for N organizations in one pass.
+
+    Args:
+        turnover: int tiyin, shape (N, months) - turnover per organization and month of the
+            period (3 for a quarter) - or shape (N,) with quarter totals
+        regimes: N tax regimes (keys of UNIFIED_TAX_RATES: "trade", "production")
+        regions: N regions (case-insensitive; anything but bishkek/chui counts as "other")
+
+    Returns:
+        dict of int64 arrays of shape (N,), all in tiyin except rate:
+        turnover, rate (in 1/RATE_SCALE units), unified_tax, social_fund, total_payable
+
+    Raises:
+        ValueError: unknown regime/region, negative turnover or turnover too large for int64
+    """
+    turnover = np.asarray(turnover, dtype=np.int64)
+    if turnover.ndim == 1:
+        months = 3
+        period_turnover = turnover
+    elif turnover.ndim == 2:
+        months = turnover.shape[1]
+        period_turnover = turnover.sum(axis=1)
+    else:
+        raise ValueError("turnover must have shape (N,) or (N, months)")
+    if period_turnover.size and period_turnover.min() < 0:
+        raise ValueError("turnover must not be negative")
+    if period_turnover.size and period_turnover.max() > MAX_TURNOVER_TIYIN:
+        raise ValueError(f"turnover above {MAX_TURNOVER_TIYIN} tiyin is not supported")
+
+    regime_codes = _codes(regimes, REGIMES)
+    region_codes = _codes(regions, REGIONS, normalize=_region_key)
+    if not len(regime_codes) == len(region_codes) == len(period_turnover):
+        raise ValueError("turnover, regimes and regions must have the same length")
+    rate = RATE_TABLE[regime_codes, region_codes]
+
+    # unified tax = turnover * rate                             (denominator RATE_SCALE)
+    unified_num = period_turnover * rate
+    # social fund = fixed * months + max(0, turnover - threshold * months) * extra_percent
+    #                                                           (denominator EXTRA_SCALE)
+    above = np.maximum(period_turnover - THRESHOLD_TIYIN * months, 0)
+    social_num = FIXED_MONTHLY_TIYIN * months * EXTRA_SCALE + above * EXTRA_PERCENT
+    # total rounded once, like unified_tax + social_fund in Decimal
+    total_num = unified_num * (TOTAL_SCALE // RATE_SCALE) + social_num * (TOTAL_SCALE // EXTRA_SCALE)
+
+    return {
+        "turnover": period_turnover,
+        "rate": rate,
+        "unified_tax": _round_half_up(unified_num, RATE_SCALE),
+        "social_fund": _round_half_up(social_num, EXTRA_SCALE),
+        "total_payable": _round_half_up(total_num, TOTAL_SCALE),
+    }
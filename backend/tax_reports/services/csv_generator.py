@@ -1,4 +1,7 @@
 ﻿import csv
+import io
+import os
+import tempfile
 from pathlib import Path
 
 
@@ -19,21 +22,47 @@ class UnifiedTaxCSVGenerator:
     def __init__(self, data):
         self.data = data
 
+    @staticmethod
+    def file_name(organization_id, year, quarter):
+        return f"unified_tax_{organization_id}_{year}_Q{quarter}.csv"
+
+    def render(self):
+        """CSV content as bytes (UTF-8), for writing or sending without a file."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.HEADERS)
+        writer.writerow([
+            self.data["year"],
+            self.data["quarter"],
+            self.data["organization_name"],
+            self.data["inn"],
+            str(self.data["turnover"]),
+            str(self.data["rate"]),
+            str(self.data["unified_tax"]),
+            str(self.data["social_fund"]),
+            str(self.data["total_payable"]),
+        ])
+        return buffer.getvalue().encode("utf-8")
+
     def generate(self, file_path):
+        """
+        Write the CSV atomically: a temp file in the same directory renamed over file_path,
+        so readers and concurrent writers never see a partial file.
+        """
         path = Path(file_path)
         path.parent.mkdir(parents=True, exist_ok=True)
 
-        with path.open(mode="w", newline="", encoding="utf-8") as file:
-            writer = csv.writer(file)
-            writer.writerow(self.HEADERS)
-            writer.writerow([
-                self.data["year"],
-                self.data["quarter"],
-                self.data["organization_name"],
-                self.data["inn"],
-                str(self.data["turnover"]),
-                str(self.data["rate"]),
-                str(self.data["unified_tax"]),
-                str(self.data["social_fund"]),
-                str(self.data["total_payable"]),
-            ])
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(self.render())
+                file.flush()
+                os.fsync(file.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
@@ -1,6 +1,8 @@
 from datetime import date
 from decimal import Decimal
 
+from django.db.models import Sum
+
 from finance.models import Transaction
 
 
@@ -19,19 +21,27 @@ class ReportDataBuilder:
             return date(self.year, 7, 1), date(self.year, 9, 30)
         return date(self.year, 10, 1), date(self.year, 12, 31)
 
-    def get_transactions(self):
-        start, end = self.get_period_dates()
+    def get_transactions(self, start=None):
+        period_start, end = self.get_period_dates()
         return Transaction.objects.filter(
             user=self.organization.user,
             transaction_type=Transaction.TransactionType.INCOME,
             is_business=True,
             is_taxable=True,
-            transaction_date__range=(start, end),
+            transaction_date__range=(start or period_start, end),
         )
 
+    def get_year_to_date_turnover(self):
+        """Taxable business income from January 1 to the end of the quarter."""
+        return self.get_transactions(start=date(self.year, 1, 1)).aggregate(
+            turnover=Sum("amount", default=Decimal("0.00"))
+        )["turnover"]
+
     def build_report_data(self):
-        transactions = self.get_transactions()
-        turnover = sum((t.amount for t in transactions), Decimal("0.00"))
+        # Summed in the database: one aggregate instead of loading every transaction
+        turnover = self.get_transactions().aggregate(
+            turnover=Sum("amount", default=Decimal("0.00"))
+        )["turnover"]
 
         rate = Decimal("10.00")
         unified_tax = turnover * rate / Decimal("100.00")
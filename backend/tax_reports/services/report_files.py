@@ -0,0 +1,125 @@
+"""
+Content-addressed storage of unified tax CSV reports under MEDIA_ROOT.
+
+A report is stored as unified_tax/<organization_id>/<year>_Q<quarter>_<sha256 prefix>.csv,
+the hash taken over the rendered CSV bytes. An unchanged report maps to the file that already
+exists, so it is not written again (its mtime is refreshed to mark it current); a changed
+report gets a new name, so a client never downloads a half-written or swapped file under a
+URL it already has. Files are written via temp file + rename (UnifiedTaxCSVGenerator.generate).
+
+Older versions of the same period are removed once they are older than
+TAX_REPORT_FILE_RETENTION seconds (links handed out shortly before stay valid);
+gc_report_files() sweeps the whole tree, including temp files left by crashed writers.
+"""
+
+import hashlib
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+from .csv_generator import UnifiedTaxCSVGenerator
+
+REPORTS_DIR = "unified_tax"
+DIGEST_LENGTH = 16
+TEMP_SUFFIX = ".tmp"
+
+
+def _base_dir(base_dir=None):
+    return Path(base_dir or settings.MEDIA_ROOT)
+
+
+def _period_prefix(year, quarter):
+    return f"{year}_Q{quarter}_"
+
+
+def report_file_name(content, year, quarter):
+    digest = hashlib.sha256(content).hexdigest()[:DIGEST_LENGTH]
+    return f"{_period_prefix(year, quarter)}{digest}.csv"
+
+
+def _remove_stale(directory, prefix, keep, retention, now):
+    """Delete files of one period (except keep) not touched for retention seconds."""
+    removed = 0
+    for path in directory.glob(f"{prefix}*.csv"):
+        if path.name == keep:
+            continue
+        try:
+            if now - path.stat().st_mtime >= retention:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            # Removed by a concurrent request
+            pass
+    return removed
+
+
+def store_report_csv(report_data, organization_id, year, quarter, base_dir=None):
+    """
+    Store the report CSV unless identical content is already stored.
+
+    Returns:
+        (path relative to base_dir in URL form, created: bool)
+    """
+    generator = UnifiedTaxCSVGenerator(report_data)
+    content = generator.render()
+    directory = _base_dir(base_dir) / REPORTS_DIR / str(organization_id)
+    name = report_file_name(content, year, quarter)
+    path = directory / name
+
+    created = False
+    try:
+        # Mark as current: the sweep keeps the most recently used version
+        os.utime(path)
+    except FileNotFoundError:
+        generator.generate(path)
+        created = True
+
+    if created:
+        _remove_stale(
+            directory, _period_prefix(year, quarter), name,
+            settings.TAX_REPORT_FILE_RETENTION, time.time(),
+        )
+    return f"{REPORTS_DIR}/{organization_id}/{name}", created
+
+
+def gc_report_files(base_dir=None, retention=None, dry_run=False):
+    """
+    Sweep all stored reports: per organization and period keep the most recently used file,
+    delete other versions and temp files older than retention seconds.
+
+    Returns:
+        List of removed (or, with dry_run, removable) paths
+    """
+    retention = settings.TAX_REPORT_FILE_RETENTION if retention is None else retention
+    root = _base_dir(base_dir) / REPORTS_DIR
+    if not root.is_dir():
+        return []
+
+    now = time.time()
+    removable = []
+    for directory in (p for p in root.iterdir() if p.is_dir()):
+        periods = {}
+        for path in directory.iterdir():
+            try:
+                mtime = path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if path.name.endswith(TEMP_SUFFIX):
+                if now - mtime >= retention:
+                    removable.append(path)
+            elif path.suffix == ".csv":
+                period = path.name.rsplit("_", 1)[0]
+                periods.setdefault(period, []).append((mtime, path))
+        for versions in periods.values():
+            versions.sort(reverse=True)
+            removable.extend(path for mtime, path in versions[1:] if now - mtime >= retention)
+
+    if not dry_run:
+        for path in removable:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+    return removable
@@ -0,0 +1,255 @@
+"""
+Deterministic pre-validation of unified tax report data (ReportDataBuilder output).
+
+Recomputes the report with the tax_config rules and returns a structured verdict at once:
+
+- arithmetic: unified_tax = turnover * rate / 100, total_payable = unified_tax + social_fund;
+- rate: must be one of the UNIFIED_TAX_RATES rates and the organization must be on the
+  unified tax regime (the profile has no region / activity type, so the rate is checked
+  against the set of rates the rules allow);
+- social fund: SOCIAL_FUND fixed part plus the extra percent above the threshold;
+- VAT: year-to-date turnover against VAT_THRESHOLD (proximity and excess).
+
+Errors are definite and need no LLM. Warnings are what the rules cannot settle (VAT
+registration, unknown regime), so only verdicts with warnings - or every verdict with
+AI_VALIDATION_ALWAYS_ESCALATE - go to the LLM validator. Counters of skipped and escalated
+reports live in the cache, so they are shared by all workers.
+"""
+
+import time
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, F
+
+from organization.models import OrganizationProfile
+from tax_reports.models import AIValidationJob
+
+from .report_data_builder import ReportDataBuilder
+from .tax_calculator import UnifiedTaxCalculator
+from .tax_config import UNIFIED_TAX_RATES, VAT_THRESHOLD
+
+AMOUNT_FIELDS = ("turnover", "rate", "unified_tax", "social_fund", "total_payable")
+TOLERANCE = Decimal("0.01")
+CENT = Decimal("0.01")
+HUNDRED = Decimal("100")
+RATES_PERCENT = sorted({rate * HUNDRED for rates in UNIFIED_TAX_RATES.values() for rate in rates.values()})
+
+STATUS_OK = "ok"
+STATUS_ERRORS = "errors"
+STATUS_NEEDS_REVIEW = "needs_review"
+
+METRICS_PREFIX = "tax:rule_validation:"
+METRIC_KEYS = ("reports", "skipped_llm", "escalated", "ok", "errors", "needs_review", "rule_micros")
+LLM_LATENCY_SAMPLE = 100
+
+
+def _amount(value):
+    try:
+        amount = Decimal(str(value))
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    return amount if amount.is_finite() else None
+
+
+def _plain(value):
+    return format(value.normalize(), "f")
+
+
+def _money(value):
+    return str(value.quantize(CENT))
+
+
+def _rate_rules(rate_percent):
+    """(regime, region) pairs of UNIFIED_TAX_RATES with this rate."""
+    return [
+        f"{regime}/{region}"
+        for regime, rates in UNIFIED_TAX_RATES.items()
+        for region, rate in rates.items()
+        if rate * HUNDRED == rate_percent
+    ]
+
+
+class TaxReportRuleValidator:
+
+    def __init__(self, organization=None):
+        self.organization = organization
+        self.checks = []
+
+    def _check(self, code, severity, message, expected=None, actual=None):
+        self.checks.append({
+            "code": code,
+            "severity": severity,
+            "message": message,
+            "expected": expected,
+            "actual": actual,
+        })
+
+    def _check_amount(self, code, message, expected, actual):
+        if abs(expected - actual) > TOLERANCE:
+            self._check(code, "error", message, _money(expected), _money(actual))
+
+    def _check_regime(self):
+        regime = self.organization.tax_regime if self.organization else None
+        if regime == OrganizationProfile.TaxRegime.GENERAL:
+            self._check(
+                "regime_not_unified", "error",
+                "Организация на общем налоговом режиме: отчет по единому налогу не применяется",
+                OrganizationProfile.TaxRegime.SINGLE, regime,
+            )
+        elif regime is None:
+            self._check(
+                "regime_unknown", "warning",
+                "Налоговый режим организации не указан: применимость единого налога не проверена",
+            )
+
+    def _check_rate(self, rate):
+        rules = _rate_rules(rate)
+        if not rules:
+            self._check(
+                "rate_not_allowed", "error",
+                "Ставка не совпадает ни с одной ставкой единого налога",
+                [_plain(r) for r in RATES_PERCENT], _plain(rate),
+            )
+            return False
+        self._check(
+            "rate_allowed", "info",
+            "Ставка допустима для: " + ", ".join(rules) + " (регион и вид деятельности в профиле не указаны)",
+        )
+        return True
+
+    def _check_vat(self, report_data):
+        try:
+            year, quarter = int(report_data["year"]), int(report_data["quarter"])
+        except (KeyError, TypeError, ValueError):
+            return
+        if self.organization is None:
+            return
+        builder = ReportDataBuilder(self.organization, year, quarter)
+        year_turnover = builder.get_year_to_date_turnover()
+        warning_share = Decimal(str(settings.AI_VALIDATION_VAT_WARNING_SHARE))
+        if year_turnover >= VAT_THRESHOLD:
+            self._check(
+                "vat_threshold_exceeded", "warning",
+                "Оборот с начала года превысил порог регистрации плательщиком НДС",
+                _money(VAT_THRESHOLD), _money(year_turnover),
+            )
+        elif year_turnover >= VAT_THRESHOLD * warning_share:
+            self._check(
+                "vat_threshold_near", "warning",
+                f"Оборот с начала года достиг {year_turnover * HUNDRED / VAT_THRESHOLD:.0f}% порога НДС",
+                _money(VAT_THRESHOLD), _money(year_turnover),
+            )
+
+    def validate(self, report_data):
+        """
+        Returns:
+            {status: ok|errors|needs_review, escalate: bool, checks: [...],
+             expected: {unified_tax, social_fund, total_payable}}
+        """
+        self.checks = []
+        expected = {}
+        values = {field: _amount(report_data.get(field)) for field in AMOUNT_FIELDS}
+        missing = [field for field, value in values.items() if value is None]
+        if missing:
+            self._check("malformed", "error", "В отчете нет числовых полей: " + ", ".join(missing))
+        else:
+            turnover, rate = values["turnover"], values["rate"]
+            if turnover < 0:
+                self._check("negative_turnover", "error", "Оборот отрицательный", actual=_money(turnover))
+
+            # Arithmetic of the report as it is
+            self._check_amount(
+                "unified_tax_mismatch", "Единый налог не равен обороту, умноженному на ставку",
+                turnover * rate / HUNDRED, values["unified_tax"],
+            )
+            self._check_amount(
+                "total_mismatch", "Итого к оплате не равно сумме единого налога и соцфонда",
+                values["unified_tax"] + values["social_fund"], values["total_payable"],
+            )
+
+            # Figures by tax_config rules
+            self._check_regime()
+            if self._check_rate(rate):
+                expected["unified_tax"] = _money(turnover * rate / HUNDRED)
+            social_fund = UnifiedTaxCalculator(self.organization, [], None, None).calculate_social_fund(turnover)
+            expected["social_fund"] = _money(social_fund)
+            self._check_amount(
+                "social_fund_mismatch", "Соцфонд не соответствует правилам (фиксированная часть и % сверх порога)",
+                social_fund, values["social_fund"],
+            )
+            if "unified_tax" in expected:
+                expected["total_payable"] = _money(Decimal(expected["unified_tax"]) + social_fund)
+            self._check_vat(report_data)
+
+        severities = {check["severity"] for check in self.checks}
+        if "error" in severities:
+            verdict_status = STATUS_ERRORS
+        elif "warning" in severities:
+            verdict_status = STATUS_NEEDS_REVIEW
+        else:
+            verdict_status = STATUS_OK
+        return {
+            "status": verdict_status,
+            "escalate": settings.AI_VALIDATION_ALWAYS_ESCALATE or verdict_status == STATUS_NEEDS_REVIEW,
+            "checks": self.checks,
+            "expected": expected,
+        }
+
+
+def _incr(name, value=1):
+    key = METRICS_PREFIX + name
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, value)
+    except ValueError:
+        # Evicted between add and incr
+        cache.set(key, value, timeout=None)
+
+
+def prevalidate_report(report_data, organization=None):
+    """Run the rule validator and record the outcome in the shared counters."""
+    started = time.perf_counter()
+    verdict = TaxReportRuleValidator(organization).validate(report_data)
+    _incr("rule_micros", int((time.perf_counter() - started) * 1_000_000))
+    _incr("reports")
+    _incr(verdict["status"])
+    _incr("escalated" if verdict["escalate"] else "skipped_llm")
+    return verdict
+
+
+def get_rule_validation_metrics():
+    """
+    Counters since the cache was last cleared, plus the LLM latency the skipped reports saved
+    (estimated from the average duration of the latest finished AI validation jobs).
+    """
+    values = cache.get_many([METRICS_PREFIX + name for name in METRIC_KEYS])
+    counters = {name: values.get(METRICS_PREFIX + name, 0) for name in METRIC_KEYS}
+    reports = counters["reports"]
+
+    recent_jobs = AIValidationJob.objects.filter(status=AIValidationJob.Status.DONE).order_by("-updated_at")
+    llm_seconds = (
+        AIValidationJob.objects.filter(pk__in=recent_jobs.values("pk")[:LLM_LATENCY_SAMPLE])
+        .aggregate(avg=Avg(F("updated_at") - F("created_at")))["avg"]
+    )
+    if isinstance(llm_seconds, timedelta):
+        llm_seconds = llm_seconds.total_seconds()
+    elif llm_seconds is not None:
+        # Backends without native durations return microseconds
+        llm_seconds = llm_seconds / 1_000_000
+
+    rule_ms = counters["rule_micros"] / 1000 / reports if reports else None
+    return {
+        "reports": reports,
+        "skipped_llm": counters["skipped_llm"],
+        "escalated": counters["escalated"],
+        "skip_share": round(counters["skipped_llm"] / reports, 4) if reports else None,
+        "by_status": {name: counters[name] for name in (STATUS_OK, STATUS_ERRORS, STATUS_NEEDS_REVIEW)},
+        "rule_latency_ms_avg": round(rule_ms, 3) if rule_ms is not None else None,
+        "llm_latency_ms_avg": round(llm_seconds * 1000) if llm_seconds is not None else None,
+        "latency_saved_seconds_estimate": (
+            round(counters["skipped_llm"] * llm_seconds, 1) if llm_seconds is not None else None
+        ),
+    }
@@ -29,12 +29,14 @@ class UnifiedTaxCalculator:
         return UNIFIED_TAX_RATES[regime][region]
 
     def calculate_social_fund(self, turnover):
-        monthly_income = turnover / Decimal("3")
-        threshold = SOCIAL_FUND["threshold"]
+        # Average monthly income over the quarter vs the monthly threshold:
+        # turnover / 3 > threshold  <=>  turnover > threshold * 3.
+        # Multiplying instead of dividing keeps the result exact (no 1/3 rounding).
+        quarter_threshold = SOCIAL_FUND["threshold"] * 3
 
         extra = Decimal("0")
-        if monthly_income > threshold:
-            extra = (monthly_income - threshold) * SOCIAL_FUND["extra_percent"] * 3
+        if turnover > quarter_threshold:
+            extra = (turnover - quarter_threshold) * SOCIAL_FUND["extra_percent"]
 
         fixed = SOCIAL_FUND["fixed_monthly"] * 3
         return fixed + extra
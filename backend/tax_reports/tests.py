@@ -1,3 +1,166 @@
-from django.test import TestCase
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+from types import SimpleNamespace
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from finance.models import Transaction
+from organization.models import OrganizationProfile
+from users.models import CustomUser
+
+from .management.commands.benchmark_unified_tax_engine import _random_inputs
+from .services.batch_tax_engine import MAX_TURNOVER_TIYIN, THRESHOLD_TIYIN, calculate_unified_tax_batch, from_tiyin
+from .services.report_data_builder import ReportDataBuilder
+from .services.rule_validator import STATUS_ERRORS, STATUS_NEEDS_REVIEW, STATUS_OK, TaxReportRuleValidator
+from .services.tax_calculator import UnifiedTaxCalculator
+from .services.tax_config import SOCIAL_FUND, UNIFIED_TAX_RATES
+
+
+@override_settings(AI_VALIDATION_ALWAYS_ESCALATE=False)
+class ReportRuleValidationTests(TestCase):
+
+    def setUp(self):
+        user = CustomUser.objects.create_user(email="tax@example.com", password="p")
+        self.organization = OrganizationProfile.objects.create(
+            user=user,
+            org_type=OrganizationProfile.OrgType.IE,
+            tax_regime=OrganizationProfile.TaxRegime.SINGLE,
+            onboarding_status=OrganizationProfile.OnboardingStatus.COMPLETED,
+        )
+        # Above the quarterly social fund threshold, so the extra percent applies
+        for day, amount in ((10, "100000.00"), (20, "25000.55")):
+            Transaction.objects.create(
+                user=user,
+                transaction_type=Transaction.TransactionType.INCOME,
+                payment_method=Transaction.PaymentMethod.CASH,
+                is_business=True,
+                is_taxable=True,
+                amount=Decimal(amount),
+                transaction_date=date(2025, 2, day),
+            )
+
+    def _errors(self, verdict):
+        return {check["code"] for check in verdict["checks"] if check["severity"] == "error"}
+
+    def _report_by_rules(self):
+        """The built report with the figures tax_config gives for trade in Bishkek (2%)."""
+        report_data = ReportDataBuilder(self.organization, 2025, 1).build_report_data()
+        turnover = report_data["turnover"]
+        rate = UNIFIED_TAX_RATES["trade"]["bishkek"] * Decimal("100")
+        social_fund = UnifiedTaxCalculator(self.organization, [], 2025, 1).calculate_social_fund(turnover)
+        report_data.update(rate=rate, unified_tax=turnover * rate / Decimal("100"), social_fund=social_fund)
+        report_data["total_payable"] = report_data["unified_tax"] + social_fund
+        return report_data
+
+    def test_report_by_rules_passes(self):
+        report_data = self._report_by_rules()
+        verdict = TaxReportRuleValidator(self.organization).validate(report_data)
+
+        self.assertEqual(self._errors(verdict), set())
+        self.assertEqual(verdict["status"], STATUS_OK)
+        self.assertFalse(verdict["escalate"])
+        self.assertEqual(
+            Decimal(verdict["expected"]["total_payable"]), report_data["total_payable"].quantize(Decimal("0.01"))
+        )
+
+    def test_unknown_regime_needs_review(self):
+        verdict = TaxReportRuleValidator(None).validate(self._report_by_rules())
+
+        self.assertEqual(self._errors(verdict), set())
+        self.assertEqual(verdict["status"], STATUS_NEEDS_REVIEW)
+        self.assertTrue(verdict["escalate"])
+
+    def test_builder_flat_rates_are_errors(self):
+        # ReportDataBuilder applies a flat 10% and 3%: consistent arithmetic, but not tax_config rules
+        report_data = ReportDataBuilder(self.organization, 2025, 1).build_report_data()
+        verdict = TaxReportRuleValidator(self.organization).validate(report_data)
+
+        self.assertEqual(verdict["status"], STATUS_ERRORS)
+        self.assertFalse(verdict["escalate"])
+        self.assertEqual(self._errors(verdict), {"rate_not_allowed", "social_fund_mismatch"})
+
+
+OUTPUT_FIELDS = ("turnover", "unified_tax", "social_fund", "total_payable")
+CENT = Decimal("0.01")
+
+
+class SocialFundBoundaryTests(SimpleTestCase):
+    """calculate_social_fund: 3% of the quarter turnover above threshold * 3, on top of the fixed part."""
+
+    def _social_fund(self, turnover):
+        return UnifiedTaxCalculator(None, [], 2025, 1).calculate_social_fund(Decimal(turnover))
+
+    def test_threshold_boundary(self):
+        # threshold 20000 a month: 60000 a quarter, the fixed part is 1200 * 3
+        cases = {
+            "0": Decimal("3600"),
+            "59999.99": Decimal("3600"),
+            "60000.00": Decimal("3600"),
+            "60000.01": Decimal("3600.0003"),
+            "60001.00": Decimal("3600.03"),
+        }
+        for turnover, expected in cases.items():
+            with self.subTest(turnover=turnover):
+                self.assertEqual(self._social_fund(turnover), expected)
+
+    def test_half_tiyin_is_exact(self):
+        # The extra part ends in exactly half a tiyin and rounds up. turnover / 3 * 3 left it at
+        # x.xx4999..., which rounded a tiyin lower.
+        cases = {"3016442.50": Decimal("92293.28"), "3029858.50": Decimal("92695.76")}
+        for turnover, expected in cases.items():
+            with self.subTest(turnover=turnover):
+                self.assertEqual(self._social_fund(turnover).quantize(CENT, rounding=ROUND_HALF_UP), expected)
+
+
+class BatchTaxEngineTests(SimpleTestCase):
+    """calculate_unified_tax_batch returns UnifiedTaxCalculator's results rounded half up to the tiyin."""
+
+    def assertMatchesScalar(self, monthly, regimes, regions):
+        batch = calculate_unified_tax_batch(monthly, regimes, regions)
+        for i, (row, regime, region) in enumerate(zip(monthly.tolist(), regimes.tolist(), regions.tolist())):
+            organization = SimpleNamespace(name="", inn="", tax_regime=regime, region=region)
+            transactions = [SimpleNamespace(amount=from_tiyin(value), type="income") for value in row]
+            scalar = UnifiedTaxCalculator(organization, transactions, 2025, 1).build()
+            for field in OUTPUT_FIELDS:
+                expected = int(scalar[field].quantize(CENT, rounding=ROUND_HALF_UP).scaleb(2))
+                with self.subTest(monthly=row, regime=regime, region=region, field=field):
+                    self.assertEqual(int(batch[field][i]), expected)
+
+    def test_random_inputs(self):
+        rng = np.random.default_rng(12)
+        self.assertMatchesScalar(*_random_inputs(rng, 2_000))
+
+    def test_social_fund_threshold(self):
+        quarter = THRESHOLD_TIYIN * 3
+        totals = [0, quarter - 1, quarter, quarter + 1, quarter + 50, quarter + 17]
+        # All in one month and spread over the quarter: the threshold applies to the period total
+        monthly = np.array(
+            [[total, 0, 0] for total in totals] + [[total // 3, total // 3, total - total // 3 * 2] for total in totals]
+        )
+        self.assertMatchesScalar(monthly, np.array(["trade"] * len(monthly)), np.array(["bishkek"] * len(monthly)))
+
+        # One tiyin above the threshold adds 0.03 tiyin: still the fixed part after rounding
+        social_fund = calculate_unified_tax_batch(monthly[:4], ["trade"] * 4, ["bishkek"] * 4)["social_fund"]
+        fixed = int(SOCIAL_FUND["fixed_monthly"] * 3 * 100)
+        self.assertEqual(social_fund.tolist(), [fixed] * 4)
+
+    def test_social_fund_half_tiyin(self):
+        # Same turnovers as SocialFundBoundaryTests.test_half_tiyin_is_exact, spread over the quarter
+        totals = ["3016442.50", "3029858.50", "30032375.50", "33279307652.50"]
+        monthly = np.array([[int(Decimal(total) * 100) - 2, 1, 1] for total in totals])
+        regimes = np.array(["trade", "production", "trade", "production"])
+        self.assertMatchesScalar(monthly, regimes, np.array(["osh", "chui", "bishkek", "naryn"]))
+
+    def test_unified_tax_half_up(self):
+        # 0.5% of 1, 3 and 101 som is a whole number of tiyin plus exactly half a tiyin
+        monthly = np.array([[100, 0, 0], [300, 0, 0], [10100, 0, 0], [MAX_TURNOVER_TIYIN, 0, 0]])
+        regimes = np.array(["production"] * len(monthly))
+        regions = np.array(["osh", "naryn", "Talas", "osh"])
+        self.assertMatchesScalar(monthly, regimes, regions)
+        unified_tax = calculate_unified_tax_batch(monthly[:3], regimes[:3], regions[:3])["unified_tax"]
+        self.assertEqual(unified_tax.tolist(), [1, 2, 51])
+
+    def test_rejects_turnover_above_int64_range(self):
+        with self.assertRaises(ValueError):
+            calculate_unified_tax_batch([[MAX_TURNOVER_TIYIN + 1, 0, 0]], ["trade"], ["bishkek"])
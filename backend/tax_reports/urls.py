@@ -1,6 +1,9 @@
 from django.urls import path
-from .views import GenerateUnifiedTaxReportView
+from .views import AIValidationJobView, GenerateUnifiedTaxReportView, RuleValidationMetricsView, UnifiedTaxCSVView
 
 urlpatterns = [
     path("generate-unified-tax/", GenerateUnifiedTaxReportView.as_view()),
+    path("unified-tax/csv/", UnifiedTaxCSVView.as_view()),
+    path("ai-validation/<uuid:job_id>/", AIValidationJobView.as_view()),
+    path("rule-validation/metrics/", RuleValidationMetricsView.as_view()),
 ]
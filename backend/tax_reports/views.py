@@ -1,16 +1,19 @@
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from drf_spectacular.utils import extend_schema
 
-from .serializers import UnifiedTaxRequestSerializer, UnifiedTaxReportResponseSerializer
+from .models import AIValidationJob
+from .serializers import AIValidationJobSerializer, UnifiedTaxRequestSerializer, UnifiedTaxReportResponseSerializer
 from organization.models import OrganizationProfile
 from .services.report_data_builder import ReportDataBuilder
 from .services.csv_generator import UnifiedTaxCSVGenerator
-from .services.ai_validator import AITaxValidator
+from .services.ai_validation_jobs import get_validation_job, submit_validation
+from .services.report_files import store_report_csv
+from .services.rule_validator import get_rule_validation_metrics, prevalidate_report
 from django.conf import settings
-import os
+from django.http import HttpResponse
 
 
 class GenerateUnifiedTaxReportView(APIView):
@@ -38,21 +41,73 @@ class GenerateUnifiedTaxReportView(APIView):
         builder = ReportDataBuilder(organization, year, quarter)
         report_data = builder.build_report_data()
 
-        # Генерируем CSV
-        file_name = f"unified_tax_{organization.id}_{year}_Q{quarter}.csv"
-        file_path = os.path.join(settings.MEDIA_ROOT, file_name)
-        csv_generator = UnifiedTaxCSVGenerator(report_data)
-        csv_generator.generate(file_path)
+        # CSV по хэшу содержимого: неизменившийся отчет не перезаписывается
+        relative_path, _ = store_report_csv(report_data, organization.id, year, quarter)
 
-        # AI-валидатор
-        ai_validator = AITaxValidator()
-        ai_comment = ai_validator.validate(report_data)
+        # Проверка по правилам tax_config - сразу; AI-валидатор только если правил недостаточно
+        rule_validation = prevalidate_report(report_data, organization)
+        job = None
+        ai_comment = None
+        if rule_validation["escalate"]:
+            # Фоновая задача; готовый результат для тех же данных отдаём сразу
+            job = submit_validation(request.user, report_data)
+            ai_comment = job.result if job.status == AIValidationJob.Status.DONE else None
 
         # Формируем URL для скачивания CSV
-        csv_url = request.build_absolute_uri(os.path.join(settings.MEDIA_URL, file_name))
+        csv_url = request.build_absolute_uri(settings.MEDIA_URL + relative_path)
 
         return Response({
             "report_data": report_data,
             "csv_file": csv_url,
-            "ai_validation": ai_comment
+            "rule_validation": rule_validation,
+            "ai_validation": ai_comment,
+            "ai_validation_job": AIValidationJobSerializer(job).data if job else None,
         })
+
+
+class UnifiedTaxCSVView(APIView):
+    """CSV отчета по единому налогу прямо из памяти, без записи на диск."""
+
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(parameters=[UnifiedTaxRequestSerializer], responses={(200, "text/csv"): bytes})
+    def get(self, request):
+        serializer = UnifiedTaxRequestSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        year = serializer.validated_data["year"]
+        quarter = serializer.validated_data["quarter"]
+
+        try:
+            organization = OrganizationProfile.objects.get(user=request.user)
+        except OrganizationProfile.DoesNotExist:
+            return Response({"error": "Organization profile not found"}, status=404)
+
+        report_data = ReportDataBuilder(organization, year, quarter).build_report_data()
+        response = HttpResponse(UnifiedTaxCSVGenerator(report_data).render(), content_type="text/csv; charset=utf-8")
+        file_name = UnifiedTaxCSVGenerator.file_name(organization.id, year, quarter)
+        response["Content-Disposition"] = f'attachment; filename="{file_name}"'
+        return response
+
+
+class AIValidationJobView(APIView):
+    """Статус фоновой AI-проверки отчета (опрашивается клиентом до status=done/failed)."""
+
+    serializer_class = AIValidationJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = get_validation_job(request.user, job_id)
+        if job is None:
+            return Response({"error": "Validation job not found"}, status=404)
+        return Response(AIValidationJobSerializer(job).data)
+
+
+class RuleValidationMetricsView(APIView):
+    """Доля отчетов, проверенных без LLM, и сэкономленное время (только для администраторов)."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_rule_validation_metrics())
@@ -1,13 +1,36 @@
 """
 Клиент API Salyk Finance для бота.
 Использует /api/telegram/bot/link/ и /api/telegram/bot/auth/ (X-Bot-Secret).
+
+Access-токены кэшируются по telegram_id до срока из claim exp (минус запас), за
+refresh_ahead секунд до истечения обновляются в фоне, а одновременные запросы токена
+одного пользователя сводятся к одному POST /telegram/bot/auth/. Счётчики — token_cache_stats().
+
+Категории и страницы последних транзакций кэшируются по пользователю (user_id из токена)
+на BOT_CACHE_TTL_* секунд, не более BOT_CACHE_USERS пользователей (LRU). create_transaction и
+delete_transaction сбрасывают страницы транзакций этого пользователя. Счётчики — response_cache_stats().
 """
+import asyncio
+import base64
+import binascii
+import copy
+import json
 import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import date
 from typing import Optional
 
 import aiohttp
 
+# Время жизни токена, если exp не удалось прочитать (ACCESS_TOKEN_LIFETIME бэкенда — 15 минут)
+FALLBACK_TOKEN_LIFETIME = 60
+TOKEN_CACHE_SIZE = 10_000
+
+CATEGORIES = "categories"
+TRANSACTIONS = "transactions"
+
 
 class SalykBotAPIError(Exception):
     """Ошибка ответа API (4xx/5xx или бизнес-логика)."""
@@ -17,15 +40,131 @@ class SalykBotAPIError(Exception):
         super().__init__(message)
 
 
+def _token_claims(access_token: str) -> dict:
+    """Claim'ы JWT без проверки подписи (токен выдал наш бэкенд); {} для нечитаемого токена."""
+    try:
+        payload = access_token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except (IndexError, TypeError, ValueError, binascii.Error):
+        return {}
+    return claims if isinstance(claims, dict) else {}
+
+
+def _token_lifetime(access_token: str) -> float:
+    """Секунды жизни JWT по claim'ам exp/iat."""
+    claims = _token_claims(access_token)
+    try:
+        exp = float(claims["exp"])
+    except (KeyError, TypeError, ValueError):
+        return FALLBACK_TOKEN_LIFETIME
+    # exp - iat не зависит от расхождения часов бота и бэкенда
+    iat = claims.get("iat")
+    if isinstance(iat, (int, float)):
+        return exp - iat
+    return exp - time.time()
+
+
+class _UserResponseCache:
+    """
+    Ответы API по пользователям: LRU по пользователям, TTL у каждой записи.
+    Запись, запрошенная до сброса (invalidate), в кэш не попадает — иначе ответ, полученный
+    параллельно с удалением, вернул бы удалённую транзакцию.
+    put сохраняет, а get отдаёт глубокие копии: вызывающий может менять полученные списки и словари.
+    """
+
+    def __init__(self, max_users: int, ttl: dict[str, float]):
+        self.max_users = max_users
+        self.ttl = ttl
+        # user -> {"invalidated": номер сброса, "items": {key: (expires_at, value)}}
+        self._users: OrderedDict = OrderedDict()
+        self._invalidations = 0
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+    def version(self) -> int:
+        return self._invalidations
+
+    def get(self, user, key: tuple):
+        entry = self._users.get(user)
+        item = entry["items"].get(key) if entry else None
+        if item is None or item[0] <= time.monotonic():
+            self.stats["misses"] += 1
+            return None
+        self._users.move_to_end(user)
+        self.stats["hits"] += 1
+        return copy.deepcopy(item[1])
+
+    def put(self, user, key: tuple, value, version: int) -> None:
+        ttl = self.ttl.get(key[0], 0)
+        if ttl <= 0:
+            return
+        entry = self._users.get(user)
+        if entry is None:
+            # Сбросы до создания записи неизвестны: принимаем только ответы, запрошенные после
+            entry = self._users[user] = {"invalidated": self._invalidations, "items": {}}
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self.stats["evictions"] += 1
+        if version < entry["invalidated"]:
+            return
+        self._users.move_to_end(user)
+        now = time.monotonic()
+        entry["items"] = {k: v for k, v in entry["items"].items() if v[0] > now}
+        entry["items"][key] = (now + ttl, copy.deepcopy(value))
+
+    def invalidate(self, user, kind: str) -> None:
+        self._invalidations += 1
+        self.stats["invalidations"] += 1
+        entry = self._users.get(user)
+        if entry is not None:
+            entry["invalidated"] = self._invalidations
+            entry["items"] = {k: v for k, v in entry["items"].items() if k[0] != kind}
+
+    def __len__(self):
+        return len(self._users)
+
+
+@dataclass
+class _CachedToken:
+    access: str
+    refresh: Optional[str]
+    # time.monotonic() момента истечения
+    expires_at: float
+
+
 class SalykBotAPI:
     def __init__(
         self,
         base_url: str,
         bot_secret: Optional[str] = None,
+        token_refresh_margin: float = 30,
+        token_refresh_ahead: float = 120,
+        categories_ttl: float = 300,
+        transactions_ttl: float = 60,
+        cache_users: int = 1000,
     ):
         self.base = base_url.rstrip("/")
         self.bot_secret = bot_secret
         self._session: Optional[aiohttp.ClientSession] = None
+        # Токен не отдаётся, если до истечения меньше token_refresh_margin секунд
+        self.token_refresh_margin = token_refresh_margin
+        # За столько секунд до истечения токен обновляется в фоне
+        self.token_refresh_ahead = token_refresh_ahead
+        self._tokens: dict[str, _CachedToken] = {}
+        self._token_requests: dict[str, asyncio.Task] = {}
+        self._token_stats = {
+            "auth_requests": 0,
+            "auth_failures": 0,
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "background_refreshes": 0,
+            "invalidated": 0,
+        }
+        # Категории меняются только в веб-кабинете — их сбрасывает лишь TTL; транзакции,
+        # добавленные в веб-кабинете, видны в боте не позже чем через transactions_ttl
+        self._responses = _UserResponseCache(
+            cache_users, {CATEGORIES: categories_ttl, TRANSACTIONS: transactions_ttl},
+        )
 
     async def _session_get(self) -> aiohttp.ClientSession:
         if self._session is None or self._session.closed:
@@ -39,9 +178,74 @@ class SalykBotAPI:
         return h
 
     async def close(self):
+        for task in list(self._token_requests.values()):
+            task.cancel()
         if self._session and not self._session.closed:
             await self._session.close()
 
+    def token_cache_stats(self) -> dict:
+        """Счётчики кэша токенов: запросы к /telegram/bot/auth/, попадания, промахи, объединённые запросы."""
+        return {**self._token_stats, "cached": len(self._tokens), "in_flight": len(self._token_requests)}
+
+    def response_cache_stats(self) -> dict:
+        """Счётчики кэша категорий и транзакций."""
+        return {**self._responses.stats, "users": len(self._responses)}
+
+    def invalidate_token(self, telegram_id: str) -> None:
+        """Забыть токен пользователя (перепривязка аккаунта, 401 от API)."""
+        if self._tokens.pop(str(telegram_id), None) is not None:
+            self._token_stats["invalidated"] += 1
+
+    def _token_rejected(self, access_token: str) -> None:
+        """API ответил 401 на токен из кэша — следующий запрос получит новый."""
+        for telegram_id, cached in list(self._tokens.items()):
+            if cached.access == access_token:
+                self.invalidate_token(telegram_id)
+
+    def _store_token(self, telegram_id: str, access: str, refresh: Optional[str]) -> None:
+        now = time.monotonic()
+        self._tokens.pop(telegram_id, None)
+        self._tokens[telegram_id] = _CachedToken(access, refresh, now + _token_lifetime(access))
+        if len(self._tokens) > TOKEN_CACHE_SIZE:
+            for key in [k for k, v in self._tokens.items() if v.expires_at - self.token_refresh_margin <= now]:
+                del self._tokens[key]
+            # Словарь упорядочен по времени получения: вытесняем самые старые
+            while len(self._tokens) > TOKEN_CACHE_SIZE:
+                del self._tokens[next(iter(self._tokens))]
+
+    def _request_token(self, telegram_id: str) -> asyncio.Task:
+        """Единственный на telegram_id запрос токена; результат попадает в кэш."""
+        task = self._token_requests.get(telegram_id)
+        if task is not None:
+            return task
+
+        async def fetch():
+            self._token_stats["auth_requests"] += 1
+            try:
+                access, refresh = await self._fetch_token(telegram_id)
+            except SalykBotAPIError as e:
+                self._token_stats["auth_failures"] += 1
+                if e.status == 404:
+                    # Аккаунт отвязан
+                    self.invalidate_token(telegram_id)
+                raise
+            except Exception:
+                self._token_stats["auth_failures"] += 1
+                raise
+            self._store_token(telegram_id, access, refresh)
+            return access, refresh
+
+        def done(finished: asyncio.Task):
+            self._token_requests.pop(telegram_id, None)
+            # Ошибку фонового обновления никто не ждёт
+            if not finished.cancelled():
+                finished.exception()
+
+        task = asyncio.ensure_future(fetch())
+        task.add_done_callback(done)
+        self._token_requests[telegram_id] = task
+        return task
+
     async def link_by_code(self, code: str, telegram_id: str) -> bool:
         """Привязать аккаунт по коду. POST /api/telegram/bot/link/"""
         payload = {"code": code.strip(), "telegram_id": str(telegram_id)}
@@ -51,6 +255,8 @@ class SalykBotAPI:
             headers=self._bot_headers(),
         ) as resp:
             if resp.status == 200:
+                # telegram_id мог быть привязан к другому аккаунту
+                self.invalidate_token(telegram_id)
                 return True
             data = await resp.json() if resp.content_type == "application/json" else {}
             raise SalykBotAPIError(
@@ -59,7 +265,29 @@ class SalykBotAPI:
             )
 
     async def get_token_by_telegram_id(self, telegram_id: str) -> tuple[str, Optional[str]]:
-        """Получить JWT по telegram_id. POST /api/telegram/bot/auth/"""
+        """
+        Получить JWT по telegram_id: из кэша, если до истечения больше token_refresh_margin
+        секунд, иначе POST /api/telegram/bot/auth/ (один на пользователя, даже при
+        одновременных вызовах).
+        """
+        telegram_id = str(telegram_id)
+        cached = self._tokens.get(telegram_id)
+        remaining = cached.expires_at - time.monotonic() if cached else 0
+        if remaining > self.token_refresh_margin:
+            self._token_stats["hits"] += 1
+            if remaining <= self.token_refresh_ahead and telegram_id not in self._token_requests:
+                self._token_stats["background_refreshes"] += 1
+                self._request_token(telegram_id)
+            return cached.access, cached.refresh
+
+        self._token_stats["misses"] += 1
+        if telegram_id in self._token_requests:
+            self._token_stats["coalesced"] += 1
+        # shield: отмена одного обработчика не отменяет общий запрос
+        return await asyncio.shield(self._request_token(telegram_id))
+
+    async def _fetch_token(self, telegram_id: str) -> tuple[str, Optional[str]]:
+        """POST /api/telegram/bot/auth/"""
         payload = {"telegram_id": str(telegram_id)}
         async with (await self._session_get()).post(
             f"{self.base}/telegram/bot/auth/",
@@ -80,6 +308,13 @@ class SalykBotAPI:
         GET /api/finance/categories/ — список категорий пользователя.
         category_type: 'income' | 'expense' — фильтр по типу.
         """
+        user = _token_claims(access_token).get("user_id")
+        key = (CATEGORIES, category_type)
+        cached = self._responses.get(user, key) if user is not None else None
+        if cached is not None:
+            return cached
+        version = self._responses.version()
+
         params = {}
         if category_type:
             params["category_type"] = category_type
@@ -92,6 +327,8 @@ class SalykBotAPI:
             },
         ) as resp:
             if resp.status != 200:
+                if resp.status == 401:
+                    self._token_rejected(access_token)
                 data = await resp.json() if resp.content_type == "application/json" else {}
                 raise SalykBotAPIError(
                     data.get("detail", "Не удалось загрузить категории"),
@@ -101,6 +338,8 @@ class SalykBotAPI:
             items = data if isinstance(data, list) else data.get("results", data.get("data", []))
             if category_type:
                 items = [c for c in items if c.get("category_type") == category_type]
+            if user is not None:
+                self._responses.put(user, key, items, version)
             return items
 
     async def get_transactions(
@@ -115,6 +354,13 @@ class SalykBotAPI:
         """
         GET /api/finance/transactions/ — список транзакций пользователя.
         """
+        user = _token_claims(access_token).get("user_id")
+        key = (TRANSACTIONS, limit, offset, transaction_type, date_from, date_to)
+        cached = self._responses.get(user, key) if user is not None else None
+        if cached is not None:
+            return cached
+        version = self._responses.version()
+
         params = {"limit": limit, "offset": offset}
         if transaction_type:
             params["transaction_type"] = transaction_type
@@ -131,6 +377,8 @@ class SalykBotAPI:
             },
         ) as resp:
             if resp.status != 200:
+                if resp.status == 401:
+                    self._token_rejected(access_token)
                 data = await resp.json() if resp.content_type == "application/json" else {}
                 raise SalykBotAPIError(
                     data.get("detail", "Не удалось загрузить транзакции"),
@@ -138,10 +386,19 @@ class SalykBotAPI:
                 )
             data = await resp.json()
             items = data if isinstance(data, list) else data.get("results", data.get("data", []))
+            if user is not None:
+                self._responses.put(user, key, items, version)
             return items
 
+    def _transactions_changed(self, access_token: str) -> None:
+        user = _token_claims(access_token).get("user_id")
+        if user is not None:
+            self._responses.invalidate(user, TRANSACTIONS)
+
     async def delete_transaction(self, access_token: str, transaction_id: int) -> None:
         """DELETE /api/finance/transactions/:id/"""
+        # Сброс и до, и после запроса: ответ на параллельный GET не вернёт удалённую запись
+        self._transactions_changed(access_token)
         async with (await self._session_get()).delete(
             f"{self.base}/finance/transactions/{transaction_id}/",
             headers={
@@ -149,11 +406,14 @@ class SalykBotAPI:
             },
         ) as resp:
             if resp.status not in (200, 204):
+                if resp.status == 401:
+                    self._token_rejected(access_token)
                 data = await resp.json() if resp.content_type == "application/json" else {}
                 raise SalykBotAPIError(
                     data.get("detail", "Не удалось удалить транзакцию"),
                     status=resp.status,
                 )
+            self._transactions_changed(access_token)
 
     async def create_transaction(
         self,
@@ -166,10 +426,13 @@ class SalykBotAPI:
         is_taxable: bool = True,
         category_id: Optional[int] = None,
         description: str = "",
+        idempotency_key: Optional[str] = None,
     ) -> dict:
         """
         POST /api/finance/transactions/ — создание транзакции.
         Используется после того, как бот получит access_token по telegram_id.
+        idempotency_key — заголовок Idempotency-Key: повтор запроса с тем же ключом
+        не создаёт вторую транзакцию.
         """
         if transaction_date is None:
             transaction_date = date.today()
@@ -188,16 +451,24 @@ class SalykBotAPI:
         if is_business:
             payload["activity_code"] = None  # упрощённо; при необходимости передать id
 
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {access_token}",
+        }
+        if idempotency_key:
+            headers["Idempotency-Key"] = idempotency_key
+
+        self._transactions_changed(access_token)
         async with (await self._session_get()).post(
             f"{self.base}/finance/transactions/",
             json=payload,
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {access_token}",
-            },
+            headers=headers,
         ) as resp:
             if resp.status in (200, 201):
+                self._transactions_changed(access_token)
                 return await resp.json()
+            if resp.status == 401:
+                self._token_rejected(access_token)
             data = await resp.json() if resp.content_type == "application/json" else {}
             detail = data.get("detail")
             if isinstance(detail, dict):
@@ -211,4 +482,12 @@ class SalykBotAPI:
 def get_api_from_env() -> SalykBotAPI:
     base = os.getenv("API_BASE", "http://127.0.0.1:8000/api")
     secret = os.getenv("BOT_API_SECRET")
-    return SalykBotAPI(base_url=base, bot_secret=secret)
+    return SalykBotAPI(
+        base_url=base,
+        bot_secret=secret,
+        token_refresh_margin=float(os.getenv("BOT_TOKEN_REFRESH_MARGIN", "30")),
+        token_refresh_ahead=float(os.getenv("BOT_TOKEN_REFRESH_AHEAD", "120")),
+        categories_ttl=float(os.getenv("BOT_CACHE_TTL_CATEGORIES", "300")),
+        transactions_ttl=float(os.getenv("BOT_CACHE_TTL_TRANSACTIONS", "60")),
+        cache_users=int(os.getenv("BOT_CACHE_USERS", "1000")),
+    )
@@ -0,0 +1,86 @@
+"""
+Нагрузочный тест кэша ответов SalykBotAPI против локального бэкенда: медианная задержка
+обработчиков выбора категории и обновления списка транзакций без кэша и с кэшем.
+
+Сценарий на пользователя: 45% — клавиатура категорий (токен + get_categories), 45% — обновление
+списка (токен + get_transactions на 15 записей), 10% — create_transaction + delete_transaction;
+после каждой записи список перечитывается и проверяется, что он свежий.
+
+Нужен запущенный бэкенд с BOT_API_SECRET и пользователями, привязанными к telegram_id
+(по умолчанию 1000..1000+users-1):
+
+    python benchmark_api_cache.py --base-url http://127.0.0.1:8000/api --bot-secret s --users 20
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from api_client import SalykBotAPI
+
+CATEGORY_SHARE = 0.45
+LIST_SHARE = 0.45
+LIST_LIMIT = 15
+
+
+async def run(name: str, args, **cache_options) -> None:
+    api = SalykBotAPI(args.base_url, args.bot_secret, **cache_options)
+    rng = random.Random(args.seed)
+    # SQLite dev-бэкенд держит одну запись за раз: записи идут последовательно
+    write_lock = asyncio.Lock()
+    latency = {"категории": [], "список": [], "запись": []}
+
+    async def timed(kind, handler, telegram_id):
+        started = time.perf_counter()
+        token, _ = await api.get_token_by_telegram_id(telegram_id)
+        result = await handler(token)
+        latency[kind].append(time.perf_counter() - started)
+        return token, result
+
+    async def user(telegram_id):
+        for _ in range(args.rounds):
+            roll = rng.random()
+            if roll < CATEGORY_SHARE:
+                await timed("категории", lambda token: api.get_categories(
+                    token, category_type=rng.choice(["income", "expense"])), telegram_id)
+            elif roll < CATEGORY_SHARE + LIST_SHARE:
+                await timed("список", lambda token: api.get_transactions(token, limit=LIST_LIMIT), telegram_id)
+            else:
+                async with write_lock:
+                    token, created = await timed(
+                        "запись", lambda token: api.create_transaction(token, "expense", "10"), telegram_id,
+                    )
+                    items = await api.get_transactions(token, limit=LIST_LIMIT)
+                    assert any(i["id"] == created["id"] for i in items), "список после создания устарел"
+                    await api.delete_transaction(token, created["id"])
+                    items = await api.get_transactions(token, limit=LIST_LIMIT)
+                    assert all(i["id"] != created["id"] for i in items), "список после удаления устарел"
+
+    telegram_ids = [str(args.first_telegram_id + i) for i in range(args.users)]
+    started = time.perf_counter()
+    await asyncio.gather(*(user(telegram_id) for telegram_id in telegram_ids))
+    elapsed = time.perf_counter() - started
+    medians = ", ".join(
+        f"{kind} p50 {statistics.median(values) * 1000:.1f} мс (n={len(values)})"
+        for kind, values in latency.items() if values
+    )
+    print(f"{name:<10} {elapsed:.2f} с; {medians}")
+    print(f"{'':<10} кэш: {api.response_cache_stats()}")
+    await api.close()
+
+
+async def main(args) -> None:
+    await run("без кэша", args, categories_ttl=0, transactions_ttl=0)
+    await run("с кэшем", args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный тест кэша ответов API бота")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000/api")
+    parser.add_argument("--bot-secret", default="")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--first-telegram-id", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=15, help="Действий на пользователя")
+    parser.add_argument("--seed", type=int, default=2)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,108 @@
+"""
+Бенчмарк FSM-хранилищ: переходы состояний в секунду на сценарии добавления транзакции
+(choose_type → choose_payment → choose_category → enter_amount → confirm) для MemoryStorage
+и CachedStorage поверх SQLite и Redis (если указан --redis-url), с отложенной записью и без
+кэша (каждое чтение и запись — в хранилище, как при BOT_REPLICAS > 1).
+
+    python benchmark_fsm_storage.py --chats 200 --rounds 20
+    python benchmark_fsm_storage.py --redis-url redis://127.0.0.1:6379/15
+
+Бенчмарк пишет в указанную БД Redis ключи fsm:* — используйте отдельную БД.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from fsm_storage import CachedStorage, RedisBackend, SQLiteBackend
+from states import TransactionStates
+
+BOT_ID = 1
+CATEGORIES = {str(i): f"Категория {i}" for i in range(10)}
+
+
+async def transaction_flow(storage, key: StorageKey) -> int:
+    """Один проход сценария, как его делают обработчики bot.py; возвращает число переходов."""
+    await storage.set_data(key, {})
+    await storage.set_state(key, TransactionStates.choose_type)
+    await storage.get_state(key)
+    await storage.update_data(key, {"transaction_type": "expense"})
+    await storage.set_state(key, TransactionStates.choose_payment)
+    await storage.get_state(key)
+    await storage.update_data(key, {"payment_method": "cash"})
+    await storage.set_state(key, TransactionStates.choose_category)
+    await storage.get_data(key)
+    await storage.update_data(key, {"categories_cache": CATEGORIES})
+    await storage.get_state(key)
+    data = await storage.get_data(key)
+    await storage.update_data(key, {"category_id": 3, "category_name": data["categories_cache"]["3"]})
+    await storage.set_state(key, TransactionStates.enter_amount)
+    await storage.get_state(key)
+    await storage.update_data(key, {"amount": "500.00", "transaction_date": "2026-01-01"})
+    await storage.set_state(key, TransactionStates.confirm)
+    await storage.get_state(key)
+    await storage.get_data(key)
+    await storage.set_state(key, TransactionStates.choose_type)
+    return 6
+
+
+async def run(name: str, storage, chats: int, rounds: int) -> None:
+    keys = [StorageKey(bot_id=BOT_ID, chat_id=10_000 + i, user_id=10_000 + i) for i in range(chats)]
+
+    async def chat(key):
+        transitions = 0
+        for _ in range(rounds):
+            transitions += await transaction_flow(storage, key)
+        return transitions
+
+    started = time.perf_counter()
+    transitions = sum(await asyncio.gather(*(chat(key) for key in keys)))
+    elapsed = time.perf_counter() - started
+    stats = getattr(storage, "stats", None)
+    await storage.close()
+    line = f"{name:<28} {transitions / elapsed:>10.0f} переходов/с  ({transitions} за {elapsed:.2f} с)"
+    if stats:
+        line += f"  записей в хранилище: {stats['backend_writes']}, чтений: {stats['backend_reads']}"
+    print(line)
+
+
+async def check_persistence(make_backend) -> bool:
+    """Состояние, записанное одним экземпляром, читается новым (перезапуск/другая реплика)."""
+    key = StorageKey(bot_id=BOT_ID, chat_id=1, user_id=1)
+    first = CachedStorage(make_backend())
+    await first.set_state(key, TransactionStates.confirm)
+    await first.update_data(key, {"amount": "1.00"})
+    await first.close()
+    second = CachedStorage(make_backend())
+    ok = await second.get_state(key) == TransactionStates.confirm.state and (await second.get_data(key))["amount"] == "1.00"
+    await second.close()
+    return ok
+
+
+async def main(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {"sqlite": lambda: SQLiteBackend(os.path.join(tmp, "fsm.db"))}
+        if args.redis_url:
+            backends["redis"] = lambda: RedisBackend.from_url(args.redis_url)
+
+        for name, make_backend in backends.items():
+            print(f"{name}: сохраняется между экземплярами —",
+                  "да" if await check_persistence(make_backend) else "ОШИБКА")
+
+        await run("memory", MemoryStorage(), args.chats, args.rounds)
+        for name, make_backend in backends.items():
+            await run(f"{name}, отложенная запись", CachedStorage(make_backend()), args.chats, args.rounds)
+            await run(f"{name}, без кэша", CachedStorage(make_backend(), flush_interval=0, cache_ttl=0),
+                      args.chats, args.rounds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк FSM-хранилищ бота")
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=20, help="Проходов сценария на чат")
+    parser.add_argument("--redis-url", default=None, help="Redis для сравнения, например redis://127.0.0.1:6379/15")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,135 @@
+"""
+Нагрузочный тест webhook-режима: тысячи синтетических обновлений («Меню» от разных чатов)
+отправляются в WebhookReceiver, обработчики bot.py отвечают через локальную замену Telegram
+Bot API (fake_telegram). Для каждого числа обработчиков выводит пропускную способность и
+проверяет, что обновления одного чата обработаны по порядку и ни одно не потеряно (каждое
+получило ровно один sendMessage). Последний прогон — с маленькой очередью и коротким
+ожиданием места: приёмник отвечает 503, отправитель повторяет, как Telegram.
+
+    python benchmark_webhook.py --updates 2000 --chats 200 --workers 1 4 16 64
+"""
+import argparse
+import asyncio
+import os
+import time
+from collections import Counter
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp import ClientSession, TCPConnector, web
+
+from fake_telegram import start_fake_telegram
+from webhook import SECRET_HEADER, WebhookReceiver
+
+SECRET = "benchmark"
+FIRST_CHAT_ID = 10_000
+
+
+def menu_update(update_id: int, chat_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Load"},
+            "text": "Меню",
+        },
+    }
+
+
+class OrderCheck:
+    """Outer-middleware: update_id одного чата должны приходить по возрастанию."""
+
+    def __init__(self):
+        self.last: dict[int, int] = {}
+        self.violations = 0
+
+    async def __call__(self, handler, event, data):
+        chat_id = event.message.chat.id
+        if self.last.get(chat_id, -1) > event.update_id:
+            self.violations += 1
+        self.last[chat_id] = event.update_id
+        return await handler(event, data)
+
+
+async def run(dp, bot, telegram, order, args, workers: int, queue_size: int, enqueue_timeout: float = 0.5) -> None:
+    telegram.reset()
+    order.last.clear()
+    order.violations = 0
+    receiver = WebhookReceiver(dp, bot, secret_token=SECRET, workers=workers, queue_size=queue_size,
+                               enqueue_timeout=enqueue_timeout)
+    runner = web.AppRunner(receiver.build_app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}{receiver.webhook_path}"
+
+    per_chat: dict[int, list[dict]] = {}
+    for i in range(args.updates):
+        chat_id = FIRST_CHAT_ID + i % args.chats
+        per_chat.setdefault(chat_id, []).append(menu_update(i + 1, chat_id))
+    statuses: Counter = Counter()
+
+    async with ClientSession(connector=TCPConnector(limit=args.connections)) as session:
+        async def deliver(updates):
+            # Как Telegram: следующее обновление чата — после ответа на предыдущее, 503 — повтор
+            for update in updates:
+                while True:
+                    async with session.post(url, json=update, headers={SECRET_HEADER: SECRET}) as resp:
+                        statuses[resp.status] += 1
+                        if resp.status != 503:
+                            break
+                    await asyncio.sleep(0.05)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(deliver(updates) for updates in per_chat.values()))
+        await receiver.queue.join()
+        elapsed = time.perf_counter() - started
+
+    snapshot = receiver.queue.snapshot()
+    await runner.cleanup()
+    lost = sum(
+        1 for chat_id, updates in per_chat.items() if telegram.messages[chat_id] != len(updates)
+    )
+    print(
+        f"workers={workers:<3} queue={queue_size:<5} {args.updates / elapsed:>7.0f} обновлений/с "
+        f"({elapsed:.2f} с); обработано {snapshot['processed']}, ошибок {snapshot['failed']}, "
+        f"нарушений порядка {order.violations}, чатов с потерями {lost}, HTTP {dict(statuses)}"
+    )
+
+
+async def main(args) -> None:
+    telegram = await start_fake_telegram(port=0, latency=args.latency)
+    # До импорта bot: get_api() читает API_BASE при первом вызове
+    os.environ["API_BASE"] = f"{telegram.url}/api"
+    import bot as bot_module
+
+    bot = Bot("123:benchmark", session=AiohttpSession(api=TelegramAPIServer.from_base(telegram.url)))
+    # Один Dispatcher на все прогоны: router из bot.py подключается к нему один раз
+    dp = bot_module.build_dp(bot)
+    order = OrderCheck()
+    dp.update.outer_middleware(order)
+    print(f"Локальная замена Telegram {telegram.url}, задержка {args.latency * 1000:.0f} мс")
+    try:
+        for workers in args.workers:
+            await run(dp, bot, telegram, order, args, workers, args.queue_size)
+        # Короткое ожидание места в очереди: лишние обновления получают 503 и приходят повторно
+        await run(dp, bot, telegram, order, args, max(args.workers), args.small_queue, enqueue_timeout=0.01)
+    finally:
+        await bot_module.get_api().close()
+        await bot.session.close()
+        await telegram.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный тест webhook-режима бота")
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--queue-size", type=int, default=1000)
+    parser.add_argument("--small-queue", type=int, default=50, help="Очередь для проверки backpressure")
+    parser.add_argument("--connections", type=int, default=100, help="Одновременных HTTP-соединений")
+    parser.add_argument("--latency", type=float, default=0.02, help="Задержка ответа Telegram API, секунды")
+    asyncio.run(main(parser.parse_args()))
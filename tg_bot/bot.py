@@ -1,20 +1,26 @@
 """
 Обработчики бота: /start, привязка по коду, выбор дохода/расхода, способ оплаты, категории, сумма, подтверждение.
 """
+import os
 import re
+import uuid
+
 from aiogram import Bot, Dispatcher, F, Router
 from aiogram.filters import CommandStart, Command
 from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import Message, CallbackQuery, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 from states import LinkStates, TransactionStates
 from api_client import SalykBotAPI, SalykBotAPIError, get_api_from_env
+from outbox import DONE, FAILED, TransactionOutbox, get_outbox_from_env
 
 
 router = Router()
 api: SalykBotAPI | None = None
+outbox: TransactionOutbox | None = None
 
 
 def get_api() -> SalykBotAPI:
@@ -24,6 +30,13 @@ def get_api() -> SalykBotAPI:
     return api
 
 
+def get_outbox() -> TransactionOutbox:
+    global outbox
+    if outbox is None:
+        outbox = get_outbox_from_env(get_api())
+    return outbox
+
+
 # --- Клавиатуры ---
 
 def main_menu_kb() -> ReplyKeyboardMarkup:
@@ -386,7 +399,8 @@ async def choose_payment(message: Message, state: FSMContext):
         await message.answer("Введите сумму (например: 500 или 1250.50):", reply_markup=menu_only_kb())
         return
 
-    await state.update_data(categories_cache={c["id"]: c["name"] for c in categories})
+    # Ключи — строки: FSM-хранилище сериализует данные в JSON
+    await state.update_data(categories_cache={str(c["id"]): c["name"] for c in categories})
     await message.answer("Выберите категорию или пропустите:", reply_markup=category_kb(categories))
 
 
@@ -421,7 +435,7 @@ async def choose_category_callback(callback: CallbackQuery, state: FSMContext):
         cat_id = int(callback.data.replace("cat_", ""))
         data = await state.get_data()
         cache = data.get("categories_cache") or {}
-        cat_name = cache.get(cat_id)
+        cat_name = cache.get(str(cat_id))
         await state.update_data(category_id=cat_id, category_name=cat_name)
 
     await state.set_state(TransactionStates.enter_amount)
@@ -480,25 +494,34 @@ async def confirm_yes(callback: CallbackQuery, state: FSMContext):
     category_id = data.get("category_id")
 
     telegram_id = str(callback.from_user.id)
+    chat_id = callback.message.chat.id
+    await state.set_state(TransactionStates.choose_type)
 
-    try:
-        access_token, _ = await get_api().get_token_by_telegram_id(telegram_id)
-        await get_api().create_transaction(
-            access_token=access_token,
-            transaction_type=transaction_type,
-            amount=amount,
-            payment_method=payment_method,
-            category_id=category_id,
-        )
-    except SalykBotAPIError as e:
-        await callback.message.answer(f"Не удалось создать транзакцию: {e.message}")
-        await state.set_state(TransactionStates.choose_type)
+    # Запись сначала в локальную очередь: при недоступном бэкенде она уйдёт позже.
+    # Ключ от сообщения с подтверждением — повторное нажатие не создаст вторую транзакцию
+    key = str(uuid.uuid5(uuid.NAMESPACE_URL, f"tg:{chat_id}:{callback.message.message_id}"))
+    await get_outbox().submit(
+        telegram_id,
+        chat_id,
+        key=key,
+        transaction_type=transaction_type,
+        amount=amount,
+        transaction_date=data.get("transaction_date"),
+        payment_method=payment_method,
+        category_id=category_id,
+    )
+    outcome = await get_outbox().wait(key, timeout=float(os.getenv("BOT_OUTBOX_WAIT", "5")))
+
+    if outcome["status"] == FAILED:
+        await callback.message.answer(f"Не удалось создать транзакцию: {outcome['error']}")
         await callback.message.answer("Выберите тип операции:", reply_markup=main_menu_kb())
         return
-
-    await state.set_state(TransactionStates.choose_type)
+    if outcome["status"] == DONE:
+        text = "Транзакция добавлена. Она отобразится в веб-кабинете."
+    else:
+        text = "Сервер сейчас недоступен — транзакция сохранена и будет отправлена автоматически, я сообщу об этом."
     await callback.message.answer(
-        "Транзакция добавлена. Она отобразится в веб-кабинете.\n\nДобавить ещё или выйти в меню — нажмите кнопку:",
+        text + "\n\nДобавить ещё или выйти в меню — нажмите кнопку:",
         reply_markup=main_menu_kb(),
     )
 
@@ -615,7 +638,7 @@ async def edit_category(callback: CallbackQuery, state: FSMContext):
         data = await state.get_data()
         await callback.message.answer(_format_confirm_text(data), reply_markup=confirm_kb())
         return
-    await state.update_data(categories_cache={c["id"]: c["name"] for c in categories})
+    await state.update_data(categories_cache={str(c["id"]): c["name"] for c in categories})
     await callback.message.answer("Выберите категорию:", reply_markup=category_kb(categories))
 
 
@@ -644,7 +667,7 @@ async def edit_category_pick(callback: CallbackQuery, state: FSMContext):
         cat_id = int(callback.data.replace("cat_", ""))
         data = await state.get_data()
         cache = data.get("categories_cache") or {}
-        await state.update_data(category_id=cat_id, category_name=cache.get(cat_id))
+        await state.update_data(category_id=cat_id, category_name=cache.get(str(cat_id)))
     await state.set_state(TransactionStates.confirm)
     data = await state.get_data()
     await callback.message.answer(_format_confirm_text(data), reply_markup=confirm_kb())
@@ -673,7 +696,8 @@ async def edit_amount_pick(message: Message, state: FSMContext):
     await message.answer(_format_confirm_text(data), reply_markup=confirm_kb())
 
 
-def build_dp(bot: Bot) -> Dispatcher:
-    dp = Dispatcher(storage=MemoryStorage())
+def build_dp(bot: Bot, storage: BaseStorage | None = None) -> Dispatcher:
+    """storage — FSM-хранилище (fsm_storage.get_storage_from_env()); по умолчанию MemoryStorage."""
+    dp = Dispatcher(storage=storage or MemoryStorage())
     dp.include_router(router)
     return dp
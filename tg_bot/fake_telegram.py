@@ -0,0 +1,101 @@
+"""
+Локальная замена Telegram Bot API и бэкенда Salyk для нагрузочного теста webhook-режима.
+
+Любой метод Bot API (POST /bot<token>/<method>) отвечает успехом через latency секунд
+(сетевой RTT до api.telegram.org); sendMessage запоминает chat_id, чтобы проверить, что
+каждое обновление получило ответ. POST /api/telegram/bot/auth/ выдаёт JWT с user_id =
+telegram_id, чтобы обработчики bot.py проходили проверку привязки.
+
+    python fake_telegram.py --port 8090 --latency 0.02
+"""
+import argparse
+import asyncio
+import base64
+import json
+import time
+from collections import Counter
+from typing import Optional
+
+from aiohttp import web
+
+
+def _fake_jwt(user_id) -> str:
+    now = int(time.time())
+    claims = {"exp": now + 900, "iat": now, "user_id": user_id}
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).rstrip(b"=").decode()
+    return f"header.{payload}.signature"
+
+
+class FakeTelegramServer:
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8090, latency: float = 0.0,
+                 auth_latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.auth_latency = auth_latency
+        self.calls: Counter = Counter()
+        self.messages: Counter = Counter()  # chat_id -> число sendMessage
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self) -> "FakeTelegramServer":
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._bot_method)
+        app.router.add_post("/api/telegram/bot/auth/", self._auth)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def reset(self) -> None:
+        self.calls.clear()
+        self.messages.clear()
+
+    async def _bot_method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        data = await request.json() if request.content_type == "application/json" else await request.post()
+        await asyncio.sleep(self.latency)
+        self.calls[method] += 1
+        chat_id = int(data.get("chat_id", 0))
+        if method.lower() == "sendmessage":
+            self.messages[chat_id] += 1
+        result = {
+            "message_id": sum(self.calls.values()),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": data.get("text", ""),
+        }
+        return web.json_response({"ok": True, "result": result})
+
+    async def _auth(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        await asyncio.sleep(self.auth_latency)
+        return web.json_response({"access": _fake_jwt(data["telegram_id"]), "refresh": "refresh"})
+
+
+async def start_fake_telegram(**kwargs) -> FakeTelegramServer:
+    return await FakeTelegramServer(**kwargs).start()
+
+
+async def _serve(args) -> None:
+    server = await start_fake_telegram(host=args.host, port=args.port, latency=args.latency)
+    print(f"Fake Telegram API: {server.url}, API_BASE={server.url}/api")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Локальная замена Telegram Bot API (для нагрузочных тестов)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.02, help="Задержка ответа, секунды")
+    asyncio.run(_serve(parser.parse_args()))
@@ -0,0 +1,314 @@
+"""
+Постоянное FSM-хранилище бота: состояние и данные сценариев переживают перезапуск
+и доступны всем репликам.
+
+BOT_FSM_STORAGE выбирает хранилище:
+- memory (по умолчанию) — MemoryStorage aiogram, как раньше;
+- redis://[:пароль@]хост:порт/номер_бд — Redis (пакет redis, клиент redis.asyncio);
+- sqlite:///путь/к/файлу.db — один файл, для одного хоста без Redis.
+
+Redis и SQLite подключаются через CachedStorage. С одной репликой (BOT_REPLICAS=1) чтения
+обслуживает локальный кэш, записи копятся и уходят в хранилище пачкой раз в
+BOT_FSM_FLUSH_INTERVAL секунд (несколько изменений одного чата — одна запись). При падении
+процесса теряются изменения последнего интервала; close() досылает всё. После
+BOT_FSM_CACHE_TTL секунд без изменений запись перечитывается.
+
+Локальный кэш верен, только пока обновления чата приходят на одну реплику. Поэтому при
+BOT_REPLICAS > 1 по умолчанию кэша нет: каждое чтение идёт в хранилище, каждая запись —
+сразу (write-through). Включать BOT_FSM_FLUSH_INTERVAL/BOT_FSM_CACHE_TTL с несколькими
+репликами можно, только если балансировщик направляет чат всегда на одну реплику (см. webhook.py).
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Mapping, Optional
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+try:
+    from redis import asyncio as aioredis
+except ImportError:
+    # Нужен только для BOT_FSM_STORAGE=redis://...
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+# Сверх этого числа записей из кэша убираются отправленные и устаревшие
+CACHE_SIZE = 10_000
+
+
+class StorageBackendError(Exception):
+    """Ошибка общего хранилища (соединение, ответ сервера)."""
+
+
+# --- Общие хранилища: ключ -> строка ---
+
+class RedisBackend:
+    """
+    Redis через redis.asyncio: пул до pool_size соединений; пачка записей уходит одной
+    транзакцией (MULTI/EXEC), поэтому другая реплика не увидит её наполовину.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str, pool_size: int = 4, timeout: float = 5) -> "RedisBackend":
+        if aioredis is None:
+            raise SystemExit("Для BOT_FSM_STORAGE=redis://... установите пакет redis (requirements.txt)")
+        return cls(aioredis.Redis.from_url(
+            url,
+            max_connections=pool_size,
+            socket_timeout=timeout,
+            socket_connect_timeout=timeout,
+            decode_responses=True,
+        ))
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            return await self.client.get(key)
+        except (aioredis.RedisError, OSError) as e:
+            raise StorageBackendError(f"Redis: {e}") from e
+
+    async def write_many(self, values: Mapping[str, Optional[str]]) -> None:
+        """Записать значения; None — удалить ключ."""
+        to_set = {key: value for key, value in values.items() if value is not None}
+        to_delete = [key for key, value in values.items() if value is None]
+        if not to_set and not to_delete:
+            return
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                if to_set:
+                    pipe.mset(to_set)
+                if to_delete:
+                    pipe.delete(*to_delete)
+                await pipe.execute()
+        except (aioredis.RedisError, OSError) as e:
+            raise StorageBackendError(f"Redis: {e}") from e
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class SQLiteBackend:
+    """Таблица key/value в файле SQLite (WAL); запросы выполняются в отдельном потоке."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm-sqlite")
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @classmethod
+    def from_url(cls, url: str) -> "SQLiteBackend":
+        # sqlite:///относительный/путь или sqlite:////абсолютный/путь
+        return cls(url[len("sqlite:///"):])
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=10)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS fsm (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        return self._conn
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _get(self, key):
+        row = self._connection().execute("SELECT value FROM fsm WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _write_many(self, values):
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT INTO fsm (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                [(key, value) for key, value in values.items() if value is not None],
+            )
+            conn.executemany(
+                "DELETE FROM fsm WHERE key = ?",
+                [(key,) for key, value in values.items() if value is None],
+            )
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            return await self._run(self._get, key)
+        except sqlite3.Error as e:
+            raise StorageBackendError(f"SQLite {self.path}: {e}") from e
+
+    async def write_many(self, values: Mapping[str, Optional[str]]) -> None:
+        try:
+            await self._run(self._write_many, dict(values))
+        except sqlite3.Error as e:
+            raise StorageBackendError(f"SQLite {self.path}: {e}") from e
+
+    async def close(self) -> None:
+        if self._conn is None:
+            return
+
+        def close_connection():
+            self._conn.close()
+            self._conn = None
+        await self._run(close_connection)
+
+
+# --- FSM-хранилище с локальным кэшем ---
+
+class _Record:
+    __slots__ = ("state", "data", "loaded_at")
+
+    def __init__(self, state: Optional[str], data: dict, loaded_at: float):
+        self.state = state
+        self.data = data
+        self.loaded_at = loaded_at
+
+
+class CachedStorage(BaseStorage):
+    """
+    FSM-хранилище поверх RedisBackend/SQLiteBackend: одна JSON-запись {"state", "data"} на ключ,
+    локальный кэш чтений и отложенная запись (write-behind).
+
+    flush_interval=0 — запись сразу (write-through); cache_ttl=0 — каждое чтение из хранилища
+    (если в кэше нет неотправленных изменений). Оба нуля — режим для нескольких реплик без
+    привязки чата к реплике.
+    """
+
+    def __init__(self, backend, flush_interval: float = 0.05, cache_ttl: float = 30,
+                 key_builder: Optional[KeyBuilder] = None):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.cache_ttl = cache_ttl
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True)
+        self._cache: dict[str, _Record] = {}
+        # Ключ -> JSON для записи (None — удалить); отправляется фоновой задачей
+        self._dirty: dict[str, Optional[str]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self.stats = {"reads": 0, "cache_hits": 0, "backend_reads": 0, "writes": 0,
+                      "backend_writes": 0, "flushes": 0, "flush_errors": 0}
+
+    async def _load(self, key: str) -> _Record:
+        self.stats["reads"] += 1
+        record = self._cache.get(key)
+        now = time.monotonic()
+        if record is not None and (key in self._dirty or now - record.loaded_at < self.cache_ttl):
+            self.stats["cache_hits"] += 1
+            return record
+        self.stats["backend_reads"] += 1
+        raw = await self.backend.get(key)
+        if key in self._dirty:
+            # Запись изменилась, пока шло чтение — локальная версия новее
+            return self._cache[key]
+        value = json.loads(raw) if raw else {}
+        record = _Record(value.get("state"), value.get("data") or {}, now)
+        if len(self._cache) >= CACHE_SIZE:
+            self._prune(now)
+        self._cache[key] = record
+        return record
+
+    def _prune(self, now: float) -> None:
+        for key in [k for k, r in self._cache.items() if k not in self._dirty and now - r.loaded_at >= self.cache_ttl]:
+            del self._cache[key]
+
+    async def _store(self, key: str, record: _Record) -> None:
+        self.stats["writes"] += 1
+        # Пустая запись (state.clear()) удаляет ключ из хранилища
+        payload = None
+        if record.state is not None or record.data:
+            # Сериализация сразу: несериализуемые данные — ошибка в обработчике, а не при отправке
+            payload = json.dumps({"state": record.state, "data": record.data}, ensure_ascii=False)
+        record.loaded_at = time.monotonic()
+        self._cache[key] = record
+        if self.flush_interval <= 0:
+            self._dirty.pop(key, None)
+            await self.backend.write_many({key: payload})
+            self.stats["backend_writes"] += 1
+            return
+        self._dirty[key] = payload
+        self._flush_wakeup.set()
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def flush(self) -> None:
+        """Отправить накопленные изменения; при ошибке они остаются в очереди."""
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            batch, self._dirty = self._dirty, {}
+            try:
+                await self.backend.write_many(batch)
+            except StorageBackendError:
+                self.stats["flush_errors"] += 1
+                # Более новые изменения тех же ключей важнее неотправленных
+                self._dirty = {**batch, **self._dirty}
+                raise
+            self.stats["flushes"] += 1
+            self.stats["backend_writes"] += len(batch)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._flush_wakeup.wait()
+            await asyncio.sleep(self.flush_interval)
+            self._flush_wakeup.clear()
+            try:
+                await self.flush()
+            except StorageBackendError:
+                logger.exception("Не удалось записать FSM-состояния, повтор через %s с", self.flush_interval)
+                self._flush_wakeup.set()
+                await asyncio.sleep(1)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self.key_builder.build(key)
+        record = await self._load(storage_key)
+        new_state = state.state if isinstance(state, State) else state
+        await self._store(storage_key, _Record(new_state, record.data, record.loaded_at))
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._load(self.key_builder.build(key))).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(f"Data must be a dict or dict-like object, got {type(data).__name__}")
+        storage_key = self.key_builder.build(key)
+        record = await self._load(storage_key)
+        await self._store(storage_key, _Record(record.state, data.copy(), record.loaded_at))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return (await self._load(self.key_builder.build(key))).data.copy()
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        try:
+            await self.flush()
+        except StorageBackendError:
+            logger.exception("Не записано FSM-состояний при остановке: %s", len(self._dirty))
+        await self.backend.close()
+
+
+def get_storage_from_env() -> BaseStorage:
+    url = os.getenv("BOT_FSM_STORAGE", "memory")
+    if url == "memory":
+        return MemoryStorage()
+    if url.startswith("redis://") or url.startswith("rediss://"):
+        backend = RedisBackend.from_url(url, pool_size=int(os.getenv("BOT_FSM_REDIS_POOL", "4")))
+    elif url.startswith("sqlite:///"):
+        backend = SQLiteBackend.from_url(url)
+    else:
+        raise SystemExit("BOT_FSM_STORAGE: memory, redis://... или sqlite:///...")
+    # Несколько реплик: без локального кэша и отложенной записи, иначе реплика прочтёт устаревшее состояние
+    shared = int(os.getenv("BOT_REPLICAS", "1")) > 1
+    return CachedStorage(
+        backend,
+        flush_interval=float(os.getenv("BOT_FSM_FLUSH_INTERVAL", "0" if shared else "0.05")),
+        cache_ttl=float(os.getenv("BOT_FSM_CACHE_TTL", "0" if shared else "30")),
+    )
@@ -0,0 +1,374 @@
+"""
+Очередь исходящих записей бота: транзакции из confirm_yes сначала сохраняются в SQLite
+(BOT_OUTBOX_PATH), затем фоновая задача отправляет их в API.
+
+- У каждой записи свой Idempotency-Key, он же уходит при всех повторах — бэкенд
+  не создаст вторую транзакцию, даже если первый ответ не дошёл до бота.
+- Сетевые ошибки, таймауты, 5xx, 401, 409, 429 — повтор с экспоненциальной задержкой
+  (BOT_OUTBOX_BASE_DELAY · 2^попытка, не больше BOT_OUTBOX_MAX_DELAY, со случайным
+  разбросом); остальные 4xx — окончательная ошибка. Запись, не отправленная за
+  BOT_OUTBOX_MAX_AGE секунд, помечается ошибкой.
+- Непредвиденная ошибка при отправке записи пишется в лог и повторяется так же, запись с
+  испорченным payload сразу помечается ошибкой — остальная очередь продолжает работать.
+- Очередь переживает перезапуск: неотправленные записи уходят после старта.
+
+Состояние очереди — status(), в режиме webhook — в GET /healthz, из консоли:
+
+    python outbox.py status
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Awaitable, Callable, Optional
+
+import aiohttp
+
+from api_client import SalykBotAPI, SalykBotAPIError
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+# Статусы 4xx, после которых запрос имеет смысл повторить
+RETRY_STATUSES = {401, 408, 409, 425, 429}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    telegram_id TEXT NOT NULL,
+    chat_id INTEGER,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    notify INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    finished_at REAL,
+    last_error TEXT,
+    result_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+Notifier = Callable[[int, str], Awaitable[None]]
+
+
+class OutboxStore:
+    """Таблица outbox в SQLite; методы синхронные, TransactionOutbox вызывает их в отдельном потоке."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=10)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def add(self, key: str, telegram_id: str, chat_id: Optional[int], payload: dict, now: float) -> bool:
+        """False — запись с таким ключом уже есть."""
+        conn = self.connection()
+        with conn:
+            return bool(conn.execute(
+                "INSERT OR IGNORE INTO outbox"
+                " (idempotency_key, telegram_id, chat_id, payload, status, created_at, next_attempt_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, telegram_id, chat_id, json.dumps(payload, ensure_ascii=False), PENDING, now, now),
+            ).rowcount)
+
+    def due(self, now: float, limit: int) -> list[sqlite3.Row]:
+        return self.connection().execute(
+            "SELECT * FROM outbox WHERE status = ? AND next_attempt_at <= ? ORDER BY next_attempt_at, id LIMIT ?",
+            (PENDING, now, limit),
+        ).fetchall()
+
+    def next_attempt_at(self) -> Optional[float]:
+        return self.connection().execute(
+            "SELECT MIN(next_attempt_at) FROM outbox WHERE status = ?", (PENDING,),
+        ).fetchone()[0]
+
+    def finish(self, key: str, status: str, now: float, result_id: Optional[int] = None,
+               error: Optional[str] = None) -> Optional[sqlite3.Row]:
+        conn = self.connection()
+        with conn:
+            conn.execute(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, finished_at = ?, result_id = ?, last_error = ?"
+                " WHERE idempotency_key = ?",
+                (status, now, result_id, error, key),
+            )
+        return conn.execute("SELECT * FROM outbox WHERE idempotency_key = ?", (key,)).fetchone()
+
+    def retry_later(self, key: str, next_attempt_at: float, error: str) -> None:
+        conn = self.connection()
+        with conn:
+            conn.execute(
+                "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, last_error = ? WHERE idempotency_key = ?",
+                (next_attempt_at, error, key),
+            )
+
+    def set_notify(self, key: str) -> bool:
+        """Пользователю сообщили «отправим позже»; False, если запись уже обработана."""
+        conn = self.connection()
+        with conn:
+            updated = conn.execute(
+                "UPDATE outbox SET notify = 1 WHERE idempotency_key = ? AND status = ?", (key, PENDING),
+            ).rowcount
+        return bool(updated)
+
+    def get(self, key: str) -> Optional[sqlite3.Row]:
+        return self.connection().execute("SELECT * FROM outbox WHERE idempotency_key = ?", (key,)).fetchone()
+
+    def purge(self, before: float) -> int:
+        conn = self.connection()
+        with conn:
+            return conn.execute(
+                "DELETE FROM outbox WHERE status != ? AND finished_at < ?", (PENDING, before),
+            ).rowcount
+
+    def status(self, now: float) -> dict:
+        conn = self.connection()
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+        oldest, retrying, next_at = conn.execute(
+            "SELECT MIN(created_at), SUM(attempts > 0), MIN(next_attempt_at) FROM outbox WHERE status = ?",
+            (PENDING,),
+        ).fetchone()
+        last_error = conn.execute(
+            "SELECT last_error FROM outbox WHERE status = ? AND last_error IS NOT NULL ORDER BY id DESC LIMIT 1",
+            (PENDING,),
+        ).fetchone()
+        return {
+            "pending": counts.get(PENDING, 0),
+            "retrying": retrying or 0,
+            "failed": counts.get(FAILED, 0),
+            "done": counts.get(DONE, 0),
+            "oldest_pending_age_seconds": round(now - oldest, 1) if oldest is not None else None,
+            "next_attempt_in_seconds": round(max(0.0, next_at - now), 1) if next_at is not None else None,
+            "last_error": last_error[0] if last_error else None,
+        }
+
+
+class TransactionOutbox:
+
+    def __init__(
+        self,
+        api: SalykBotAPI,
+        path: str = "bot_outbox.db",
+        concurrency: int = 4,
+        base_delay: float = 2,
+        max_delay: float = 300,
+        max_age: float = 86400,
+        request_timeout: float = 15,
+        keep_finished: float = 7 * 86400,
+    ):
+        self.api = api
+        self.store = OutboxStore(path)
+        self.concurrency = concurrency
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_age = max_age
+        self.request_timeout = request_timeout
+        self.keep_finished = keep_finished
+        # Сообщить пользователю итог записи, о которой он узнал «отправим позже»
+        self.notifier: Optional[Notifier] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bot-outbox")
+        self._wakeup = asyncio.Event()
+        self._waiters: dict[str, asyncio.Future] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._last_purge = 0.0
+        self.stats = {"submitted": 0, "sent": 0, "retries": 0, "failed": 0}
+
+    async def _db(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._db(self.store.close)
+
+    async def submit(self, telegram_id: str, chat_id: Optional[int], key: Optional[str] = None,
+                     **transaction) -> str:
+        """
+        Сохранить транзакцию (аргументы create_transaction без access_token) и разбудить отправку.
+        key — Idempotency-Key (по умолчанию uuid4); повторный submit с тем же ключом ничего
+        не добавляет. Возвращает ключ.
+        """
+        key = key or str(uuid.uuid4())
+        if isinstance(transaction.get("transaction_date"), date):
+            transaction["transaction_date"] = transaction["transaction_date"].isoformat()
+        if not transaction.get("transaction_date"):
+            transaction["transaction_date"] = date.today().isoformat()
+        if await self._db(self.store.add, key, str(telegram_id), chat_id, transaction, time.time()):
+            self.stats["submitted"] += 1
+        self.start()
+        self._wakeup.set()
+        return key
+
+    async def wait(self, key: str, timeout: float) -> dict:
+        """
+        Дождаться итога не дольше timeout секунд: {"status": done|failed|pending, ...}.
+        Если итог не получен, пользователь получит его сообщением (notifier).
+        """
+        future = self._waiters.setdefault(key, asyncio.get_running_loop().create_future())
+        try:
+            row = await self._db(self.store.get, key)
+            if row["status"] != PENDING:
+                return self._outcome(row)
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            if await self._db(self.store.set_notify, key):
+                return {"status": PENDING}
+            # Завершилась между таймаутом и отметкой
+            row = await self._db(self.store.get, key)
+            return self._outcome(row)
+        finally:
+            if self._waiters.get(key) is future:
+                del self._waiters[key]
+
+    async def status(self) -> dict:
+        return {**await self._db(self.store.status, time.time()), "counters": dict(self.stats)}
+
+    @staticmethod
+    def _outcome(row: sqlite3.Row) -> dict:
+        return {"status": row["status"], "error": row["last_error"], "result_id": row["result_id"]}
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** attempts)
+        # Разброс, чтобы после простоя бэкенда повторы не приходили одной волной
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._drain()
+                next_at = await self._db(self.store.next_attempt_at)
+            except sqlite3.Error:
+                logger.exception("Очередь исходящих: ошибка SQLite")
+                next_at = time.time() + self.base_delay
+            except Exception:
+                # Задача отправки не должна завершаться: следующий проход — через base_delay
+                logger.exception("Очередь исходящих: ошибка обработки")
+                next_at = time.time() + self.base_delay
+            timeout = None if next_at is None else max(0.0, next_at - time.time())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _drain(self) -> None:
+        while True:
+            now = time.time()
+            if now - self._last_purge > 3600:
+                self._last_purge = now
+                await self._db(self.store.purge, now - self.keep_finished)
+            rows = await self._db(self.store.due, now, self.concurrency)
+            if not rows:
+                return
+            await asyncio.gather(*(self._send(row) for row in rows))
+
+    async def _send(self, row: sqlite3.Row) -> None:
+        """Одна попытка отправки; любая ошибка записи остаётся в этой записи, а не останавливает очередь."""
+        key = row["idempotency_key"]
+        try:
+            payload = json.loads(row["payload"])
+            payload["transaction_date"] = date.fromisoformat(payload["transaction_date"])
+        except (TypeError, ValueError, KeyError) as e:
+            logger.exception("Очередь исходящих: некорректная запись %s", key)
+            await self._failed(row, f"Некорректная запись в очереди: {type(e).__name__}", transient=False)
+            return
+        try:
+            access_token, _ = await self.api.get_token_by_telegram_id(row["telegram_id"])
+            result = await asyncio.wait_for(
+                self.api.create_transaction(access_token, idempotency_key=key, **payload),
+                self.request_timeout,
+            )
+        except SalykBotAPIError as e:
+            transient = e.status is None or e.status >= 500 or e.status in RETRY_STATUSES
+            await self._failed(row, e.message, transient)
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            await self._failed(row, f"Сервер недоступен: {type(e).__name__}", transient=True)
+        except Exception as e:
+            # Непредвиденная ошибка (неожиданный ответ, ошибка в коде) — повтор с задержкой;
+            # Idempotency-Key не даст создать транзакцию дважды
+            logger.exception("Очередь исходящих: ошибка отправки %s", key)
+            await self._failed(row, f"Внутренняя ошибка: {type(e).__name__}", transient=True)
+        else:
+            self.stats["sent"] += 1
+            result_id = result.get("id") if isinstance(result, dict) else None
+            finished = await self._db(self.store.finish, key, DONE, time.time(), result_id)
+            await self._finished(finished)
+
+    async def _failed(self, row: sqlite3.Row, error: str, transient: bool) -> None:
+        key = row["idempotency_key"]
+        now = time.time()
+        if transient and now - row["created_at"] < self.max_age:
+            self.stats["retries"] += 1
+            await self._db(self.store.retry_later, key, now + self._backoff(row["attempts"]), error)
+            return
+        self.stats["failed"] += 1
+        if transient:
+            error = f"Не отправлено за {self.max_age / 3600:.0f} ч: {error}"
+        logger.warning("Транзакция %s не создана: %s", key, error)
+        await self._finished(await self._db(self.store.finish, key, FAILED, now, None, error))
+
+    async def _finished(self, row: sqlite3.Row) -> None:
+        future = self._waiters.get(row["idempotency_key"])
+        if future is not None and not future.done():
+            future.set_result(self._outcome(row))
+        if row["notify"] and row["chat_id"] and self.notifier is not None:
+            payload = json.loads(row["payload"])
+            if row["status"] == DONE:
+                text = f"Транзакция на {payload['amount']} сом от {payload['transaction_date']} добавлена."
+            else:
+                text = f"Не удалось создать транзакцию на {payload['amount']} сом: {row['last_error']}"
+            try:
+                await self.notifier(row["chat_id"], text)
+            except Exception:
+                logger.exception("Не удалось отправить уведомление в чат %s", row["chat_id"])
+
+
+def get_outbox_from_env(api: SalykBotAPI) -> TransactionOutbox:
+    return TransactionOutbox(
+        api,
+        path=os.getenv("BOT_OUTBOX_PATH", "bot_outbox.db"),
+        concurrency=int(os.getenv("BOT_OUTBOX_CONCURRENCY", "4")),
+        base_delay=float(os.getenv("BOT_OUTBOX_BASE_DELAY", "2")),
+        max_delay=float(os.getenv("BOT_OUTBOX_MAX_DELAY", "300")),
+        max_age=float(os.getenv("BOT_OUTBOX_MAX_AGE", "86400")),
+    )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["status"]:
+        raise SystemExit("Использование: python outbox.py status")
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    store = OutboxStore(os.getenv("BOT_OUTBOX_PATH", "bot_outbox.db"))
+    print(json.dumps(store.status(time.time()), ensure_ascii=False, indent=2))
+    store.close()
@@ -1,17 +1,58 @@
 """
-Точка входа: запуск бота (long polling).
+Точка входа: запуск бота (long polling или webhook, BOT_MODE).
 Перед запуском: скопировать config.example.env в .env и указать BOT_TOKEN, API_BASE.
 """
 import asyncio
+import logging
 import os
 
 from dotenv import load_dotenv
 from aiogram import Bot
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
+from aiohttp import web
 
-from bot import build_dp
-from api_client import get_api_from_env
+from bot import build_dp, get_api, get_outbox
+from fsm_storage import get_storage_from_env
+from webhook import WebhookReceiver
+
+
+async def run_webhook(dp, bot: Bot):
+    """Приём обновлений через webhook; BOT_WEBHOOK_URL — публичный адрес, по которому доступен приёмник."""
+    path = os.getenv("BOT_WEBHOOK_PATH", "/tg/webhook")
+    secret = os.getenv("BOT_WEBHOOK_SECRET") or None
+    receiver = WebhookReceiver(
+        dp,
+        bot,
+        webhook_path=path,
+        secret_token=secret,
+        workers=int(os.getenv("BOT_WORKERS", "8")),
+        queue_size=int(os.getenv("BOT_QUEUE_SIZE", "1000")),
+        enqueue_timeout=float(os.getenv("BOT_ENQUEUE_TIMEOUT", "5")),
+        status_providers={"outbox": get_outbox().status},
+    )
+    runner = web.AppRunner(receiver.build_app())
+    await runner.setup()
+    await dp.emit_startup(bot=bot)
+    try:
+        site = web.TCPSite(
+            runner,
+            os.getenv("BOT_WEBHOOK_HOST", "0.0.0.0"),
+            int(os.getenv("BOT_WEBHOOK_PORT", "8081")),
+        )
+        await site.start()
+        # При нескольких репликах адрес регистрирует одна из них (или деплой) — остальные без BOT_WEBHOOK_URL
+        url = os.getenv("BOT_WEBHOOK_URL")
+        if url:
+            await bot.set_webhook(
+                url.rstrip("/") + path,
+                secret_token=secret,
+                allowed_updates=dp.resolve_used_update_types(),
+            )
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await dp.emit_shutdown(bot=bot)
 
 
 async def main():
@@ -21,12 +62,29 @@ async def main():
         raise SystemExit("Укажите BOT_TOKEN в .env")
 
     bot = Bot(token=token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-    dp = build_dp(bot)
+    # Хранилище закрывает (и досылает отложенные записи) сам Dispatcher при остановке
+    dp = build_dp(bot, storage=get_storage_from_env())
 
-    api = get_api_from_env()
+    # Тот же экземпляр, что и в обработчиках: закрываем его сессию и видим его счётчики
+    api = get_api()
+    # Очередь исходящих транзакций: досылает оставшееся с прошлого запуска
+    outbox = get_outbox()
+    outbox.notifier = lambda chat_id, text: bot.send_message(chat_id, text)
+    outbox.start()
     try:
-        await dp.start_polling(bot)
+        mode = os.getenv("BOT_MODE", "polling")
+        if mode == "webhook":
+            await run_webhook(dp, bot)
+        elif mode == "polling":
+            await dp.start_polling(bot)
+        else:
+            raise SystemExit("BOT_MODE: polling или webhook")
     finally:
+        logger = logging.getLogger(__name__)
+        logger.info("Кэш токенов: %s", api.token_cache_stats())
+        logger.info("Кэш категорий и транзакций: %s", api.response_cache_stats())
+        logger.info("Очередь исходящих: %s", await outbox.status())
+        await outbox.close()
         await api.close()
         await bot.session.close()
 
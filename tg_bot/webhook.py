@@ -0,0 +1,202 @@
+"""
+Режим webhook: aiohttp-приёмник обновлений Telegram и пул обработчиков.
+
+Обновления попадают во внутреннюю очередь и разбираются BOT_WORKERS обработчиками.
+Обновления одного чата обрабатываются строго по очереди (следующее — только после
+завершения предыдущего), разные чаты — параллельно. В очереди не больше BOT_QUEUE_SIZE
+обновлений (вместе с обрабатываемыми): при заполнении приёмник ждёт до
+BOT_ENQUEUE_TIMEOUT секунд и отвечает 503 — Telegram повторит доставку позже.
+
+Порядок внутри чата гарантируется в пределах одного процесса. При нескольких репликах
+за балансировщиком обновления одного чата должны попадать на одну реплику (например,
+хэш по chat_id), а FSM — храниться вне процесса.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def update_chat_key(data: dict) -> Hashable:
+    """Ключ упорядочивания обновления: id чата (или пользователя), иначе update_id."""
+    for field, event in data.items():
+        if field == "update_id" or not isinstance(event, dict):
+            continue
+        for path in (("chat",), ("message", "chat"), ("from",), ("user",)):
+            node: Any = event
+            for part in path:
+                node = node.get(part) if isinstance(node, dict) else None
+            if isinstance(node, dict) and "id" in node:
+                return node["id"]
+    return ("update", data.get("update_id"))
+
+
+class QueueFull(Exception):
+    """Очередь обновлений заполнена дольше допустимого ожидания."""
+
+
+class ChatOrderedQueue:
+    """
+    Очередь обновлений с пулом обработчиков и порядком внутри чата.
+
+    У каждого чата своя очередь; в общей очереди ready стоят чаты, у которых есть
+    необработанные обновления и нет обновления в работе. Обработчик берёт из чата одно
+    обновление и после него возвращает чат в конец ready — чаты с потоком сообщений не
+    задерживают остальные.
+    """
+
+    def __init__(self, handler, workers: int = 8, maxsize: int = 1000):
+        self.handler = handler
+        self.workers = workers
+        self.maxsize = maxsize
+        self._slots = asyncio.Semaphore(maxsize)
+        self._chats: dict[Hashable, deque] = {}
+        self._ready: asyncio.Queue = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+        self._size = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.stats = {"accepted": 0, "rejected": 0, "processed": 0, "failed": 0, "busy_workers": 0}
+
+    def __len__(self):
+        return self._size
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def put(self, key: Hashable, item, timeout: Optional[float] = None) -> None:
+        """Поставить обновление в очередь; QueueFull, если места нет дольше timeout секунд."""
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.stats["rejected"] += 1
+            raise QueueFull from None
+        self._size += 1
+        self._idle.clear()
+        self.stats["accepted"] += 1
+        pending = self._chats.get(key)
+        if pending is None:
+            self._chats[key] = deque([item])
+            self._ready.put_nowait(key)
+        else:
+            # Чат уже в ready или в работе — обработчик сам вернёт его в ready
+            pending.append(item)
+
+    async def _worker(self) -> None:
+        while True:
+            key = await self._ready.get()
+            pending = self._chats[key]
+            item = pending.popleft()
+            self.stats["busy_workers"] += 1
+            try:
+                await self.handler(item)
+                self.stats["processed"] += 1
+            except Exception:
+                self.stats["failed"] += 1
+                logger.exception("Ошибка обработки обновления")
+            finally:
+                self.stats["busy_workers"] -= 1
+                if pending:
+                    self._ready.put_nowait(key)
+                else:
+                    del self._chats[key]
+                self._size -= 1
+                self._slots.release()
+                if not self._size:
+                    self._idle.set()
+
+    async def join(self, timeout: Optional[float] = None) -> bool:
+        """Дождаться обработки всех принятых обновлений; False, если не успели за timeout."""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "queued": self._size, "chats": len(self._chats), "workers": self.workers}
+
+
+class WebhookReceiver:
+    """aiohttp-приложение: POST webhook_path принимает обновления, GET /healthz — состояние очереди."""
+
+    def __init__(
+        self,
+        dp: Dispatcher,
+        bot: Bot,
+        webhook_path: str = "/tg/webhook",
+        secret_token: Optional[str] = None,
+        workers: int = 8,
+        queue_size: int = 1000,
+        enqueue_timeout: float = 5,
+        status_providers: Optional[dict[str, Callable[[], Awaitable[dict]]]] = None,
+    ):
+        self.dp = dp
+        self.bot = bot
+        self.webhook_path = webhook_path
+        self.secret_token = secret_token
+        self.enqueue_timeout = enqueue_timeout
+        # Дополнительные разделы /healthz (например, очередь исходящих)
+        self.status_providers = status_providers or {}
+        self.queue = ChatOrderedQueue(self._process, workers=workers, maxsize=queue_size)
+        self.started_at = time.monotonic()
+
+    async def _process(self, data: dict) -> None:
+        update = Update.model_validate(data, context={"bot": self.bot})
+        await self.dp.feed_update(self.bot, update)
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        if self.secret_token and request.headers.get(SECRET_HEADER) != self.secret_token:
+            return web.json_response({"detail": "Неверный секрет"}, status=401)
+        try:
+            data = await request.json()
+        except ValueError:
+            return web.json_response({"detail": "Некорректный JSON"}, status=400)
+        if not isinstance(data, dict):
+            return web.json_response({"detail": "Некорректное обновление"}, status=400)
+        try:
+            await self.queue.put(update_chat_key(data), data, timeout=self.enqueue_timeout)
+        except QueueFull:
+            return web.json_response({"detail": "Очередь переполнена"}, status=503, headers={"Retry-After": "1"})
+        return web.json_response({})
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        body = {
+            **self.queue.snapshot(),
+            "uptime_seconds": round(time.monotonic() - self.started_at),
+        }
+        for name, provider in self.status_providers.items():
+            body[name] = await provider()
+        return web.json_response(body)
+
+    async def on_startup(self, app: web.Application) -> None:
+        self.queue.start()
+
+    async def on_shutdown(self, app: web.Application) -> None:
+        # Приём уже остановлен: дорабатываем принятые обновления
+        if not await self.queue.join(timeout=30):
+            logger.warning("Не обработано обновлений при остановке: %s", len(self.queue))
+        await self.queue.stop()
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.webhook_path, self.handle_update)
+        app.router.add_get("/healthz", self.handle_health)
+        app.on_startup.append(self.on_startup)
+        app.on_shutdown.append(self.on_shutdown)
+        return app